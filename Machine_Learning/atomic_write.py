@@ -0,0 +1,31 @@
+"""
+Atomic file replacement for the artifacts the scripts save.
+
+A file is written under a temporary name in its destination directory, then
+moved over the destination with os.replace. Readers (the API, the prediction
+daemon, concurrent trainers and scoring workers) therefore see either the old
+or the new file, never a partial one.
+"""
+
+import os
+import tempfile
+
+
+def atomic_write(path, write):
+    """
+    Write a file atomically.
+
+    Args:
+        path (str): Destination file; its directory is created if needed.
+        write (callable): Called with a temporary path in the destination directory, to write the content there.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)  # An interrupted write leaves no temporary file behind
+        raise
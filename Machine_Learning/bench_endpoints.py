@@ -0,0 +1,269 @@
+"""
+Latency and throughput benchmark of the API endpoints, with a regression gate.
+
+Each endpoint is driven by an async load generator at fixed concurrency
+levels: that many clients send requests back to back until the request count
+is reached. Requests go to the app in-process through httpx's ASGI transport
+(the checked-in models and CSVs, no network), or to a running server with
+--url. For every endpoint and concurrency the p50/p95/p99 latency, throughput,
+error count and the process RSS are recorded as JSON. A saved baseline can be
+compared against, and the command exits with status 1 when a metric regresses
+beyond its threshold (status 2 when there is no baseline).
+
+    python bench_endpoints.py                              # print the results
+    python bench_endpoints.py --save-baseline              # record benchmarks/endpoints_baseline.json
+    python bench_endpoints.py --compare                    # fail on regressions against it
+    python bench_endpoints.py --url http://127.0.0.1:8000  # drive a running server
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import warnings
+import numpy as np
+import httpx
+from memory_profile import rss_mb
+
+BASELINE_PATH = 'benchmarks/endpoints_baseline.json'
+RESULTS_PATH = 'benchmarks/endpoints_latest.json'
+
+# Endpoint name -> request; 'max_requests' caps the request count of slow endpoints
+ENDPOINTS = {
+    'rain_prediction': {
+        'method': 'POST', 'path': '/rain_prediction',
+        'json': {'max_temp': 25.0, 'min_temp': 12.0, 'rainfall': 1.2},
+    },
+    'temperature_prediction': {
+        'method': 'POST', 'path': '/temperature_prediction',
+        'json': {'temperature_max': 25.0, 'temperature_min': 12.0, 'rain_sum': 1.2,
+                 'relative_humidity_mean': 65.0, 'relative_humidity_max': 90.0, 'relative_humidity_min': 40.0},
+    },
+    'weather_prediction': {
+        'method': 'POST', 'path': '/weather_prediction',
+        'json': {'minimum_temp': 12.0, 'maximum_temp': 25.0, 'rainfall': 0.0, 'nine_am_humidity': 70.0},
+    },
+    'heatwave_prediction': {
+        'method': 'POST', 'path': '/heatwave_prediction',
+        'json': {'min_temp': 22.0, 'max_temp': 38.0},
+    },
+    'forecast_bundle': {
+        'method': 'POST', 'path': '/forecast_bundle',
+        'json': {'max_temp': 25.0, 'min_temp': 12.0, 'rainfall': 1.2, 'relative_humidity_mean': 65.0,
+                 'relative_humidity_max': 90.0, 'relative_humidity_min': 40.0, 'nine_am_humidity': 70.0},
+    },
+    'forecast': {
+        'method': 'GET', 'path': '/forecast', 'params': {'station_id': '086282'},
+    },
+    'nearest_stations': {
+        'method': 'GET', 'path': '/nearest_stations', 'params': {'city': 'Melbourne', 'k': 3},
+    },
+    'heatwave_events': {
+        'method': 'GET', 'path': '/heatwave_events', 'params': {'start': '2000-01-01', 'end': '2024-12-31'},
+    },
+    'climatology': {
+        'method': 'GET', 'path': '/climatology', 'params': {'start_year': 1990, 'end_year': 2020},
+    },
+    'probability_distribution': {
+        'method': 'GET', 'path': '/probability_distribution', 'max_requests': 50,
+    },
+    'clusters_visualization': {
+        'method': 'GET', 'path': '/clusters_visualization', 'max_requests': 10,
+    },
+}
+
+# Metric -> direction a regression goes in
+METRICS = {'p50_ms': 'up', 'p95_ms': 'up', 'p99_ms': 'up', 'throughput_rps': 'down', 'rss_mb': 'up'}
+
+
+async def drive(client, spec, concurrency, n_requests):
+    """
+    Send n_requests requests from `concurrency` clients sending back to back.
+
+    Args:
+        client (httpx.AsyncClient): Client bound to the app or server.
+        spec (dict): Endpoint request from ENDPOINTS.
+        concurrency (int): Number of concurrent clients.
+        n_requests (int): Total number of requests.
+
+    Returns:
+        tuple: (latencies in seconds, number of failed requests, wall-clock seconds).
+    """
+    latencies = np.zeros(n_requests)
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal errors, next_request
+        while next_request < n_requests:
+            i, next_request = next_request, next_request + 1
+            start = time.perf_counter()
+            try:
+                response = await client.request(spec['method'], spec['path'], json=spec.get('json'),
+                                                params=spec.get('params'))
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies[i] = time.perf_counter() - start
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarize(latencies, errors, seconds, rss):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': int(errors),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'throughput_rps': round(len(latencies) / seconds, 2),
+        'rss_mb': None if rss is None else round(rss, 1),
+    }
+
+
+async def run_benchmarks(endpoints, concurrency_levels, n_requests, warmup, url=None):
+    """
+    Benchmark endpoints at each concurrency level.
+
+    Args:
+        endpoints (list): Endpoint names in ENDPOINTS.
+        concurrency_levels (list): Numbers of concurrent clients.
+        n_requests (int): Requests per endpoint and level (capped by the endpoint's max_requests).
+        warmup (int): Untimed requests per endpoint before measuring.
+        url (str): Base URL of a running server, or None to run the app in-process.
+
+    Returns:
+        dict: Endpoint name -> concurrency (as a string) -> metrics.
+    """
+    if url is None:
+        from main import app  # Loads the checked-in models, as the server does at startup
+        transport, base_url = httpx.ASGITransport(app=app), 'http://bench'
+    else:
+        transport, base_url = None, url
+
+    results = {}
+    limits = httpx.Limits(max_connections=max(concurrency_levels))
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60, limits=limits) as client:
+        for name in endpoints:
+            spec = ENDPOINTS[name]
+            count = min(n_requests, spec.get('max_requests', n_requests))
+            await drive(client, spec, 1, min(warmup, count))
+            results[name] = {}
+            for concurrency in concurrency_levels:
+                latencies, errors, seconds = await drive(client, spec, concurrency, count)
+                # The server's memory is only visible in-process
+                rss = rss_mb() if url is None else None
+                results[name][str(concurrency)] = summarize(latencies, errors, seconds, rss)
+    return results
+
+
+def compare(results, baseline, latency_threshold=0.25, throughput_threshold=0.2, rss_threshold=0.2, min_delta_ms=1.0):
+    """
+    Find metrics that regressed against a baseline.
+
+    Latencies only count as regressions when they also grew by more than
+    min_delta_ms, so sub-millisecond jitter does not fail the gate.
+
+    Args:
+        results (dict): Results of run_benchmarks.
+        baseline (dict): Results saved earlier.
+        latency_threshold (float): Allowed relative increase of p50/p95/p99.
+        throughput_threshold (float): Allowed relative decrease of throughput.
+        rss_threshold (float): Allowed relative increase of RSS.
+        min_delta_ms (float): Smallest latency increase in ms that counts.
+
+    Returns:
+        list: One message per regression.
+    """
+    thresholds = {'throughput_rps': throughput_threshold, 'rss_mb': rss_threshold}
+    regressions = []
+    for name, levels in results.items():
+        for concurrency, metrics in levels.items():
+            base = baseline.get(name, {}).get(concurrency)
+            if base is None:
+                continue
+            if metrics['errors'] > base['errors']:
+                regressions.append(f"{name} @{concurrency}: errors {base['errors']} -> {metrics['errors']}")
+            for metric, direction in METRICS.items():
+                old, new = base.get(metric), metrics.get(metric)
+                if old is None or new is None:
+                    continue
+                limit = thresholds.get(metric, latency_threshold)
+                if direction == 'up':
+                    regressed = new > old * (1 + limit) and (metric == 'rss_mb' or new - old > min_delta_ms)
+                else:
+                    regressed = new < old * (1 - limit)
+                if regressed:
+                    regressions.append(f"{name} @{concurrency}: {metric} {old} -> {new} ({(new - old) / old:+.0%})")
+    return regressions
+
+
+def format_results(results):
+    lines = [f"{'endpoint':<26}{'conc':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}{'RSS MB':>9}"]
+    for name, levels in results.items():
+        for concurrency, m in levels.items():
+            rss = '-' if m['rss_mb'] is None else f"{m['rss_mb']:.1f}"
+            lines.append(f"{name:<26}{concurrency:>5}{m['p50_ms']:>10.2f}{m['p95_ms']:>10.2f}{m['p99_ms']:>10.2f}"
+                         f"{m['throughput_rps']:>10.1f}{m['errors']:>8}{rss:>9}")
+    return "\n".join(lines)
+
+
+def write_json(results, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API endpoints and gate on regressions.")
+    parser.add_argument('--endpoints', nargs='+', choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help="Concurrency levels")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint and level")
+    parser.add_argument('--warmup', type=int, default=10, help="Untimed requests per endpoint")
+    parser.add_argument('--url', help="Base URL of a running server (default: run the app in-process)")
+    parser.add_argument('--output', default=RESULTS_PATH, help="Where to write the results")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument('--save-baseline', action='store_true', help="Also save the results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="Exit with status 1 if a metric regressed")
+    parser.add_argument('--latency-threshold', type=float, default=0.25, help="Allowed relative latency increase")
+    parser.add_argument('--throughput-threshold', type=float, default=0.2, help="Allowed relative throughput decrease")
+    parser.add_argument('--rss-threshold', type=float, default=0.2, help="Allowed relative RSS increase")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help="Smallest latency increase that counts")
+    args = parser.parse_args()
+
+    # Check before the run, which takes minutes, that there is a baseline to compare with
+    if args.compare and not args.save_baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run once with --save-baseline first", file=sys.stderr)
+        sys.exit(2)
+
+    # Keep the warnings scikit-learn may raise in the handlers out of the report
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        results = asyncio.run(run_benchmarks(args.endpoints, args.concurrency, args.requests, args.warmup, args.url))
+
+    print(format_results(results))
+    write_json(results, args.output)
+    if args.save_baseline:
+        write_json(results, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.latency_threshold, args.throughput_threshold,
+                              args.rss_threshold, args.min_delta_ms)
+        for message in regressions:
+            print("REGRESSION", message)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
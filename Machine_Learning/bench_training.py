@@ -0,0 +1,163 @@
+"""
+Scaling benchmark of the preprocessing and training stages on synthetic data.
+
+For each scale (number of synthetic stations, see synthetic_data.py) a data
+directory is generated and every selected pipeline stage is run in it as its
+own process, in pipeline order. Each stage's wall-clock time and peak RSS
+(from the kernel's accounting of the finished child) are recorded, so the
+growth of time and memory with the data size can be read per stage.
+
+A forked child's peak RSS starts from its parent's RSS, so this harness only
+uses the standard library, and the data is generated in a subprocess too:
+the floor of every measurement is a bare interpreter, not pandas and SciPy.
+
+    python bench_training.py --stations 1 10 100
+    python bench_training.py --stations 1 100 --stages rainfall_preprocess heatwave --keep /tmp/bench
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pipeline import STAGES
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = 'benchmarks/training_scaling.json'
+
+# Preprocessing and training stages, in pipeline order
+DEFAULT_STAGES = ['rainfall_preprocess', 'temperature_train_test', 'weather_preprocess', 'feature_store',
+                  'temperature', 'weather_conditions', 'rainfall_yes_no', 'heatwave']
+
+
+def run_stage(stage, root, timeout=None):
+    """
+    Run a pipeline stage in a data directory and measure it.
+
+    Args:
+        stage (Stage): Stage from pipeline.STAGES.
+        root (str): Data directory to run in.
+        timeout (float): Seconds after which the stage is killed (None for no limit).
+
+    Returns:
+        dict: seconds, peak RSS in MB, exit code and whether the stage timed out.
+    """
+    env = dict(os.environ, MPLBACKEND='Agg')
+    env.pop('STAGE_CACHE_DIR', None)  # Measure the stages themselves, not cache hits
+    command = [sys.executable, os.path.join(HERE, stage.command[0])] + stage.command[1:]
+
+    with open(os.path.join(root, f'{stage.name}.log'), 'w') as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=root, env=env, stdout=log, stderr=subprocess.STDOUT)
+        timer = threading.Timer(timeout, process.kill) if timeout else None
+        if timer:
+            timer.start()
+        # wait4 returns the child's own resource usage, including its peak RSS (which
+        # counts the pages inherited at fork, hence the light harness)
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+        if timer:
+            timer.cancel()
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    return {
+        'seconds': round(seconds, 3),
+        'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),  # KB on Linux
+        'exit_code': process.returncode,
+        'timed_out': bool(timeout) and process.returncode < 0 and seconds >= timeout,
+    }
+
+
+def bench_scale(stations, stage_names, years=None, timeout=None, root=None):
+    """
+    Generate data for one scale and run the stages in it.
+
+    Args:
+        stations (int): Number of synthetic stations.
+        stage_names (list): Stage names to run, in pipeline order.
+        years (float): Years per station (default: the spans of the real files).
+        timeout (float): Per-stage timeout in seconds.
+        root (str): Data directory to use and keep (default: a temporary one, removed afterwards).
+
+    Returns:
+        dict: Rows per dataset, generation time and per-stage measurements.
+    """
+    keep = root is not None
+    root = root or tempfile.mkdtemp(prefix='bench-training-')
+    try:
+        # In a subprocess: importing pandas here would inflate every stage's peak RSS
+        start = time.perf_counter()
+        command = [sys.executable, os.path.join(HERE, 'synthetic_data.py'), root, '--stations', str(stations), '--json']
+        if years is not None:
+            command += ['--years', str(years)]
+        rows = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout)
+        result = {'stations': stations, 'rows': rows, 'generate_seconds': round(time.perf_counter() - start, 3),
+                  'stages': {}}
+
+        by_name = {stage.name: stage for stage in STAGES}
+        for name in stage_names:
+            measured = run_stage(by_name[name], root, timeout)
+            result['stages'][name] = measured
+            print(f"  {name:<24}{measured['seconds']:>10.2f}s{measured['peak_rss_mb']:>10.1f} MB"
+                  + ('' if measured['exit_code'] == 0 else f"  FAILED ({measured['exit_code']}), see {name}.log"))
+            if measured['exit_code'] != 0:
+                break  # Later stages read this stage's outputs
+        return result
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def format_results(results):
+    """
+    Format the stage times and memory of every scale as a table.
+
+    Args:
+        results (list): Results of bench_scale.
+
+    Returns:
+        str: One row per stage, one time and memory column pair per scale.
+    """
+    stages = [name for name in DEFAULT_STAGES if any(name in r['stages'] for r in results)]
+    header = f"{'stage':<24}" + ''.join(f"{str(r['stations']) + ' st. s':>12}{'MB':>8}" for r in results)
+    lines = [header]
+    for name in stages:
+        cells = []
+        for r in results:
+            m = r['stages'].get(name)
+            cells.append(f"{'-':>12}{'-':>8}" if m is None else f"{m['seconds']:>12.2f}{m['peak_rss_mb']:>8.0f}")
+        lines.append(f"{name:<24}" + ''.join(cells))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile the training stages at several data scales.")
+    parser.add_argument('--stations', type=int, nargs='+', default=[1, 10], help="Scales, in synthetic stations")
+    parser.add_argument('--years', type=float, default=None, help="Years per station (default: real spans)")
+    parser.add_argument('--stages', nargs='+', choices=DEFAULT_STAGES, default=DEFAULT_STAGES, help="Stages to run")
+    parser.add_argument('--timeout', type=float, default=None, help="Per-stage timeout in seconds")
+    parser.add_argument('--keep', metavar='DIR', help="Keep the generated data under DIR/<stations>")
+    parser.add_argument('--output', default=RESULTS_PATH, help="Where to write the results")
+    args = parser.parse_args()
+
+    stage_names = [name for name in DEFAULT_STAGES if name in args.stages]
+    results = []
+    for stations in args.stations:
+        print(f"{stations} station(s):")
+        root = os.path.join(args.keep, str(stations)) if args.keep else None
+        results.append(bench_scale(stations, stage_names, args.years, args.timeout, root))
+
+    print()
+    print(format_results(results))
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
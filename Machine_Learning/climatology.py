@@ -0,0 +1,237 @@
+"""
+Precomputed climatology cube for historical range queries.
+
+For each station, additive statistics of the daily series (day counts,
+rainfall totals, rainy days, temperature sums) are aggregated once into a
+year × month × statistic cube, with prefix sums along the years. Any
+year range and month range is then answered from two prefix-sum rows per
+month, without rescanning the daily data. New days are added to their cells
+incrementally and only the prefix sums from the earliest changed year on are
+refreshed. New days are recorded in rainfall/ingested_days.csv, the ingest
+CSV of rolling_state.py, which builds read after the source CSV, so a
+rebuild by the pipeline keeps them.
+
+    python climatology.py build                    # build model/climatology.joblib
+    python climatology.py update --data new_days.csv
+    python climatology.py query --years 1990 2020 --months 12 2
+"""
+
+import argparse
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from atomic_write import atomic_write
+from rolling_state import ingest_days, ingested_after, read_source
+
+CLIMATOLOGY_FILE = 'climatology.joblib'
+
+RAINFALL = 'Rainfall amount (millimetres)'
+MAX_TEMP = 'Maximum temperature (Degree C)'
+MIN_TEMP = 'Minimum temperature (Degree C)'
+
+# Additive statistics stored per year and month
+STATS = ['days', 'rain_days_observed', 'rain_sum', 'rainy_days', 'max_temp_days', 'max_temp_sum',
+         'min_temp_days', 'min_temp_sum']
+
+
+def daily_stats(df):
+    """
+    Per-day contribution of each statistic.
+
+    Args:
+        df (pd.DataFrame): Data in the temperature_rainfall.csv schema.
+
+    Returns:
+        ndarray: (rows, len(STATS)) contributions.
+    """
+    rain = df[RAINFALL].to_numpy(dtype=float)
+    max_temp = df[MAX_TEMP].to_numpy(dtype=float)
+    min_temp = df[MIN_TEMP].to_numpy(dtype=float)
+    return np.column_stack([
+        np.ones(len(df)),
+        ~np.isnan(rain),
+        np.nan_to_num(rain),
+        rain > 0,
+        ~np.isnan(max_temp),
+        np.nan_to_num(max_temp),
+        ~np.isnan(min_temp),
+        np.nan_to_num(min_temp),
+    ]).astype(float)
+
+
+class ClimatologyCube:
+    """
+    Year × month × statistic aggregates of one station's daily series.
+    """
+
+    def __init__(self, first_year):
+        self.first_year = first_year
+        self.cube = np.zeros((0, 12, len(STATS)))
+        self.prefix = np.zeros((1, 12, len(STATS)))  # prefix[i] = sum of cube[:i]
+        self.last_date = None
+
+    @property
+    def last_year(self):
+        return self.first_year + len(self.cube) - 1
+
+    def add_days(self, df):
+        """
+        Add new daily observations, skipping days already aggregated.
+
+        Args:
+            df (pd.DataFrame): Data in the temperature_rainfall.csv schema.
+
+        Returns:
+            int: Number of days added.
+        """
+        keys = (df['Year'] * 10000 + df['Month'] * 100 + df['Day']).to_numpy()
+        if self.last_date is not None:
+            df, keys = df[keys > self.last_date], keys[keys > self.last_date]
+        if len(df) == 0:
+            return 0
+
+        years = df['Year'].to_numpy()
+        if years.max() > self.last_year:
+            grow = years.max() - self.last_year
+            self.cube = np.concatenate([self.cube, np.zeros((grow, 12, len(STATS)))])
+            self.prefix = np.concatenate([self.prefix, np.zeros((grow, 12, len(STATS)))])
+
+        # Scatter-add every day into its (year, month) cell in one pass
+        np.add.at(self.cube, (years - self.first_year, df['Month'].to_numpy() - 1), daily_stats(df))
+
+        # Only prefix sums from the earliest changed year on need refreshing
+        start = years.min() - self.first_year
+        self.prefix[start + 1:] = self.prefix[start] + np.cumsum(self.cube[start:], axis=0)
+        self.last_date = int(keys.max())
+        return len(df)
+
+    def totals(self, start_year=None, end_year=None):
+        """
+        Sum of each statistic per calendar month over a range of years.
+
+        Args:
+            start_year (int): First year (default: first year of data).
+            end_year (int): Last year (default: last year of data).
+
+        Returns:
+            ndarray: (12, len(STATS)) totals.
+        """
+        lo = 0 if start_year is None else min(max(start_year - self.first_year, 0), len(self.cube))
+        hi = len(self.cube) if end_year is None else min(max(end_year - self.first_year + 1, 0), len(self.cube))
+        return self.prefix[max(hi, lo)] - self.prefix[lo]
+
+    def query(self, start_year=None, end_year=None, start_month=1, end_month=12):
+        """
+        Climatology of a year range and a month range.
+
+        The month range wraps around the year when start_month > end_month (e.g. 12 to 2).
+
+        Args:
+            start_year (int): First year.
+            end_year (int): Last year.
+            start_month (int): First month (1-12).
+            end_month (int): Last month (1-12).
+
+        Returns:
+            dict: 'by_month' list and 'overall' summary of derived statistics.
+        """
+        if start_month <= end_month:
+            months = list(range(start_month, end_month + 1))
+        else:
+            months = list(range(start_month, 13)) + list(range(1, end_month + 1))
+
+        totals = self.totals(start_year, end_year)
+        by_month = [{'month': m, **summarize(totals[m - 1])} for m in months]
+        return {'by_month': by_month, 'overall': summarize(totals[[m - 1 for m in months]].sum(axis=0))}
+
+    def save(self, path):
+        # Saved as a plain attribute dict, so files written from the command line (where
+        # this class lives in __main__) load from any module
+        atomic_write(path, lambda tmp_path: joblib.dump(vars(self), tmp_path))
+
+    @classmethod
+    def load(cls, path):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(joblib.load(path))
+        return obj
+
+
+def summarize(totals):
+    """
+    Derive means and ratios from summed statistics.
+
+    Args:
+        totals (ndarray): One value per statistic in STATS.
+
+    Returns:
+        dict: Days, total and mean daily rainfall, rainy-day ratio and mean temperatures.
+    """
+    t = dict(zip(STATS, totals))
+
+    def ratio(a, b):
+        return round(float(a / b), 3) if b else None
+
+    return {
+        'days': int(t['days']),
+        'total_rainfall': round(float(t['rain_sum']), 1),
+        'mean_daily_rainfall': ratio(t['rain_sum'], t['rain_days_observed']),
+        'rainy_day_ratio': ratio(t['rainy_days'], t['rain_days_observed']),
+        'mean_max_temp': ratio(t['max_temp_sum'], t['max_temp_days']),
+        'mean_min_temp': ratio(t['min_temp_sum'], t['min_temp_days']),
+    }
+
+
+def build_cube(df):
+    """
+    Build a station's cube from its whole daily series.
+
+    Args:
+        df (pd.DataFrame): Data in the temperature_rainfall.csv schema.
+
+    Returns:
+        ClimatologyCube: The aggregated cube.
+    """
+    cube = ClimatologyCube(int(df['Year'].min()))
+    cube.add_days(df.sort_values(['Year', 'Month', 'Day'], kind='stable'))
+    return cube
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, update or query the climatology cube.")
+    parser.add_argument('command', choices=['build', 'update', 'query'])
+    parser.add_argument('--data', help="Build: daily observations (default: rainfall/temperature_rainfall.csv and "
+                                       "its ingested days); update: new days")
+    parser.add_argument('--output', default=f'model/{CLIMATOLOGY_FILE}', help="Cube file")
+    parser.add_argument('--years', type=int, nargs=2, metavar=('FIRST', 'LAST'), help="Query: year range")
+    parser.add_argument('--months', type=int, nargs=2, default=[1, 12], metavar=('FIRST', 'LAST'),
+                        help="Query: month range (wraps when FIRST > LAST)")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        cube = build_cube(pd.read_csv(args.data) if args.data else read_source('rainfall'))
+        cube.save(args.output)
+        print(f"Built {cube.first_year}-{cube.last_year} climatology to {args.output}")
+    elif args.command == 'update':
+        if not args.data:
+            parser.error("update needs the new days (--data)")
+        cube = ClimatologyCube.load(args.output)
+        try:
+            ingest_days('rainfall', pd.read_csv(args.data))
+        except ValueError as e:
+            parser.error(f"{args.data}: {e}")
+        # Ingested days missing from the cube, also those ingested by rolling_state.py
+        last_day = pd.to_datetime(str(cube.last_date), format='%Y%m%d') if cube.last_date is not None else None
+        added = cube.add_days(ingested_after('rainfall', last_day))
+        cube.save(args.output)
+        print(f"Added {added} days to {args.output}")
+    else:
+        cube = ClimatologyCube.load(args.output)
+        years = args.years or [None, None]
+        result = cube.query(years[0], years[1], *args.months)
+        print(pd.DataFrame(result['by_month']).to_string(index=False))
+        print("overall:", result['overall'])
+
+
+if __name__ == "__main__":
+    main()
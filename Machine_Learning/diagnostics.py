@@ -0,0 +1,149 @@
+"""
+Headless rendering of training diagnostics.
+
+By default the training scripts show their plots interactively. With
+--headless, plots are saved as static files instead and are rendered on a
+background worker once the model artifact has been saved, so they never sit on
+the critical path of an automated retraining. --no-diagnostics skips them.
+"""
+
+import os
+import queue
+import threading
+import pandas as pd
+import matplotlib
+
+_output_dir = None
+_enabled = True
+_queue = queue.Queue()
+_worker = None
+
+
+def add_arguments(parser):
+    """
+    Add the diagnostics command-line options to a training script's parser.
+
+    Args:
+        parser (argparse.ArgumentParser): The script's argument parser.
+    """
+    parser.add_argument('--headless', action='store_true',
+                        help="Save diagnostics as static files in the background instead of showing them")
+    parser.add_argument('--diagnostics-dir', default='diagnostics',
+                        help="Directory for headless diagnostics (default: diagnostics)")
+    parser.add_argument('--no-diagnostics', action='store_true', help="Skip all diagnostics")
+
+
+def configure(args, name):
+    """
+    Configure diagnostics from parsed command-line options.
+
+    Args:
+        args (argparse.Namespace): Options added by add_arguments.
+        name (str): Training script name, used as the output sub-directory.
+    """
+    global _output_dir, _enabled
+    _enabled = not args.no_diagnostics
+    if args.headless or args.no_diagnostics:
+        # Non-interactive backend: nothing ever opens a window or blocks
+        matplotlib.use('Agg', force=True)
+        _output_dir = os.path.join(args.diagnostics_dir, name)
+        if _enabled:
+            os.makedirs(_output_dir, exist_ok=True)
+
+
+def is_headless():
+    return _output_dir is not None
+
+
+def defer(func, *args, **kwargs):
+    """
+    Run a diagnostic now when interactive, or queue it for the background worker.
+
+    DataFrame and Series arguments are copied when queued, so later steps of the
+    training script can keep modifying their data.
+
+    Args:
+        func (callable): The plotting function.
+        *args: Positional arguments for func.
+        **kwargs: Keyword arguments for func.
+    """
+    if not _enabled:
+        return
+    if not is_headless():
+        func(*args, **kwargs)
+        return
+
+    def snapshot(value):
+        return value.copy() if isinstance(value, (pd.DataFrame, pd.Series)) else value
+
+    _queue.put((func, [snapshot(a) for a in args], {k: snapshot(v) for k, v in kwargs.items()}))
+
+
+def _render():
+    # A single worker renders every diagnostic, so pyplot is never used from two threads
+    while True:
+        task = _queue.get()
+        if task is None:
+            return
+        func, args, kwargs = task
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            print(f"Error rendering diagnostic {func.__name__}: {e}")
+
+
+def flush():
+    """
+    Start rendering queued diagnostics on the background worker.
+
+    Call this once the model artifact has been saved; diagnostics deferred
+    afterwards are rendered as soon as the worker reaches them.
+    """
+    global _worker
+    if is_headless() and _worker is None:
+        _worker = threading.Thread(target=_render, name='diagnostics')
+        _worker.start()
+
+
+def wait():
+    """
+    Wait for the background worker to finish writing diagnostics.
+    """
+    global _worker
+    if not is_headless():
+        return
+    flush()
+    _queue.put(None)
+    _worker.join()
+    _worker = None
+    if _enabled:
+        print(f"Diagnostics written to {_output_dir}")
+
+
+def show(name, fig=None):
+    """
+    Show a figure interactively, or save it to the diagnostics directory in headless mode.
+
+    Args:
+        name (str): File name (without extension) for the saved figure.
+        fig: A plotly figure. If None, all open matplotlib figures are shown or saved.
+    """
+    # Imported here so the backend chosen in configure() is in effect
+    import matplotlib.pyplot as plt
+
+    if fig is not None:
+        if is_headless():
+            fig.write_html(os.path.join(_output_dir, f"{name}.html"))
+        else:
+            fig.show()
+        return
+
+    if not is_headless():
+        plt.show()
+        return
+
+    numbers = plt.get_fignums()
+    for i, number in enumerate(numbers):
+        suffix = f"_{i + 1}" if len(numbers) > 1 else ""
+        plt.figure(number).savefig(os.path.join(_output_dir, f"{name}{suffix}.png"), bbox_inches='tight')
+    plt.close('all')
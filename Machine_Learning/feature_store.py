@@ -0,0 +1,154 @@
+"""
+Feature store shared by the training scripts and the API.
+
+Calendar and lag features are defined here once. The trainers apply the same
+functions to their training data, and the features of a station's daily
+observations are persisted by date next to its models (model/features.npz
+for the default models). The API looks up a single day by date in O(1), so a
+feature such as Previous_Rainfall has the same definition at training and
+serving time.
+
+    python feature_store.py                        # build model/features.npz
+    python feature_store.py --lookup 2024-09-01
+"""
+
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+from rolling_state import read_source
+
+FEATURES_FILE = 'features.npz'
+
+RAINFALL = 'Rainfall amount (millimetres)'
+MAX_TEMP = 'Maximum temperature (Degree C)'
+MIN_TEMP = 'Minimum temperature (Degree C)'
+
+
+def add_calendar_features(df, column='Datetime'):
+    """
+    Parse a datetime column and add Year, Month, Day and Hour columns.
+
+    Args:
+        df (DataFrame): Data with a datetime column.
+        column (str): Name of the datetime column.
+
+    Returns:
+        DataFrame: The same DataFrame, with the column converted to naive datetimes.
+    """
+    dates = pd.to_datetime(df[column], utc=True)
+    df['Year'] = dates.dt.year
+    df['Month'] = dates.dt.month
+    df['Day'] = dates.dt.day
+    df['Hour'] = dates.dt.hour  # Always 0 for daily observations
+    df[column] = dates.dt.tz_localize(None)  # Remove timezone info for simplicity
+    return df
+
+
+def calendar_row(date):
+    """
+    Calendar features of a single day, as add_calendar_features computes them.
+
+    Args:
+        date (datetime.date): The day.
+
+    Returns:
+        dict: Year, Month, Day and Hour (0 for a daily prediction).
+    """
+    return {'Year': date.year, 'Month': date.month, 'Day': date.day, 'Hour': 0}
+
+
+def add_lag_features(df):
+    """
+    Add the previous day's rainfall to daily observations, oldest first.
+
+    Args:
+        df (DataFrame): Data in the temperature_rainfall.csv schema, with missing rainfall filled.
+
+    Returns:
+        DataFrame: The same DataFrame with a Previous_Rainfall column (NaN on the first row).
+    """
+    df['Previous_Rainfall'] = df[RAINFALL].shift(1)  # Shift for previous day's rainfall
+    return df
+
+
+class FeatureStore:
+    """
+    Daily features of one station, addressable by date.
+    """
+
+    def __init__(self, dates, columns):
+        """
+        Args:
+            dates (ndarray): datetime64[D] date of each row.
+            columns (dict): Feature name -> ndarray with one value per row.
+        """
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.columns = columns
+        # Days since the epoch -> row, for constant-time point lookups
+        self.index = {day: row for row, day in enumerate(self.dates.astype(np.int64).tolist())}
+
+    @classmethod
+    def build(cls, rainfall_df):
+        """
+        Compute every feature from a station's observations in one pass.
+
+        Args:
+            rainfall_df (DataFrame): Data in the temperature_rainfall.csv schema.
+
+        Returns:
+            FeatureStore: The station's features.
+        """
+        df = rainfall_df.sort_values(['Year', 'Month', 'Day'], kind='stable').reset_index(drop=True)
+        df[RAINFALL] = df[RAINFALL].fillna(0)
+        df = add_lag_features(df)
+        dates = pd.to_datetime(df[['Year', 'Month', 'Day']]).to_numpy().astype('datetime64[D]')
+
+        columns = {name: df[name].to_numpy(dtype=float)
+                   for name in [MAX_TEMP, MIN_TEMP, RAINFALL, 'Previous_Rainfall']}
+        columns.update({name: df[name].to_numpy(dtype=np.int64) for name in ['Year', 'Month', 'Day']})
+        return cls(dates, columns)
+
+    def row(self, date):
+        """
+        Look up the features of one day.
+
+        Args:
+            date (datetime.date): The day.
+
+        Returns:
+            dict: Feature name -> value, or None if the day is not in the store.
+        """
+        i = self.index.get((date - datetime.date(1970, 1, 1)).days)
+        if i is None:
+            return None
+        return {name: values[i].item() for name, values in self.columns.items()}
+
+    def save(self, filepath):
+        np.savez_compressed(filepath, dates=self.dates, **self.columns)
+
+    @classmethod
+    def load(cls, filepath):
+        with np.load(filepath) as data:
+            return cls(data['dates'], {name: data[name] for name in data.files if name != 'dates'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query a station's feature store.")
+    parser.add_argument('--data', help="Daily observations (default: rainfall/temperature_rainfall.csv and its ingested days)")
+    parser.add_argument('--output', default=f'model/{FEATURES_FILE}', help="Feature store file")
+    parser.add_argument('--lookup', metavar='YYYY-MM-DD', help="Print the features of one day instead of building")
+    args = parser.parse_args()
+
+    if args.lookup:
+        row = FeatureStore.load(args.output).row(datetime.date.fromisoformat(args.lookup))
+        print(row if row is not None else f"No features for {args.lookup}")
+        return
+
+    store = FeatureStore.build(pd.read_csv(args.data) if args.data else read_source('rainfall'))
+    store.save(args.output)
+    print(f"Saved features of {len(store.dates):,} days ({store.dates[0]} to {store.dates[-1]}) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Precomputed next-day forecasts of every station, served by key lookup.
+
+Run after each ingest (it is the forecast_table stage of pipeline.py, which
+depends on the rolling states): every station's four models are run once on
+its latest rolling state, and the forecasts for the day after its last
+observation are saved to model/forecast_table.json. Stations sharing a model
+directory share one computation. The API loads the table into a dict keyed by
+(station, date), so `GET /forecast` is a single lookup; the models only run
+for days the table does not hold, and for custom inputs posted to the
+prediction endpoints.
+
+    python forecast_table.py
+    python forecast_table.py --lookup 086282
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import timedelta
+import joblib
+import numpy as np
+import pandas as pd
+from atomic_write import atomic_write
+from feature_store import calendar_row
+from rolling_state import RollingState, SOURCES, load_state
+from station_catalog import StationCatalog
+from weather_imputation import ImputationStats, IMPUTATION_FILE, OPTIONAL_COLUMNS
+
+TABLE_FILE = 'forecast_table.json'
+
+# Key of the forecasts of the default model directory, served when no station is given
+DEFAULT_STATION = 'default'
+
+MAX_TEMP = 'Maximum temperature (Degree C)'
+MIN_TEMP = 'Minimum temperature (Degree C)'
+RAINFALL = 'Rainfall amount (millimetres)'
+
+
+def load_station_state(model_dir, name):
+    """
+    Load a station's rolling state: the file in its model directory, or the default one.
+
+    Args:
+        model_dir (str): Station model directory.
+        name (str): State name in rolling_state.SOURCES.
+
+    Returns:
+        RollingState: The state.
+    """
+    path = os.path.join(model_dir, os.path.basename(SOURCES[name]['state_path']))
+    if os.path.normpath(path) != os.path.normpath(SOURCES[name]['state_path']) and os.path.exists(path):
+        return RollingState.load(path)
+    return load_state(name)
+
+
+def forecast_model_dir(model_dir):
+    """
+    Forecast the day after a model directory's latest observation with its four models.
+
+    The features are those of the "predict tomorrow" scripts: the rain and heatwave
+    models see the last observed day (the heatwave model unscaled, as it was fitted), the temperature model the all-time means of
+    its state, and the weather model the last observed day with the month's
+    defaults for its optional inputs.
+
+    Args:
+        model_dir (str): Directory with the models, scaler, imputation stats and (optionally) states.
+
+    Returns:
+        dict: date (ISO day) and rain, temperature, weather and heatwave forecasts,
+            in the response formats of the API's prediction endpoints.
+    """
+    rainfall = load_station_state(model_dir, 'rainfall')
+    temperature = load_station_state(model_dir, 'temperature')
+    day = rainfall.last_date + timedelta(days=1)
+    max_temp, min_temp, rain = rainfall.last(MAX_TEMP), rainfall.last(MIN_TEMP), rainfall.last(RAINFALL)
+
+    # Rain (yes/no), as rainfall_yes_no_prediction.py, with the API's 0.4 threshold
+    rain_model = joblib.load(os.path.join(model_dir, 'rainfall_model.joblib'))
+    probability = float(rain_model.predict_proba(pd.DataFrame([{
+        MAX_TEMP: max_temp, MIN_TEMP: min_temp, 'Previous_Rainfall': rain,
+    }]))[0][1])
+
+    # Mean temperature, as temperature_prediction.py
+    temperature_model = joblib.load(os.path.join(model_dir, 'temperature_model.joblib'))
+    temperature_scaler = joblib.load(os.path.join(model_dir, 'temperauture_scaler.joblib'))
+    calendar = calendar_row(day)
+    features = pd.DataFrame([{
+        **{column: temperature.mean(column) for column in temperature.columns},
+        'Month': calendar['Month'], 'Day': calendar['Day'], 'Hour': calendar['Hour'],
+    }])
+    predicted_temperature = float(temperature_model.predict(temperature_scaler.transform(features))[0])
+
+    # Weather condition of the last observed day's readings, defaults of the forecast day's month
+    weather_model = joblib.load(os.path.join(model_dir, 'weather_classifier_model.joblib'))
+    imputation_path = os.path.join(model_dir, IMPUTATION_FILE)
+    if not os.path.exists(imputation_path):
+        imputation_path = os.path.join('model', IMPUTATION_FILE)
+    weather_features = ImputationStats.load(imputation_path).fill(pd.DataFrame({
+        'Minimum temperature (°C)': [min_temp],
+        'Maximum temperature (°C)': [max_temp],
+        'Rainfall (mm)': [rain],
+        **{column: [np.nan] for column in OPTIONAL_COLUMNS},
+    }), [day.month])
+    condition = weather_model.predict(weather_features)[0]
+
+    # Heatwave cluster of the unscaled temperatures, as heatwave.py fitted the clusters
+    heatwave_model = joblib.load(os.path.join(model_dir, 'heatwave_model.joblib'))
+    cluster = int(heatwave_model.predict(pd.DataFrame([{MIN_TEMP: min_temp, MAX_TEMP: max_temp}]))[0])
+
+    return {
+        'date': day.isoformat(),
+        'rain': {'will_rain': 'Yes' if probability > 0.4 else 'No', 'score': probability},
+        'temperature': {'predicted_temperature': round(predicted_temperature)},
+        'weather': {'predicted_weather_condition': str(condition)},
+        'heatwave': {'cluster': cluster, 'heatwave': cluster == 1},
+        'observed': {'date': rainfall.last_date.isoformat(), 'max_temp': max_temp, 'min_temp': min_temp,
+                     'rainfall': rain},
+    }
+
+
+class ForecastTable:
+    """
+    Forecasts keyed by (station id, ISO date), with O(1) lookup.
+    """
+
+    def __init__(self, entries=None, built_at=None):
+        self.entries = {}
+        self.latest = {}  # station id -> its newest forecast day
+        self.built_at = built_at
+        for (station_id, _), forecast in (entries or {}).items():
+            self.put(station_id, forecast)
+
+    @classmethod
+    def build(cls, catalog, default_dir='model'):
+        """
+        Forecast every station of a catalog (and the default model directory).
+
+        Args:
+            catalog (StationCatalog): Stations with trained models.
+            default_dir (str): Model directory served when no station is given.
+
+        Returns:
+            ForecastTable: The table.
+        """
+        stations = [(DEFAULT_STATION, default_dir)] + list(zip(catalog.stations['station_id'],
+                                                               catalog.stations['model_dir']))
+        by_dir, entries = {}, {}
+        for station_id, model_dir in stations:
+            key = os.path.normpath(model_dir)
+            if key not in by_dir:
+                by_dir[key] = forecast_model_dir(model_dir)
+            forecast = by_dir[key]
+            entries[(station_id, forecast['date'])] = forecast
+        return cls(entries, time.time())
+
+    def get(self, station_id, day=None):
+        """
+        Look up a forecast.
+
+        Args:
+            station_id (str): Station id, or None for the default models.
+            day (datetime.date): Forecast day (default: the station's newest one).
+
+        Returns:
+            dict: The forecast, or None if the table does not hold it.
+        """
+        station_id = station_id or DEFAULT_STATION
+        key = day.isoformat() if day is not None else self.latest.get(station_id)
+        return self.entries.get((station_id, key))
+
+    def put(self, station_id, forecast):
+        """
+        Add or replace a forecast.
+
+        Args:
+            station_id (str): Station id, or None for the default models.
+            forecast (dict): Forecast, as made by forecast_model_dir.
+        """
+        station_id = station_id or DEFAULT_STATION
+        self.entries[(station_id, forecast['date'])] = forecast
+        if forecast['date'] > self.latest.get(station_id, ''):
+            self.latest[station_id] = forecast['date']
+
+    def to_dict(self):
+        return {
+            'built_at': self.built_at,
+            'forecasts': [{'station_id': station_id, **forecast}
+                          for (station_id, _), forecast in sorted(self.entries.items())],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        entries = {}
+        for record in data['forecasts']:
+            forecast = dict(record)
+            entries[(forecast.pop('station_id'), forecast['date'])] = forecast
+        return cls(entries, data.get('built_at'))
+
+    def save(self, path):
+        """
+        Atomically save the table as JSON.
+
+        Args:
+            path (str): Destination file.
+        """
+        def write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=1)
+
+        atomic_write(path, write)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+class ForecastTableFile:
+    """
+    A saved ForecastTable, reloaded when the file is replaced (e.g. by the pipeline after an ingest).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.table = ForecastTable()
+
+    def current(self):
+        """
+        Return the table, reloading it if the file changed since it was read.
+
+        Returns:
+            ForecastTable: The table (empty if the file does not exist).
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self.table
+        if mtime != self.mtime:
+            self.table = ForecastTable.load(self.path)
+            self.mtime = mtime
+        return self.table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute every station's next-day forecasts.")
+    parser.add_argument('--output', default=os.path.join('model', TABLE_FILE), help="Forecast table file")
+    parser.add_argument('--lookup', metavar='STATION', help=f"Print a station's forecasts (or {DEFAULT_STATION})")
+    args = parser.parse_args()
+
+    if args.lookup:
+        table = ForecastTable.load(args.output)
+        for (station_id, day), forecast in sorted(table.entries.items()):
+            if station_id == args.lookup:
+                print(json.dumps(forecast, indent=2))
+        return
+
+    start = time.perf_counter()
+    table = ForecastTable.build(StationCatalog.from_files())
+    table.save(args.output)
+    days = sorted({day for _, day in table.entries})
+    print(f"Saved {len(table.entries)} forecasts ({', '.join(days)}) to {args.output} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
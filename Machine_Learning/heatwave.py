@@ -1,6 +1,8 @@
 """
 Heatwave clustering
 """
+import argparse
+import os
 import pandas as pd
 import numpy as np
 import seaborn as sns
@@ -11,8 +13,14 @@ from sklearn.decomposition import PCA
 from scipy import stats
 from sklearn.metrics import silhouette_score
 import joblib
+from label_rules import label_heatwave
+from stage_timing import timed_stage
+from stage_cache import cached_stage
+import label_rules
+import diagnostics
 
 
+@cached_stage
 def load_data(file_path):
     """
     Load the temperature and rainfall data from a CSV file.
@@ -26,6 +34,7 @@ def load_data(file_path):
     return pd.read_csv(file_path, encoding='utf-8')
 
 
+@cached_stage
 def preprocess_data(data):
     """
     Preprocess the data by converting temperature columns to numeric,
@@ -78,7 +87,7 @@ def visualize_distribution(data):
     sns.histplot(data['Maximum temperature (Degree C)'], kde=True, bins=30)
     plt.xlabel('Maximum Temperature (Degree C)')
     plt.ylabel('Frequency')
-    plt.show()
+    diagnostics.show('temperature_distribution')
 
 def plot_correlation_heatmap(features):
     """
@@ -91,9 +100,10 @@ def plot_correlation_heatmap(features):
     plt.figure(figsize=(12, 8))
     sns.heatmap(corr, annot=True, cmap='coolwarm', fmt=".2f")
     plt.title('Correlation Heatmap')
-    plt.show()
+    diagnostics.show('correlation_heatmap')
 
 
+@cached_stage(depends=(label_rules,))
 def define_heatwave_conditions(data):
     """
     Define heatwave conditions based on temperature thresholds.
@@ -104,24 +114,20 @@ def define_heatwave_conditions(data):
     Returns:
         pd.DataFrame: Data with heatwave conditions marked.
     """
-    threshold_min = data['Minimum temperature (Degree C)'].quantile(0.90)  # 90th percentile for min temperature
-    threshold_max = data['Maximum temperature (Degree C)'].quantile(0.90)  # 90th percentile for max temperature
-
-    # Identify heatwave conditions for consecutive 3-day periods
-    data['Heatwave'] = (
-        (data['Minimum temperature (Degree C)'].rolling(window=3).mean() > threshold_min) &
-        (data['Maximum temperature (Degree C)'].rolling(window=3).mean() > threshold_max)
-    ).astype(int)  # Mark as 1 for heatwave conditions, otherwise 0
+    # Heatwave when the 3-day rolling means of both min and max temperature exceed
+    # their 90th percentiles (see HEATWAVE_RULES in label_rules.py)
+    data['Heatwave'] = label_heatwave(data)  # Mark as 1 for heatwave conditions, otherwise 0
     
     return data
 
 
-def apply_kmeans_clustering(data):
+def apply_kmeans_clustering(data, model_filepath='model/heatwave_model.joblib'):
     """
     Apply KMeans clustering to the temperature data.
     
     Args:
         data (pd.DataFrame): Data with temperature features.
+        model_filepath (str): File path to save the KMeans model.
     
     Returns:
         pd.DataFrame: Data with cluster labels added.
@@ -136,7 +142,7 @@ def apply_kmeans_clustering(data):
     data['Cluster'] = labels
 
     # Save the KMeans model to a file
-    joblib.dump(kmeans, 'model/heatwave_model.joblib')  
+    joblib.dump(kmeans, model_filepath)  
     
     return data
 
@@ -160,7 +166,7 @@ def visualize_clusters(data):
     plt.figure(figsize=(10, 6))
     sns.scatterplot(data=data, x='PCA1', y='PCA2', hue='Cluster', palette='coolwarm', s=100)
     plt.title('Clusters of Temperature Data')
-    plt.show()
+    diagnostics.show('clusters')
 
 
 def evaluate_clustering(data):
@@ -191,13 +197,44 @@ def visualize_heatwave_distribution(data):
     plt.figure(figsize=(10, 6))
     sns.countplot(x='Cluster', hue='Heatwave', data=data, palette='coolwarm')
     plt.title('Cluster Distribution of Heatwave Days')
-    plt.show()
+    diagnostics.show('heatwave_distribution')
+
+
+def train(output_dir='.', timings=None):
+    """
+    Train and save the heatwave clustering model without any plotting.
+
+    Args:
+        output_dir (str): Directory the model/ artifacts are written under.
+        timings (dict): Optional dict receiving the duration of each stage.
+
+    Returns:
+        list: Paths of the written artifacts, relative to output_dir.
+    """
+    model_path = 'model/heatwave_model.joblib'
+
+    with timed_stage(timings, 'load'):
+        data = load_data('rainfall/temperature_rainfall.csv')
+    with timed_stage(timings, 'preprocess'):
+        data_no_outliers = preprocess_data(data)
+        data_no_outliers = define_heatwave_conditions(data_no_outliers)
+    with timed_stage(timings, 'fit'):
+        data_no_outliers = apply_kmeans_clustering(data_no_outliers, os.path.join(output_dir, model_path))
+    with timed_stage(timings, 'evaluate'):
+        evaluate_clustering(data_no_outliers)
+
+    return [model_path]
 
 
 def main():
     """
     Main function to execute the data processing and analysis workflow.
     """
+    parser = argparse.ArgumentParser(description="Train the heatwave clustering model.")
+    diagnostics.add_arguments(parser)
+    args = parser.parse_args()
+    diagnostics.configure(args, 'heatwave')
+
     # Load data
     data = load_data('rainfall/temperature_rainfall.csv')
     
@@ -205,24 +242,28 @@ def main():
     data_no_outliers = preprocess_data(data)
     
     # Visualize data distribution
-    visualize_distribution(data_no_outliers)
+    diagnostics.defer(visualize_distribution, data_no_outliers)
     # Plot the correlation heatmap
-    plot_correlation_heatmap(data_no_outliers)
+    diagnostics.defer(plot_correlation_heatmap, data_no_outliers)
     
     # Define heatwave conditions
     data_no_outliers = define_heatwave_conditions(data_no_outliers)
     
     # Apply KMeans clustering
     data_no_outliers = apply_kmeans_clustering(data_no_outliers)
+
+    # The model is saved, so headless diagnostics can start rendering
+    diagnostics.flush()
     
     # Visualize clusters
-    visualize_clusters(data_no_outliers)
+    diagnostics.defer(visualize_clusters, data_no_outliers)
     
     # Evaluate clustering
     evaluate_clustering(data_no_outliers)
     
     # Visualize heatwave distribution
-    visualize_heatwave_distribution(data_no_outliers)
+    diagnostics.defer(visualize_heatwave_distribution, data_no_outliers)
+    diagnostics.wait()
 
 
 if __name__ == "__main__":
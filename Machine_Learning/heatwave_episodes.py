@@ -0,0 +1,150 @@
+"""
+Heatwave episode index.
+
+Labels the raw daily series with heatwave.py's rule (HEATWAVE_RULES of
+label_rules.py) on a complete calendar, and run-length encodes the labels into
+episodes (start date, end date, length in days, peak and mean temperatures) in
+one vectorized pass. Unlike the trainer's input, the series keeps the extreme
+days its outlier filter drops, so the peaks are the observed ones, and a day
+without a reading ends an episode. The episodes are stored next to the
+station's models. EpisodeIndex answers
+range queries with binary searches over the sorted episode bounds instead of
+scanning every day.
+
+    python heatwave_episodes.py                    # build model/heatwave_episodes.csv
+    python heatwave_episodes.py --from 2024-01-01 --to 2024-03-31
+"""
+
+import argparse
+import numpy as np
+import pandas as pd
+from label_rules import label_heatwave
+from rolling_state import read_source
+
+EPISODES_FILE = 'heatwave_episodes.csv'
+
+MIN_TEMP = 'Minimum temperature (Degree C)'
+MAX_TEMP = 'Maximum temperature (Degree C)'
+
+
+def daily_series(data):
+    """
+    Raw daily temperatures on a complete calendar, labelled with the heatwave rule.
+
+    The 3-day rolling means of the rule are taken over calendar days, so a
+    missing day leaves the three windows containing it unlabelled.
+
+    Args:
+        data (pd.DataFrame): Observations with Year, Month, Day and temperatures, in any order.
+
+    Returns:
+        pd.DataFrame: Temperatures and Heatwave, indexed by every day from the first to the last
+            observation (NaN temperatures on days without a reading).
+    """
+    series = pd.DataFrame({
+        MIN_TEMP: pd.to_numeric(data[MIN_TEMP], errors='coerce').to_numpy(),
+        MAX_TEMP: pd.to_numeric(data[MAX_TEMP], errors='coerce').to_numpy(),
+    }, index=pd.to_datetime(data[['Year', 'Month', 'Day']]))
+    series = series[~series.index.duplicated(keep='last')].sort_index().asfreq('D')
+    series['Heatwave'] = label_heatwave(series)
+    return series
+
+
+def build_episodes(series):
+    """
+    Run-length encode the heatwave labels into episodes.
+
+    Consecutive labelled calendar days form one episode.
+
+    Args:
+        series (pd.DataFrame): Result of daily_series.
+
+    Returns:
+        pd.DataFrame: One row per episode, ordered by start date.
+    """
+    labels = series['Heatwave'].to_numpy(dtype=np.int8)
+    dates = series.index.to_numpy().astype('datetime64[D]')
+
+    # Episode bounds are where the padded label series switches on (+1) and off (-1)
+    edges = np.diff(np.concatenate(([0], labels, [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)  # exclusive
+    days = ends - starts
+
+    episodes = {
+        'start_date': dates[starts],
+        'end_date': dates[ends - 1],
+        'days': days,
+    }
+    # Peaks with reduceat over [start, end) segments, means from prefix sums
+    bounds = np.column_stack([starts, ends]).ravel()
+    for column, name in [(MAX_TEMP, 'max_temp'), (MIN_TEMP, 'min_temp')]:
+        values = series[column].to_numpy(dtype=float)
+        padded = np.append(values, np.nan)  # reduceat needs end indices inside the array
+        # Labelled days have readings (their rolling windows are complete); days outside
+        # episodes may not, and must not turn the prefix sums into NaN
+        prefix = np.concatenate(([0.0], np.cumsum(np.nan_to_num(values))))
+        episodes[f'peak_{name}'] = np.maximum.reduceat(padded, bounds)[::2] if len(starts) else np.array([])
+        episodes[f'mean_{name}'] = (prefix[ends] - prefix[starts]) / np.maximum(days, 1)
+    return pd.DataFrame(episodes)
+
+
+def save_episodes(episodes, filepath):
+    episodes.round(3).to_csv(filepath, index=False)
+
+
+class EpisodeIndex:
+    """
+    Heatwave episodes of one station, queryable by date range.
+    """
+
+    def __init__(self, episodes):
+        self.episodes = episodes.sort_values('start_date', kind='stable').reset_index(drop=True)
+        # Episodes never overlap, so both bounds are sorted
+        self.starts = self.episodes['start_date'].to_numpy().astype('datetime64[D]')
+        self.ends = self.episodes['end_date'].to_numpy().astype('datetime64[D]')
+
+    @classmethod
+    def load(cls, filepath):
+        return cls(pd.read_csv(filepath, parse_dates=['start_date', 'end_date']))
+
+    def query(self, start=None, end=None, min_days=1):
+        """
+        Find the episodes overlapping a date range.
+
+        Args:
+            start (datetime.date): First day of the range (None for unbounded).
+            end (datetime.date): Last day of the range (None for unbounded).
+            min_days (int): Minimum episode length.
+
+        Returns:
+            pd.DataFrame: Matching episodes, ordered by start date.
+        """
+        lo = 0 if start is None else np.searchsorted(self.ends, np.datetime64(start, 'D'), side='left')
+        hi = len(self.starts) if end is None else np.searchsorted(self.starts, np.datetime64(end, 'D'), side='right')
+        found = self.episodes.iloc[lo:max(lo, hi)]
+        return found[found['days'] >= min_days] if min_days > 1 else found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the heatwave episode index.")
+    parser.add_argument('--data', help="Daily observations (default: rainfall/temperature_rainfall.csv and its ingested days)")
+    parser.add_argument('--output', default=f'model/{EPISODES_FILE}', help="Episode index file")
+    parser.add_argument('--from', dest='start', help="Query: first day (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='end', help="Query: last day (YYYY-MM-DD)")
+    parser.add_argument('--min-days', type=int, default=1, help="Query: minimum episode length")
+    args = parser.parse_args()
+
+    if args.start or args.end:
+        found = EpisodeIndex.load(args.output).query(args.start, args.end, args.min_days)
+        print(found.to_string(index=False) if len(found) else "No heatwave episodes in range")
+        return
+
+    data = pd.read_csv(args.data, encoding='utf-8') if args.data else read_source('rainfall')
+    episodes = build_episodes(daily_series(data))
+    save_episodes(episodes, args.output)
+    print(f"Saved {len(episodes)} heatwave episodes ({episodes['days'].sum()} days) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
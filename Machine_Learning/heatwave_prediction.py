@@ -1,69 +1,93 @@
 """
 Predicts Heatwave for tomorrow
+
+With --daemon, the prediction is made by prediction_daemon.py; pandas, scikit-learn
+and the model are then only imported and loaded if the daemon is not running.
 """
 
-import pandas as pd 
-import joblib   
-from sklearn.preprocessing import StandardScaler  
-from datetime import datetime, timedelta 
+import argparse
+from datetime import timedelta
+import prediction_daemon
 
 # Function to load the pre-trained model from a specified path
 def load_model(model_path):
-    return joblib.load(model_path)  
+    import joblib
+    return joblib.load(model_path)
 
 # Function to load data from a CSV file
 def load_data(file_path):
-    return pd.read_csv(file_path, encoding='utf-8')  
+    import pandas as pd
+    return pd.read_csv(file_path, encoding='utf-8')
 
 # Function to preprocess the data
 def preprocess_data(data):
+    import pandas as pd
+
     # Convert temperature columns to numeric, coerce errors to NaN
     data['Minimum temperature (Degree C)'] = pd.to_numeric(data['Minimum temperature (Degree C)'], errors='coerce')
     data['Maximum temperature (Degree C)'] = pd.to_numeric(data['Maximum temperature (Degree C)'], errors='coerce')
-    
+
     # Drop any rows with missing values
     data.dropna(inplace=True)
-    
-    # Select features for prediction
-    features = data[['Minimum temperature (Degree C)', 'Maximum temperature (Degree C)']]
-    
-    # Scale the features using StandardScaler for better model performance
-    scaler = StandardScaler()
-    data_scaled = scaler.fit_transform(features)  
-    return data_scaled  
+
+    # Select features for prediction, unscaled as heatwave.py fitted the clusters
+    return data[['Minimum temperature (Degree C)', 'Maximum temperature (Degree C)']]
 
 # Function to predict heatwave conditions using the trained model
-def predict_heatwave_conditions(model, data_scaled):
-    return model.predict(data_scaled) 
+def predict_heatwave_conditions(model, features):
+    return model.predict(features)
+
+# Function to predict tomorrow's heatwave conditions from the latest day of a rolling state
+def predict_tomorrow(model, state):
+    import pandas as pd
+
+    # Extract the most recent data entry from the rolling state of the temperature and rainfall data
+    today_data = pd.DataFrame([{
+        'Minimum temperature (Degree C)': state.last('Minimum temperature (Degree C)'),
+        'Maximum temperature (Degree C)': state.last('Maximum temperature (Degree C)'),
+    }])
 
-# Main function 
-def main():
-    # Load the heatwave prediction model
-    model = load_model('model/heatwave_model.joblib')
-    
-    # Load the temperature and rainfall data
-    data = load_data('rainfall/temperature_rainfall.csv')
-    
-    # Extract the most recent data entry
-    today_data = data.iloc[-1:]
-    
     # Preprocess the data for prediction
-    data_scaled = preprocess_data(today_data)
-    
+    features = preprocess_data(today_data)
+
     # Predict heatwave conditions
-    predictions = predict_heatwave_conditions(model, data_scaled)
-    
-    # Calculate tomorrow's date
-    tomorrow_date = (datetime.now() + timedelta(days=1)).date()
-    
+    predictions = predict_heatwave_conditions(model, features)
+
+    # The forecast day follows the state's last observation, as in forecast_table.py
+    tomorrow_date = state.last_date + timedelta(days=1)
+
     # Add predictions and date to today's data
     today_data.loc[:, 'Predicted Cluster'] = predictions
     today_data.loc[:, 'Date'] = tomorrow_date
-    
+    return today_data
+
+# Function to format the predictions as a readable table
+def format_predictions(today_data):
+    return today_data[['Date', 'Minimum temperature (Degree C)', 'Maximum temperature (Degree C)', 'Predicted Cluster']].to_string(index=False)
+
+# Main function
+def main():
+    parser = argparse.ArgumentParser(description="Predict tomorrow's heatwave conditions.")
+    prediction_daemon.add_arguments(parser)
+    args = parser.parse_args()
+
+    # Ask the warm daemon first when requested
+    result = prediction_daemon.ask(args, 'heatwave')
+    if result is not None:
+        table = result['table']
+    else:
+        from rolling_state import load_state
+
+        # Load the heatwave prediction model
+        model = load_model('model/heatwave_model.joblib')
+
+        # Predict from the rolling state of the temperature and rainfall data
+        table = format_predictions(predict_tomorrow(model, load_state('rainfall')))
+
     # Print the predictions in a readable format
     print("Predicted heatwave conditions for tomorrow:")
-    print(today_data[['Date', 'Minimum temperature (Degree C)', 'Maximum temperature (Degree C)', 'Predicted Cluster']].to_string(index=False))
+    print(table)
 
 # Main function
 if __name__ == "__main__":
-    main()  
+    main()
@@ -0,0 +1,351 @@
+"""
+Streaming heatwave detection.
+
+heatwave.define_heatwave_conditions labels a heatwave when the 3-day rolling
+means of both minimum and maximum temperature exceed their 90th percentiles
+over the whole dataset, which means recomputing over every year to label a
+single new day. HeatwaveDetector does the same one observation at a time:
+the percentiles are tracked with P² sketches (five markers each, constant
+memory), the 3-day means with a 3-slot window, and each station emits
+start / continue / end events as its observations arrive.
+
+The batch labels are the correctness oracle: with the thresholds fixed to the
+batch percentiles the detector must reproduce them exactly, and with the
+sketches it should agree on nearly every day.
+
+The station's detector is saved next to its rolling states
+(model/heatwave_state.joblib), built from the raw daily series by
+`rolling_state.py build` and fed the new days by `rolling_state.py update
+rainfall`, which prints their events.
+
+    python heatwave_stream.py              # replay the history and compare with the batch labels
+    python heatwave_stream.py --events     # also print the events as JSON lines
+    python heatwave_stream.py --update     # feed the saved detector the ingested days it has not seen
+"""
+
+import argparse
+import json
+import os
+from collections import deque
+import joblib
+import numpy as np
+import pandas as pd
+from atomic_write import atomic_write
+from label_rules import label_heatwave
+from rolling_state import ingested_after, read_source
+
+MIN_TEMP = 'Minimum temperature (Degree C)'
+MAX_TEMP = 'Maximum temperature (Degree C)'
+
+# Means this close to a threshold are ties (temperatures have one decimal), not exceedances
+TIE_TOLERANCE = 1e-9
+
+# Saved detector of the default station, next to its rolling states
+DETECTOR_PATH = 'model/heatwave_state.joblib'
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate with the P² algorithm (Jain & Chlamtac, 1985).
+
+    Five markers track the minimum, the q/2, q and (1+q)/2 quantiles and the
+    maximum; their heights are adjusted with piecewise-parabolic interpolation
+    as observations arrive, so memory and update cost are constant.
+    """
+
+    def __init__(self, q):
+        self.q = q
+        self.n = 0
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self.increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def update(self, x):
+        self.n += 1
+        h, pos = self.heights, self.positions
+        if self.n <= 5:
+            h.append(x)
+            if self.n == 5:
+                h.sort()
+            return
+
+        # Find the cell containing x, extending the extremes if needed
+        if x < h[0]:
+            h[0], k = x, 0
+        elif x >= h[4]:
+            h[4], k = x, 3
+        else:
+            k = 0
+            while x >= h[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            pos[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - pos[i]
+            if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = h[i] + d / (pos[i + 1] - pos[i - 1]) * (
+                    (pos[i] - pos[i - 1] + d) * (h[i + 1] - h[i]) / (pos[i + 1] - pos[i])
+                    + (pos[i + 1] - pos[i] - d) * (h[i] - h[i - 1]) / (pos[i] - pos[i - 1]))
+                if h[i - 1] < parabolic < h[i + 1]:
+                    h[i] = parabolic
+                else:
+                    h[i] = h[i] + d * (h[i + d] - h[i]) / (pos[i + d] - pos[i])
+                pos[i] += d
+
+    def value(self):
+        if self.n == 0:
+            return np.nan
+        if self.n < 5:
+            return float(np.quantile(self.heights, self.q))
+        return self.heights[2]
+
+
+class HeatwaveDetector:
+    """
+    Heatwave detector for one station, updated one daily observation at a time.
+    """
+
+    def __init__(self, q=0.90, window=3, min_observations=365, thresholds=None):
+        """
+        Args:
+            q (float): Quantile of min and max temperature a rolling mean must exceed.
+            window (int): Rolling mean window in observations.
+            min_observations (int): Observations seen before events are emitted, so the
+                sketched thresholds have settled.
+            thresholds (tuple): Fixed (min, max) thresholds instead of the sketches.
+        """
+        self.window = window
+        self.min_observations = min_observations if thresholds is None else 0
+        self.thresholds = thresholds
+        self.sketches = (P2Quantile(q), P2Quantile(q))
+        self.recent = deque(maxlen=window)
+        self.n = 0
+        self.start = None
+        self.length = 0
+        self.last_date = None
+
+    def current_thresholds(self):
+        if self.thresholds is not None:
+            return self.thresholds
+        return self.sketches[0].value(), self.sketches[1].value()
+
+    def update(self, date, min_temp, max_temp):
+        """
+        Process one observation.
+
+        Days not after the last one are ignored, so feeding a series again is idempotent.
+
+        Args:
+            date: Day of the observation.
+            min_temp (float): Minimum temperature.
+            max_temp (float): Maximum temperature.
+
+        Returns:
+            tuple: (is heatwave day, event dict or None).
+        """
+        if self.last_date is not None and date <= self.last_date:
+            return False, None
+        self.last_date = date
+        if np.isnan(min_temp) or np.isnan(max_temp):
+            return False, None
+        self.n += 1
+        self.sketches[0].update(min_temp)
+        self.sketches[1].update(max_temp)
+        self.recent.append((min_temp, max_temp))
+
+        heatwave = False
+        if len(self.recent) == self.window and self.n >= self.min_observations:
+            min_threshold, max_threshold = self.current_thresholds()
+            min_mean = sum(t[0] for t in self.recent) / self.window
+            max_mean = sum(t[1] for t in self.recent) / self.window
+            heatwave = min_mean > min_threshold + TIE_TOLERANCE and max_mean > max_threshold + TIE_TOLERANCE
+
+        event = None
+        if heatwave:
+            if self.start is None:
+                self.start, self.length = date, 0
+            self.length += 1
+            event = {'event': 'start' if self.length == 1 else 'continue', 'date': str(date),
+                     'start': str(self.start), 'days': self.length}
+        elif self.start is not None:
+            event = {'event': 'end', 'date': str(date), 'start': str(self.start), 'days': self.length}
+            self.start, self.length = None, 0
+        return heatwave, event
+
+    def save(self, path):
+        # Saved as plain attribute dicts, so files written from the command line (where
+        # these classes live in __main__) load from any module
+        state = dict(vars(self), sketches=[vars(sketch) for sketch in self.sketches])
+        atomic_write(path, lambda tmp_path: joblib.dump(state, tmp_path))
+
+    @classmethod
+    def load(cls, path):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(joblib.load(path))
+        sketches = []
+        for attributes in obj.sketches:
+            sketch = P2Quantile.__new__(P2Quantile)
+            sketch.__dict__.update(attributes)
+            sketches.append(sketch)
+        obj.sketches = tuple(sketches)
+        return obj
+
+
+class StationHeatwaveDetectors:
+    """
+    One HeatwaveDetector per station, created on the station's first observation.
+    """
+
+    def __init__(self, **detector_args):
+        self.detector_args = detector_args
+        self.detectors = {}
+
+    def update(self, station_id, date, min_temp, max_temp):
+        """
+        Process one observation of a station.
+
+        Returns:
+            dict: The event with its station_id, or None.
+        """
+        detector = self.detectors.get(station_id)
+        if detector is None:
+            detector = self.detectors[station_id] = HeatwaveDetector(**self.detector_args)
+        _, event = detector.update(date, min_temp, max_temp)
+        if event is not None:
+            event['station_id'] = station_id
+        return event
+
+
+def replay(data, detector=None, **detector_args):
+    """
+    Run a detector over observations in order.
+
+    Args:
+        data (pd.DataFrame): Observations with min and max temperature, oldest first.
+        detector (HeatwaveDetector): Detector to continue (default: a new one).
+        **detector_args: Arguments for a new HeatwaveDetector.
+
+    Returns:
+        tuple: (heatwave label per row, list of events, the detector).
+    """
+    detector = detector or HeatwaveDetector(**detector_args)
+    dates = pd.to_datetime(data[['Year', 'Month', 'Day']]).dt.date
+    labels, events = np.zeros(len(data), dtype=int), []
+    for i, (date, min_temp, max_temp) in enumerate(zip(dates, data[MIN_TEMP].to_numpy(float),
+                                                       data[MAX_TEMP].to_numpy(float))):
+        heatwave, event = detector.update(date, min_temp, max_temp)
+        labels[i] = heatwave
+        if event is not None:
+            events.append(event)
+    return labels, events, detector
+
+
+def build_detector(path=DETECTOR_PATH):
+    """
+    Replay the raw daily series (source and ingested days) through a new detector and save it.
+
+    Args:
+        path (str): Destination file.
+
+    Returns:
+        HeatwaveDetector: The detector, up to the last known day.
+    """
+    data = read_source('rainfall').sort_values(['Year', 'Month', 'Day'], kind='stable')
+    _, _, detector = replay(data)
+    detector.save(path)
+    return detector
+
+
+def update_detector(path=DETECTOR_PATH):
+    """
+    Feed the saved detector the ingested days it has not seen, building it first if there is none.
+
+    Args:
+        path (str): Detector file.
+
+    Returns:
+        list: Events of the new days (none when the detector was just built).
+    """
+    if not os.path.exists(path):
+        build_detector(path)
+        return []
+    detector = HeatwaveDetector.load(path)
+    last_date = detector.last_date
+    _, events, _ = replay(ingested_after('rainfall', last_date), detector)
+    if detector.last_date != last_date:
+        detector.save(path)
+    return events
+
+
+def compare_with_batch(data, q=0.90, min_observations=365):
+    """
+    Compare streaming labels with the batch labels of define_heatwave_conditions.
+
+    Args:
+        data (pd.DataFrame): Observations as prepared by heatwave.preprocess_data, oldest first.
+        q (float): Heatwave quantile.
+        min_observations (int): Warm-up of the sketched detector.
+
+    Returns:
+        dict: Exact batch thresholds, final sketch estimates, and label agreement of the
+        fixed-threshold and sketched detectors.
+    """
+    batch = label_heatwave(data)
+    exact = (float(data[MIN_TEMP].quantile(q)), float(data[MAX_TEMP].quantile(q)))
+
+    fixed_labels, _, _ = replay(data, q=q, thresholds=exact)
+    sketch_labels, events, detector = replay(data, q=q, min_observations=min_observations)
+
+    after_warmup = np.arange(len(data)) >= min_observations - 1
+    return {
+        'rows': len(data),
+        'batch_heatwave_days': int(batch.sum()),
+        'exact_thresholds': exact,
+        'sketch_thresholds': detector.current_thresholds(),
+        'fixed_threshold_mismatches': int((fixed_labels != batch).sum()),
+        'sketch_agreement': float((sketch_labels == batch)[after_warmup].mean()),
+        'sketch_heatwave_days': int(sketch_labels.sum()),
+        'events': events,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay observations through the streaming heatwave detector.")
+    parser.add_argument('--data', default='rainfall/temperature_rainfall.csv', help="Daily observations")
+    parser.add_argument('--warmup', type=int, default=365, help="Observations before events are emitted")
+    parser.add_argument('--events', action='store_true', help="Print every event as a JSON line")
+    parser.add_argument('--update', action='store_true',
+                        help=f"Feed {DETECTOR_PATH} the ingested days it has not seen and print their events")
+    args = parser.parse_args()
+
+    if args.update:
+        for event in update_detector():
+            print(json.dumps(event))
+        return
+
+    # Same cleaning as the batch trainer, so both see the same observations
+    from heatwave import preprocess_data
+    data = preprocess_data(pd.read_csv(args.data, encoding='utf-8'))
+
+    result = compare_with_batch(data, min_observations=args.warmup)
+    if args.events:
+        for event in result['events']:
+            print(json.dumps(event))
+
+    starts = sum(e['event'] == 'start' for e in result['events'])
+    print(f"Rows: {result['rows']:,}, batch heatwave days: {result['batch_heatwave_days']}, "
+          f"streaming heatwave days: {result['sketch_heatwave_days']} in {starts} heatwaves")
+    print("Thresholds (min, max): exact {:.2f}, {:.2f}; sketch {:.2f}, {:.2f}".format(
+        *result['exact_thresholds'], *result['sketch_thresholds']))
+    print(f"Fixed-threshold detector mismatches with batch labels: {result['fixed_threshold_mismatches']}")
+    print(f"Sketched detector agreement with batch labels after warm-up: {result['sketch_agreement']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
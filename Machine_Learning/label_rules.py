@@ -0,0 +1,219 @@
+"""
+Declarative label rules for the training targets, compiled to vectorized NumPy evaluation.
+
+A rule set is an ordered list of (label, condition) pairs plus a default label.
+The first matching condition wins, exactly like an if/elif/else chain, but the
+whole column is labelled at once with np.select instead of a Python call per row.
+
+Conditions are nested tuples:
+    ('>', lhs, rhs), ('>=', ...), ('<', ...), ('<=', ...), ('==', ...)
+    ('and', cond, cond, ...), ('or', cond, cond, ...), ('not', cond)
+Operands are column names, numbers, or
+    ('rolling_mean', column, window)   rolling mean over the previous `window` rows
+    ('quantile', column, q)            q-quantile of the whole column
+
+test_label_rules.py checks the compiled rules against the row-wise
+implementations on randomized data (python -m pytest test_label_rules.py).
+Run this file to benchmark them on 10M rows.
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+# Weather condition categories used by weather_conditions.py
+WEATHER_CONDITION_RULES = {
+    'rules': [
+        ('Rainy', ('>', 'Rainfall (mm)', 0)),
+        ('Stormy', ('or',
+                    ('and', ('>', '9am cloud amount (oktas)', 5), ('>', 'Speed of maximum wind gust (km/h)', 40)),
+                    ('and', ('>', '3pm cloud amount (oktas)', 5), ('>', 'Speed of maximum wind gust (km/h)', 40)))),
+        ('Cloudy', ('or', ('>', '9am cloud amount (oktas)', 5), ('>', '3pm cloud amount (oktas)', 5))),
+        ('Hot', ('or', ('>', '9am Temperature (°C)', 25), ('>', '3pm Temperature (°C)', 25))),
+    ],
+    'default': 'Sunny',
+}
+
+# Binary rain target used by rainfall_yes_no.py (1 for rain, 0 for no rain)
+RAINY_RULES = {
+    'rules': [
+        (1, ('>', 'Rainfall amount (millimetres)', 0)),
+    ],
+    'default': 0,
+}
+
+# Heatwave target used by heatwave.py: 3-day rolling means above the 90th percentiles
+HEATWAVE_RULES = {
+    'rules': [
+        (1, ('and',
+             ('>', ('rolling_mean', 'Minimum temperature (Degree C)', 3), ('quantile', 'Minimum temperature (Degree C)', 0.90)),
+             ('>', ('rolling_mean', 'Maximum temperature (Degree C)', 3), ('quantile', 'Maximum temperature (Degree C)', 0.90)))),
+    ],
+    'default': 0,
+}
+
+_COMPARISONS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '==': np.equal,
+}
+
+
+def _compile_operand(operand):
+    """
+    Compile an operand into a function of the DataFrame.
+
+    Args:
+        operand: Column name, number, or ('rolling_mean' | 'quantile', column, arg) tuple.
+
+    Returns:
+        callable: Function mapping a DataFrame to an ndarray or scalar.
+    """
+    if isinstance(operand, str):
+        return lambda df: df[operand].to_numpy(dtype=float)
+    if isinstance(operand, (int, float)):
+        return lambda df: operand
+
+    op, column, arg = operand
+    if op == 'rolling_mean':
+        return lambda df: df[column].rolling(window=arg).mean().to_numpy(dtype=float)
+    if op == 'quantile':
+        return lambda df: df[column].quantile(arg)
+    raise ValueError(f"Unknown operand: {op}")
+
+
+def _compile_condition(condition):
+    """
+    Compile a condition into a function returning a boolean mask.
+
+    Args:
+        condition (tuple): Comparison or boolean combination of conditions.
+
+    Returns:
+        callable: Function mapping a DataFrame to a boolean ndarray.
+    """
+    op = condition[0]
+
+    if op in _COMPARISONS:
+        compare = _COMPARISONS[op]
+        lhs, rhs = _compile_operand(condition[1]), _compile_operand(condition[2])
+        # NaN compares False, matching the row-wise Python comparisons
+        return lambda df: compare(lhs(df), rhs(df))
+
+    if op in ('and', 'or'):
+        combine = np.logical_and if op == 'and' else np.logical_or
+        parts = [_compile_condition(c) for c in condition[1:]]
+
+        def evaluate(df):
+            mask = parts[0](df)
+            for part in parts[1:]:
+                mask = combine(mask, part(df))
+            return mask
+        return evaluate
+
+    if op == 'not':
+        inner = _compile_condition(condition[1])
+        return lambda df: np.logical_not(inner(df))
+
+    raise ValueError(f"Unknown condition: {op}")
+
+
+def compile_rule_set(rule_set):
+    """
+    Compile a rule set into a vectorized labelling function.
+
+    Args:
+        rule_set (dict): {'rules': [(label, condition), ...], 'default': label}.
+
+    Returns:
+        callable: Function mapping a DataFrame to an ndarray of labels, one per row.
+    """
+    labels = [label for label, _ in rule_set['rules']]
+    conditions = [_compile_condition(condition) for _, condition in rule_set['rules']]
+    default = rule_set['default']
+
+    def label(df):
+        masks = [np.broadcast_to(c(df), (len(df),)) for c in conditions]
+        return np.select(masks, labels, default=default)
+    return label
+
+
+# Compiled rule sets used by the training scripts
+label_weather_condition = compile_rule_set(WEATHER_CONDITION_RULES)
+label_rainy = compile_rule_set(RAINY_RULES)
+label_heatwave = compile_rule_set(HEATWAVE_RULES)
+
+
+def random_weather_frame(n_rows, seed=0):
+    """
+    Generate random observations covering every column the rule sets read.
+
+    Values are drawn around the rule thresholds, including exact boundary values
+    and missing values, so equality checks exercise the edge cases.
+
+    Args:
+        n_rows (int): Number of rows to generate.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: Random observations.
+    """
+    rng = np.random.default_rng(seed)
+
+    def column(low, high, boundary):
+        values = rng.uniform(low, high, n_rows).round(1)
+        values[rng.random(n_rows) < 0.05] = boundary  # exact threshold values
+        values[rng.random(n_rows) < 0.01] = np.nan    # missing values
+        return values
+
+    return pd.DataFrame({
+        'Rainfall (mm)': np.where(rng.random(n_rows) < 0.6, 0.0, column(0, 30, 0)),
+        '9am cloud amount (oktas)': column(0, 8, 5),
+        '3pm cloud amount (oktas)': column(0, 8, 5),
+        'Speed of maximum wind gust (km/h)': column(0, 90, 40),
+        '9am Temperature (°C)': column(0, 40, 25),
+        '3pm Temperature (°C)': column(0, 45, 25),
+        'Rainfall amount (millimetres)': column(0, 30, 0),
+        'Minimum temperature (Degree C)': column(-2, 30, 15),
+        'Maximum temperature (Degree C)': column(5, 45, 30),
+    })
+
+
+def benchmark(n_rows=10_000_000, sample_rows=100_000):
+    """
+    Time the compiled rule sets on n_rows and the row-wise apply on a sample.
+
+    Args:
+        n_rows (int): Rows for the vectorized benchmark.
+        sample_rows (int): Rows for the row-wise benchmark, extrapolated to n_rows.
+    """
+    from weather_conditions import categorize_weather
+
+    df = random_weather_frame(n_rows, seed=1)
+    for name, label in [('weather_condition', label_weather_condition), ('rainy', label_rainy), ('heatwave', label_heatwave)]:
+        start = time.perf_counter()
+        label(df)
+        print(f"{name:>18}: {time.perf_counter() - start:8.2f}s vectorized on {n_rows:,} rows")
+
+    sample = df.iloc[:sample_rows]
+    start = time.perf_counter()
+    sample.apply(categorize_weather, axis=1)
+    elapsed = time.perf_counter() - start
+    print(f"{'row-wise apply':>18}: {elapsed * n_rows / sample_rows:8.2f}s estimated on {n_rows:,} rows "
+          f"({elapsed:.2f}s on {sample_rows:,})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled label rules.")
+    parser.add_argument('--rows', type=int, default=10_000_000, help="Rows for the benchmark")
+    parser.add_argument('--sample-rows', type=int, default=100_000, help="Rows for the row-wise baseline")
+    args = parser.parse_args()
+
+    benchmark(args.rows, args.sample_rows)
+
+
+if __name__ == "__main__":
+    main()
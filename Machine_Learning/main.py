@@ -1,24 +1,42 @@
 """
 API setup
 """
-from datetime import datetime, timedelta
-from fastapi import FastAPI, Query, Response, HTTPException
+from datetime import datetime, timedelta, date as Date
+import asyncio
+import os
+from fastapi import FastAPI, Query, Request, Response, HTTPException
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
 import numpy as np
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, model_validator
 import pandas as pd
 import joblib
 from typing import Dict, Any, Optional , List
+from functools import lru_cache
 from temperature import get_temperature  # Ensure get_temperature returns only train_data
-from sklearn.preprocessing import StandardScaler
+from station_catalog import StationCatalog
+from feature_store import FeatureStore, FEATURES_FILE, calendar_row
+from heatwave_episodes import EpisodeIndex, EPISODES_FILE
+from climatology import ClimatologyCube, CLIMATOLOGY_FILE
+from weather_imputation import ImputationStats, IMPUTATION_FILE, OPTIONAL_COLUMNS
+from forecast_table import ForecastTableFile, TABLE_FILE, forecast_model_dir, load_station_state
+from request_schema import RAIN_SCHEMA, TEMPERATURE_SCHEMA, WEATHER_SCHEMA, HEATWAVE_SCHEMA, BUNDLE_SCHEMA, WEATHER_OPTIONAL_FIELDS
+import api_metrics
+from api_metrics import instrumented, stage
+import structured_logging
+from structured_logging import get_logger
+import memory_profile
 from sklearn.decomposition import PCA
 from sklearn.cluster import KMeans
 import numpy as np
-import logging
 
 
 
 app = FastAPI()
+# JSON log lines written off the request path, sampled per endpoint (LOG_LEVEL, LOG_SAMPLE_RATES)
+structured_logging.configure()
+startup_log = get_logger('startup')
 
 
 # CORS middleware for handling requests from different origins
@@ -30,45 +48,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency, stage timings and error counts, served at /metrics
+app.add_middleware(api_metrics.MetricsMiddleware)
+
+# Request id of every log record, from the X-Request-ID header or generated, echoed in the response
+app.add_middleware(structured_logging.RequestIdMiddleware)
+
+@app.exception_handler(RequestValidationError)
+async def count_validation_errors(request: Request, exc: RequestValidationError):
+    """Count rejected request bodies and return FastAPI's usual 422 response."""
+    api_metrics.record_error(exc)
+    return await request_validation_exception_handler(request, exc)
+
+@app.get("/metrics")
+@instrumented
+def metrics() -> Response:
+    """Expose request, stage and model latencies and error counts in Prometheus format."""
+    return Response(content=api_metrics.render(), media_type=api_metrics.CONTENT_TYPE)
+
+# Opt-in allocation tracing (MEMORY_PROFILE=1), with admin endpoints reporting the top allocators
+if memory_profile.enabled():
+    memory_profile.tracker.start()
+    app.add_middleware(memory_profile.MemoryMiddleware)
+
+    @app.get("/admin/memory")
+    @instrumented
+    def memory_summary() -> Dict[str, Any]:
+        """Return the process RSS, traced memory and per-endpoint retained and peak memory."""
+        return memory_profile.tracker.summary()
+
+    @app.get("/admin/memory/top")
+    @instrumented
+    def memory_top(
+        limit: int = Query(20, ge=1, le=200),
+        group_by: str = Query('lineno', pattern='^(lineno|filename|traceback)$'),
+        endpoint: Optional[str] = Query(None, description="Route listed in MEMORY_PROFILE_SNAPSHOTS; reports its last request"),
+    ) -> List[Dict[str, Any]]:
+        """Return the allocators that grew the most since startup, or during an endpoint's last request."""
+        rows = memory_profile.tracker.top(limit, group_by, endpoint)
+        if rows is None:
+            raise HTTPException(status_code=404, detail=f"No profiled request of {endpoint}; add it to MEMORY_PROFILE_SNAPSHOTS.")
+        return rows
+
 # --------------- Rainfall modelintegration ----------------
 # Load the pre-trained rainfall prediction model
 model = joblib.load('model/rainfall_model.joblib')
 heatwave_model = joblib.load('model/heatwave_model.joblib')
-scaler = StandardScaler()
 
 # Define a Pydantic model for the prediction request
 class RainPredictionRequest(BaseModel):
-    max_temp: float = Field(..., gt=-50, lt=60, description="Maximum temperature between -50 and 60°C")
-    min_temp: float = Field(..., gt=-50, lt=60, description="Minimum temperature between -50 and 60°C")
-    rainfall: float = Field(..., ge=0, description="Rainfall must be non-negative")
-
-    # Validate minimum and maximum temperature ranges
-    @field_validator("max_temp", "min_temp")
-    def check_temperature_range(cls, value, info):
-        logging.info(f"Validating {info.field_name} range: {value}")
-        if not -50 < value < 60:
-            raise ValueError(f"{info.field_name.replace('_', ' ').capitalize()} must be between -50 and 60°C.")
-        return value
-
-    # Validate rainfall is a positive number
-    @field_validator("rainfall")
-    def check_rainfall_positive(cls, value):
-        logging.info(f"Validating rainfall: {value}")
-        if value < 0:
-            raise ValueError("Rainfall must be a positive number.")
-        return value
+    # Bounds and the min/max check come from RAIN_SCHEMA, shared with the columnar batch request
+    max_temp: float = RAIN_SCHEMA.field('max_temp')
+    min_temp: float = RAIN_SCHEMA.field('min_temp')
+    rainfall: float = RAIN_SCHEMA.field('rainfall')
 
     # Cross-field validation to ensure max_temp > min_temp
     @model_validator(mode="after")
     def check_min_max_relationship(cls, values):
-        # Access values directly as attributes
-        max_temp = values.max_temp
-        min_temp = values.min_temp
-        
-        if max_temp is not None and min_temp is not None and min_temp >= max_temp:
-            raise ValueError("Maximum temperature must be greater than minimum temperature.")
-        
-        return values
+        return RAIN_SCHEMA.check_orders(values)
+
+# Columnar form of many rain requests: one list per field
+RainPredictionColumns = RAIN_SCHEMA.columns_model('RainPredictionColumns')
 
 class HeatwavePredictionRequest(BaseModel):
     min_temp: float
@@ -110,23 +150,25 @@ def apply_kmeans_clustering(data: pd.DataFrame, n_clusters: int = 2) -> pd.DataF
     return data
 
 # Define the probability distribution endpoint
+distribution_log = get_logger('/probability_distribution')
+
 @app.get("/probability_distribution", response_model=Dict[str, List[float]])
+@instrumented
 async def get_probability_distribution():
     """Return counts of rainy and non-rainy days."""
     try:
         # Load your data
         df = pd.read_csv('rainfall/rainfall_predictions.csv')  # Update with the path to your dataset
-        print("Loaded DataFrame columns:", df.columns.tolist())  # Debug print
-        print("Sample data:\n", df.head())  # Debug print
+        distribution_log.debug("Loaded predictions", columns=lambda: df.columns.tolist(), rows=lambda: len(df))
 
     except Exception as e:
-        print(f"Error loading data: {e}")  # Log error
+        distribution_log.error("Error loading data", error=str(e))
         raise HTTPException(status_code=500, detail="Error loading data: " + str(e))
 
     # Check if required columns exist
     if 'Rainy' not in df.columns:
         error_message = "Dataframe must contain 'Rainy' column."
-        print(error_message)  # Log error
+        distribution_log.error(error_message)
         raise HTTPException(status_code=400, detail=error_message)
 
     # Calculate the counts of rainy and non-rainy days
@@ -134,7 +176,7 @@ async def get_probability_distribution():
         rainy_days_count = df[df['Rainy'] == 1].shape[0]  # Count of rainy days
         non_rainy_days_count = df[df['Rainy'] == 0].shape[0]  # Count of non-rainy days
     except Exception as e:
-        print(f"Error calculating distributions: {e}")  # Log error
+        distribution_log.error("Error calculating distributions", error=str(e))
         raise HTTPException(status_code=500, detail="Error calculating distributions: " + str(e))
 
     # Return the data as JSON
@@ -143,6 +185,7 @@ async def get_probability_distribution():
         "non_rainy_days": [non_rainy_days_count]
     }
 @app.get("/testdata")
+@instrumented
 def read_root(response: Response) -> Dict[str, Any]:
     """Retrieve training data for the temperature prediction model."""
     # Retrieve train data dynamically from the source
@@ -163,15 +206,36 @@ def read_root(response: Response) -> Dict[str, Any]:
         "y_pred": y_pred.tolist()  # Convert Series to list
     }
 
+rain_log = get_logger('/rain_prediction')
+
 @app.post("/rain_prediction")
-async def create_rain_prediction(request: RainPredictionRequest) -> Dict[str, Any]:
+@instrumented
+async def create_rain_prediction(
+    request: RainPredictionRequest,
+    station_id: Optional[str] = Query(None),
+    date: Optional[Date] = Query(None, description="Day to predict; its Previous_Rainfall is read from the feature store"),
+) -> Dict[str, Any]:
     """Predict the probability of rain based on temperature and rainfall."""
+    # Pick the rain model for the requested station (defaults to model/)
+    rain_model = get_station_models(station_id)['rain']
+
+    # For a known day, use the stored previous-day rainfall the model was trained on
+    previous_rainfall = request.rainfall
+    if date is not None:
+        stored = get_station_features(station_id)
+        row = stored.row(date) if stored is not None else None
+        if row is None or np.isnan(row['Previous_Rainfall']):
+            raise HTTPException(status_code=404, detail=f"No stored features for {date}.")
+        previous_rainfall = row['Previous_Rainfall']
+
     # Prepare features for prediction
-    features = prepare_rain_features(request.max_temp, request.min_temp, request.rainfall)
+    with stage('features'):
+        features = prepare_rain_features(request.max_temp, request.min_temp, previous_rainfall)
 
     # Predict probability of rain (Yes/No)
     try:
-        probability = model.predict_proba(features)[0][1]  # Probability of rain (1)
+        with stage('predict', model='rain'):
+            probability = rain_model.predict_proba(features)[0][1]  # Probability of rain (1)
         result = "Yes" if probability > 0.4 else "No"  # Adjusted threshold to 0.4 for sensitivity
         
         # Return probability as score
@@ -181,7 +245,8 @@ async def create_rain_prediction(request: RainPredictionRequest) -> Dict[str, An
         }
     except AttributeError:
         # If the model doesn't support predict_proba
-        prediction = model.predict(features)
+        with stage('predict', model='rain'):
+            prediction = rain_model.predict(features)
         probability = "N/A"
         result = "Yes" if prediction[0] == 1 else "No"
 
@@ -191,78 +256,107 @@ async def create_rain_prediction(request: RainPredictionRequest) -> Dict[str, An
           "score": probability  # This will be 'N/A' if no score is available
         }
     except Exception as e:
-        print(f"General error in /rain_prediction: {e}")
+        rain_log.error("Prediction failed", exc_info=e)
+        raise HTTPException(status_code=500, detail="Prediction failed. Please try again later.")
+
+rain_batch_log = get_logger('/rain_prediction/batch')
+
+@app.post("/rain_prediction/batch")
+@instrumented
+async def create_rain_predictions(conditions: RainPredictionColumns, station_id: Optional[str] = Query(None)) -> Dict[str, Any]:
+    """Predict the probability of rain of many observations, sent as columns, with one model call."""
+    rain_model = get_station_models(station_id)['rain']
+    with stage('columns'):
+        columns, n_rows = validate_columns(RAIN_SCHEMA, conditions)
+    if not n_rows:
+        return {"will_rain": [], "score": []}
+    try:
+        with stage('features'):
+            features = pd.DataFrame({
+                'Maximum temperature (Degree C)': columns['max_temp'],
+                'Minimum temperature (Degree C)': columns['min_temp'],
+                'Previous_Rainfall': columns['rainfall'],
+            })
+        with stage('predict', model='rain'):
+            probability = rain_model.predict_proba(features)[:, 1]
+        # Same 0.4 threshold as /rain_prediction
+        return {"will_rain": np.where(probability > 0.4, "Yes", "No").tolist(), "score": probability.tolist()}
+    except Exception as e:
+        rain_batch_log.error("Prediction failed", exc_info=e, rows=n_rows)
         raise HTTPException(status_code=500, detail="Prediction failed. Please try again later.")
 
 # --------------- Temperature model integration ----------------
 # Load the temperature prediction model and scaler
 try:
     temperature_model = joblib.load('model/temperature_model.joblib')
-    scaler = joblib.load('model/temperauture_scaler.joblib')
-    print("Model and scaler loaded successfully")
+    temperature_scaler = joblib.load('model/temperauture_scaler.joblib')
+    startup_log.info("Temperature model and scaler loaded")
 except Exception as e:
-    print(f"Error loading model or scaler: {e}")
+    startup_log.error("Error loading temperature model or scaler", exc_info=e)
     raise HTTPException(status_code=500, detail="Error loading model or scaler")
 
+# Columns of the temperature model's features, in the order its scaler was fitted on
+TEMPERATURE_FEATURES = ['TemperatureMax', 'TemperatureMin', 'RainSum', 'RelativeHumidityMean',
+                        'RelativeHumidityMax', 'RelativeHumidityMin', 'Month', 'Day', 'Hour']
+
 # Define a Pydantic model for the prediction request
 class TemperaturePredictionRequest(BaseModel):
-    # Define input fields with validation
-    temperature_max: float = Field(..., gt=-50, lt=60, description="Max temperature between -50 and 60°C")
-    temperature_min: float = Field(..., gt=-50, lt=60, description="Min temperature between -50 and 60°C")
-    rain_sum: float = Field(..., ge=0, description="Rain sum should be positive")
-    relative_humidity_mean: float = Field(..., ge=0, le=100, description="Humidity between 0 and 100%")
-    relative_humidity_max: float = Field(..., ge=0, le=100, description="Humidity between 0 and 100%")
-    relative_humidity_min: float = Field(..., ge=0, le=100, description="Humidity between 0 and 100%")
+    # Define input fields with validation (bounds from TEMPERATURE_SCHEMA)
+    temperature_max: float = TEMPERATURE_SCHEMA.field('temperature_max')
+    temperature_min: float = TEMPERATURE_SCHEMA.field('temperature_min')
+    rain_sum: float = TEMPERATURE_SCHEMA.field('rain_sum')
+    relative_humidity_mean: float = TEMPERATURE_SCHEMA.field('relative_humidity_mean')
+    relative_humidity_max: float = TEMPERATURE_SCHEMA.field('relative_humidity_max')
+    relative_humidity_min: float = TEMPERATURE_SCHEMA.field('relative_humidity_min')
 
     # Cross-field validation to ensure min/max relationships
     @model_validator(mode="after")
     def check_min_max_relationships(cls, values):
-        temp_min = values.temperature_min
-        temp_max = values.temperature_max
-        hum_min = values.relative_humidity_min
-        hum_max = values.relative_humidity_max
-        
-        if temp_min > temp_max:
-            raise ValueError("Minimum temperature must be less than or equal to maximum temperature")
-        if hum_min > hum_max:
-            raise ValueError("Minimum humidity must be less than or equal to maximum humidity")
-        
-        return values
+        return TEMPERATURE_SCHEMA.check_orders(values)
 
 # Define a route for the temperature prediction endpoint
+temperature_log = get_logger('/temperature_prediction')
+
 @app.post("/temperature_prediction")
-async def create_temperature_prediction(request: TemperaturePredictionRequest):
+@instrumented
+async def create_temperature_prediction(request: TemperaturePredictionRequest, station_id: Optional[str] = Query(None)):
     """Predict the average temperature for tomorrow."""
+    station_models = get_station_models(station_id)
+    station_temperature_model = station_models['temperature']
     try:
-        # Determine the date for tomorrow
+        # Determine the date for tomorrow and its calendar features
         today = datetime.now()
         tomorrow = today + timedelta(days=1)
+        calendar = calendar_row(tomorrow.date())
 
         # Prepare the feature vector
-        features = np.array([[request.temperature_max, 
-                              request.temperature_min, 
-                              request.rain_sum,
-                              request.relative_humidity_mean, 
-                              request.relative_humidity_max,
-                              request.relative_humidity_min, 
-                              tomorrow.month,
-                              tomorrow.day,
-                              0 # Hour is set to 0 as placeholder for "Hour" for a daily average prediction
-                              ]])
+        with stage('features'):
+            features = pd.DataFrame([[request.temperature_max, 
+                                      request.temperature_min, 
+                                      request.rain_sum,
+                                      request.relative_humidity_mean, 
+                                      request.relative_humidity_max,
+                                      request.relative_humidity_min, 
+                                      calendar['Month'],
+                                      calendar['Day'],
+                                      calendar['Hour']
+                                      ]], columns=TEMPERATURE_FEATURES)
         
-        # Scale the features
+        # Scale the features with the scaler fitted with the station's model at training time
         try:   
-            features_scaled = scaler.fit_transform(features)
+            with stage('scale'):
+                features_scaled = station_models['temperature_scaler'].transform(features)
         except Exception as e:
-            print(f"Scaler error: {e}")
+            temperature_log.error("Scaler error", exc_info=e)
             raise HTTPException(status_code=500, detail="Error scaling input data")
         
         # Predict the temperature
         try:
-            prediction = temperature_model.predict(features_scaled)
-            print("Raw prediction output:", prediction)
+            with stage('predict', model='temperature'):
+                prediction = station_temperature_model.predict(features_scaled)
+            temperature_log.debug("Raw prediction", value=lambda: float(prediction[0]))
         except Exception as e:
-            print(f"Prediction error: {e}")
+            temperature_log.error("Prediction error", exc_info=e)
             raise HTTPException(status_code=500, detail="Error making prediction")
         
         # Round the prediction to the nearest integer
@@ -274,80 +368,111 @@ async def create_temperature_prediction(request: TemperaturePredictionRequest):
 
 # --------------- Weather condition model integration -----------------------
 weather_model = joblib.load('model/weather_classifier_model.joblib')
+# Defaults for missing optional inputs, written with the model by weather_conditions.py
+weather_imputation = ImputationStats.load(os.path.join('model', IMPUTATION_FILE))
 
 # Define a Pydantic model for the prediction request
 class WeatherPredictionRequest(BaseModel):
-    # Required fields
-    minimum_temp: float = Field(..., ge=-50, le=60, description="Minimum Temperature in °C")
-    maximum_temp: float = Field(..., ge=-50, le=60, description="Maximum Temperature in °C")
-    rainfall: float = Field(..., ge=0, description="Rainfall in mm")
+    # Required fields (bounds from WEATHER_SCHEMA)
+    minimum_temp: float = WEATHER_SCHEMA.field('minimum_temp')
+    maximum_temp: float = WEATHER_SCHEMA.field('maximum_temp')
+    rainfall: float = WEATHER_SCHEMA.field('rainfall')
 
     # Optional fields with constraints
-    nine_am_temp: Optional[float] = Field(None, ge=-50, le=60, description="9 AM Temperature in °C")
-    nine_am_humidity: Optional[float] = Field(None, ge=0, le=100, description="9 AM Relative Humidity in %")
-    nine_am_cloud: Optional[float] = Field(None, ge=0, le=8, description="9 AM Cloud Amount in oktas")
-    nine_am_wind_speed: Optional[float] = Field(None, ge=0, description="9 AM Wind Speed in km/h")
-    three_pm_temp: Optional[float] = Field(None, ge=-50, le=60, description="3 PM Temperature in °C")
-    three_pm_humidity: Optional[float] = Field(None, ge=0, le=100, description="3 PM Relative Humidity in %")
-    three_pm_cloud: Optional[float] = Field(None, ge=0, le=8, description="3 PM Cloud Amount in oktas")
-    three_pm_wind_speed: Optional[float] = Field(None, ge=0, description="3 PM Wind Speed in km/h")
-
-    # Validate temperature range for both minimum and maximum temperature
-    @field_validator("minimum_temp", "maximum_temp")
-    def check_temperature_range(cls, value, info):
-        if not -50 <= value <= 60:
-            raise ValueError(f"{info.field_name.replace('_', ' ').capitalize()} must be between -50 and 60 °C.")
-        return value
-
-    # Validate rainfall to be a non-negative value
-    @field_validator("rainfall")
-    def check_rainfall_positive(cls, value):
-        if value < 0:
-            raise ValueError("Rainfall must be a non-negative number.")
-        return value
+    nine_am_temp: Optional[float] = WEATHER_SCHEMA.field('nine_am_temp')
+    nine_am_humidity: Optional[float] = WEATHER_SCHEMA.field('nine_am_humidity')
+    nine_am_cloud: Optional[float] = WEATHER_SCHEMA.field('nine_am_cloud')
+    nine_am_wind_speed: Optional[float] = WEATHER_SCHEMA.field('nine_am_wind_speed')
+    three_pm_temp: Optional[float] = WEATHER_SCHEMA.field('three_pm_temp')
+    three_pm_humidity: Optional[float] = WEATHER_SCHEMA.field('three_pm_humidity')
+    three_pm_cloud: Optional[float] = WEATHER_SCHEMA.field('three_pm_cloud')
+    three_pm_wind_speed: Optional[float] = WEATHER_SCHEMA.field('three_pm_wind_speed')
+
+    # Day of the observation; its month selects the defaults of missing optional fields
+    date: Optional[Date] = Field(None, description="Day of the observation (default: today)")
 
     # Cross-field validation to ensure max_temp > min_temp
     @model_validator(mode="after")
     def check_min_max_relationship(cls, values):
-        max_temp = values.maximum_temp
-        min_temp = values.minimum_temp
-        
-        if max_temp is not None and min_temp is not None and min_temp >= max_temp:
-            raise ValueError("Maximum temperature must be greater than minimum temperature.")
-        
-        return values
+        return WEATHER_SCHEMA.check_orders(values)
+
+# Columnar form of many weather requests: one list per field, optional columns may be left out
+WeatherPredictionColumns = WEATHER_SCHEMA.columns_model(
+    'WeatherPredictionColumns',
+    date=(Optional[List[Optional[Date]]], Field(None, description="Day of each observation (default: today)")),
+)
+
+@lru_cache(maxsize=32)
+def load_station_imputation(model_dir: str) -> ImputationStats:
+    """Load (once) the defaults for missing weather inputs saved next to a station's models, or the default ones."""
+    path = os.path.join(model_dir, IMPUTATION_FILE)
+    return ImputationStats.load(path) if os.path.exists(path) else weather_imputation
+
+def prepare_weather_features(columns: Dict[str, Any], dates: List[Optional[Date]], imputation: ImputationStats) -> pd.DataFrame:
+    """Build the weather model's feature rows from request columns, filling missing optional inputs with the training means of each row's month."""
+    today = Date.today()
+    features = pd.DataFrame({
+        "Minimum temperature (°C)": columns['minimum_temp'],
+        "Maximum temperature (°C)": columns['maximum_temp'],
+        "Rainfall (mm)": columns['rainfall'],
+        **{column: columns[field] for column, field in zip(OPTIONAL_COLUMNS, WEATHER_OPTIONAL_FIELDS)},
+    }, dtype=float)
+    months = [(d or today).month for d in dates]
+    return imputation.fill(features, months)
+
+def validate_columns(schema, body: BaseModel) -> tuple:
+    """Check a columnar request body against its schema, rejecting it with every failing row (422)."""
+    columns, n_rows, errors = schema.validate_columns(body.model_dump())
+    if errors:
+        raise RequestValidationError(errors)
+    return columns, n_rows
 
 # Define a route for the weather condition prediction endpoint
+weather_log = get_logger('/weather_prediction')
+
 @app.post("/weather_prediction")
-async def create_weather_prediction( conditions: WeatherPredictionRequest) -> Dict[str, Any]:
+@instrumented
+async def create_weather_prediction( conditions: WeatherPredictionRequest, station_id: Optional[str] = Query(None)) -> Dict[str, Any]:
     """Predict the weather condition based on input features."""
+    model_dir = get_station_model_dir(station_id)
+    station_weather_model = load_station_models(model_dir)['weather']
     try:
-        # Prepare features for weather prediction
-        # Using default values if None is provided for optional features
-        # These values are the mean values from the training data
-        features = {
-            "Minimum temperature (°C)": conditions.minimum_temp,
-            "Maximum temperature (°C)": conditions.maximum_temp,
-            "Rainfall (mm)": conditions.rainfall,
-            "9am Temperature (°C)": conditions.nine_am_temp or 14.29, 
-            "9am relative humidity (%)": conditions.nine_am_humidity or 73.47,
-            "9am cloud amount (oktas)": conditions.nine_am_cloud or 5.14,
-            "9am wind speed (km/h)": conditions.nine_am_wind_speed or 9.7,
-            "3pm Temperature (°C)": conditions.three_pm_temp or 18.64,
-            "3pm relative humidity (%)": conditions.three_pm_humidity or 57.28,
-            "3pm cloud amount (oktas)": conditions.three_pm_cloud or 4.82,
-            "3pm wind speed (km/h)": conditions.three_pm_wind_speed or 13.57,
-        }
-
-        # Convert features to DataFrame
-        features_df = pd.DataFrame([features])
+        # Prepare features for weather prediction, using the training data's
+        # means for the month when optional features are not provided
+        with stage('features'):
+            columns = {field: [value] for field, value in conditions.model_dump().items()}
+            features_df = prepare_weather_features(columns, [conditions.date], load_station_imputation(model_dir))
 
         # Predict the weather condition
-        prediction = weather_model.predict(features_df)[0]
+        with stage('predict', model='weather'):
+            prediction = station_weather_model.predict(features_df)[0]
         
         return {"predicted_weather_condition": prediction}
     except Exception as e:
-        print(f"Error in create_weather_prediction: {e}")
+        weather_log.error("Prediction failed", exc_info=e)
+        raise HTTPException(status_code=500, detail="Prediction failed. Please try again later.")
+
+weather_batch_log = get_logger('/weather_prediction/batch')
+
+@app.post("/weather_prediction/batch")
+@instrumented
+async def create_weather_predictions(conditions: WeatherPredictionColumns, station_id: Optional[str] = Query(None)) -> Dict[str, Any]:
+    """Predict the weather condition of many observations, sent as columns, with one model call."""
+    model_dir = get_station_model_dir(station_id)
+    station_weather_model = load_station_models(model_dir)['weather']
+    with stage('columns'):
+        columns, n_rows = validate_columns(WEATHER_SCHEMA, conditions)
+    if not n_rows:
+        return {"predicted_weather_conditions": []}
+    try:
+        with stage('features'):
+            features_df = prepare_weather_features(columns, conditions.date or [None] * n_rows,
+                                                   load_station_imputation(model_dir))
+        with stage('predict', model='weather'):
+            predictions = station_weather_model.predict(features_df)
+        return {"predicted_weather_conditions": predictions.tolist()}
+    except Exception as e:
+        weather_batch_log.error("Prediction failed", exc_info=e, rows=n_rows)
         raise HTTPException(status_code=500, detail="Prediction failed. Please try again later.")
 
 # Define a function to get feature importance from the classifier
@@ -366,6 +491,7 @@ def get_feature_importance(clf, feature_names: List[str]) -> Dict[str, float]:
     return {name: importance for name, importance in zip(feature_names, importances)}
 
 @app.get("/feature_importance", response_model=Dict[str, float])
+@instrumented
 async def feature_importance() -> Dict[str, float]:
     """Endpoint to return feature importance for the weather prediction model."""
     feature_names = [
@@ -386,53 +512,40 @@ async def feature_importance() -> Dict[str, float]:
         importance_data = get_feature_importance(weather_model, feature_names)
         return importance_data
     except Exception as e:
-        print(f"Error in feature_importance endpoint: {e}")
+        get_logger('/feature_importance').error("Error getting feature importance", exc_info=e)
         raise HTTPException(status_code=500, detail="Failed to get feature importance.")    
 
 # --------------- Heatwave model integration --------------------------------
 # Load the heatwave prediction model
 heatwave_model = joblib.load('model/heatwave_model.joblib')
-scaler = StandardScaler()
 
 # Define a Pydantic model for the prediction request
 class HeatwavePredictionRequest(BaseModel):
-    min_temp: float = Field(..., ge=-50, le=60, description="Minimum temperature between -50 and 60 °C")
-    max_temp: float = Field(..., ge=-50, le=60, description="Maximum temperature between -50 and 60 °C")
-
-    # Validate minimum and maximum temperature individually
-    @field_validator("min_temp", "max_temp")
-    def validate_temp_range(cls, value, info):
-        if not -50 <= value <= 60:
-            raise ValueError(f"{info.field_name.replace('_', ' ').capitalize()} must be between -50 and 60 °C.")
-        return value
+    min_temp: float = HEATWAVE_SCHEMA.field('min_temp')
+    max_temp: float = HEATWAVE_SCHEMA.field('max_temp')
 
     # Cross-field validation to ensure max_temp > min_temp
     @model_validator(mode="after")
     def validate_min_max_relationship(cls, values):
-        max_temp = values.max_temp
-        min_temp = values.min_temp
-
-        if max_temp is not None and min_temp is not None and min_temp >= max_temp:
-            raise ValueError("Maximum temperature must be greater than minimum temperature.")
-        
-        return values
+        return HEATWAVE_SCHEMA.check_orders(values)
 
 # Define a route for the heatwave prediction endpoint
 @app.post("/heatwave_prediction")
-async def create_heatwave_prediction(request: HeatwavePredictionRequest, date: str = Query(None)) -> Dict[str, Any]:
+@instrumented
+async def create_heatwave_prediction(request: HeatwavePredictionRequest, date: str = Query(None), station_id: Optional[str] = Query(None)) -> Dict[str, Any]:
     """Predict heatwave conditions based on temperature inputs."""
+    station_heatwave_model = get_station_models(station_id)['heatwave']
     try:
         # Prepare features for heatwave prediction
-        features = pd.DataFrame([{
-            'Minimum temperature (Degree C)': request.min_temp,
-            'Maximum temperature (Degree C)': request.max_temp
-        }])
+        with stage('features'):
+            features = pd.DataFrame([{
+                'Minimum temperature (Degree C)': request.min_temp,
+                'Maximum temperature (Degree C)': request.max_temp
+            }])
         
-        # Scale the features using the StandardScaler
-        features_scaled = scaler.fit_transform(features)
-        
-        # Predict heatwave conditions
-        prediction = heatwave_model.predict(features_scaled)
+        # Predict heatwave conditions on the unscaled temperatures, as heatwave.py fitted the clusters
+        with stage('predict', model='heatwave'):
+            prediction = station_heatwave_model.predict(features)
 
         # Determine cluster (assuming this is the predicted cluster)
         cluster = int(prediction[0])  # Get the cluster from the prediction
@@ -454,15 +567,18 @@ async def create_heatwave_prediction(request: HeatwavePredictionRequest, date: s
     
     
 
+clusters_log = get_logger('/clusters_visualization')
+
 @app.get("/clusters_visualization")
+@instrumented
 def visualize_clusters_endpoint() -> Dict[str, Any]:
     """Visualize clusters using PCA and KMeans clustering."""
     try:
-        print("Loading data...")
-        data = load_data('rainfall/temperature_rainfall.csv')
-
-        print("Checking for NaN values...")
-        print(data.isnull().sum())  # Print NaN counts for each column
+        with stage('load'):
+            data = load_data('rainfall/temperature_rainfall.csv')
+        # The per-column NaN counts are only computed when the record is kept
+        clusters_log.debug("Loaded data", rows=len(data),
+                           null_counts=lambda: {k: int(v) for k, v in data.isnull().sum().items() if v})
 
         # Handle NaN values
         if data.isnull().values.any():
@@ -473,18 +589,17 @@ def visualize_clusters_endpoint() -> Dict[str, Any]:
         if not required_columns.issubset(data.columns):
             raise HTTPException(status_code=500, detail="Required columns are missing in the data.")
 
-        print("Applying KMeans clustering...")
-        data_no_outliers = apply_kmeans_clustering(data)
+        with stage('predict', model='kmeans'):
+            data_no_outliers = apply_kmeans_clustering(data)
 
-        print("Performing PCA...")
-        pca = PCA(n_components=2)
-        data_pca = pca.fit_transform(data_no_outliers[['Minimum temperature (Degree C)', 'Maximum temperature (Degree C)']])
+        with stage('predict', model='pca'):
+            pca = PCA(n_components=2)
+            data_pca = pca.fit_transform(data_no_outliers[['Minimum temperature (Degree C)', 'Maximum temperature (Degree C)']])
         
         # Add PCA components to the DataFrame for visualization
         data_no_outliers['PCA1'] = data_pca[:, 0]
         data_no_outliers['PCA2'] = data_pca[:, 1]
 
-        print("Preparing cluster data for response...")
         cluster_data = {
             "x": data_no_outliers['PCA1'].tolist(),
             "y": data_no_outliers['PCA2'].tolist(),
@@ -496,7 +611,298 @@ def visualize_clusters_endpoint() -> Dict[str, Any]:
     
 
     except Exception as e:
-        print(f"Error in visualize_clusters_endpoint: {e}")
+        clusters_log.error("Clustering failed", exc_info=e)
         raise HTTPException(status_code=500, detail=str(e))
-    
-    
\ No newline at end of file
+
+# --------------- Station catalog integration --------------------------------
+# Build the spatial index over stations that have trained models
+station_catalog = StationCatalog.from_files()
+
+@lru_cache(maxsize=32)
+def load_station_models(model_dir: str) -> Dict[str, Any]:
+    """Load (once) the four prediction models stored in a station's model directory, and the temperature model's scaler."""
+    if os.path.normpath(model_dir) == 'model':
+        # The default models are already loaded at startup
+        return {
+            'rain': model,
+            'temperature': temperature_model,
+            'temperature_scaler': temperature_scaler,
+            'weather': weather_model,
+            'heatwave': heatwave_model,
+        }
+    return {
+        'rain': joblib.load(os.path.join(model_dir, 'rainfall_model.joblib')),
+        'temperature': joblib.load(os.path.join(model_dir, 'temperature_model.joblib')),
+        'temperature_scaler': joblib.load(os.path.join(model_dir, 'temperauture_scaler.joblib')),
+        'weather': joblib.load(os.path.join(model_dir, 'weather_classifier_model.joblib')),
+        'heatwave': joblib.load(os.path.join(model_dir, 'heatwave_model.joblib')),
+    }
+
+def get_station_model_dir(station_id: Optional[str]) -> str:
+    """Return a station's model directory, or the default one if no station is given."""
+    if station_id is None:
+        return 'model'
+
+    model_dir = station_catalog.model_dir(station_id)
+    if model_dir is None:
+        raise HTTPException(status_code=404, detail=f"No trained models for station '{station_id}'.")
+    return model_dir
+
+def get_station_models(station_id: Optional[str]) -> Dict[str, Any]:
+    """Return the models for a station, or the default models if no station is given."""
+    return load_station_models(get_station_model_dir(station_id))
+
+# Path -> (mtime, artifact) of the files saved next to the stations' models by the pipeline and the update commands
+station_artifacts: Dict[str, Any] = {}
+
+def load_station_artifact(model_dir: str, filename: str, loader) -> Any:
+    """Load a file saved next to a station's models, again whenever it is replaced; None if the station has none."""
+    path = os.path.join(model_dir, filename)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = station_artifacts.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = station_artifacts[path] = (mtime, loader(path))
+    return cached[1]
+
+def load_station_features(model_dir: str) -> Optional[FeatureStore]:
+    """Load the feature store saved next to a station's models, if it has one."""
+    return load_station_artifact(model_dir, FEATURES_FILE, FeatureStore.load)
+
+def get_station_features(station_id: Optional[str]) -> Optional[FeatureStore]:
+    """Return the feature store for a station, or the default one if no station is given."""
+    return load_station_features(get_station_model_dir(station_id))
+
+@app.get("/nearest_stations")
+@instrumented
+def nearest_stations(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    city: Optional[str] = Query(None),
+    k: int = Query(3, ge=1, le=100),
+) -> Dict[str, Any]:
+    """Return the k nearest stations with trained models to a point or a city."""
+    if city is not None:
+        coords = station_catalog.resolve_city(city)
+        if coords is None:
+            raise HTTPException(status_code=404, detail=f"Unknown city '{city}'.")
+        lat, lon = coords
+    elif lat is None or lon is None:
+        raise HTTPException(status_code=400, detail="Provide either a city or both lat and lon.")
+
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "stations": station_catalog.nearest(lat, lon, k=k),
+    }
+
+# --------------- Heatwave episode integration -------------------------------
+def load_station_episodes(model_dir: str) -> Optional[EpisodeIndex]:
+    """Load the heatwave episode index saved next to a station's models, if it has one."""
+    return load_station_artifact(model_dir, EPISODES_FILE, EpisodeIndex.load)
+
+@app.get("/heatwave_events")
+@instrumented
+def heatwave_events(
+    start: Optional[Date] = Query(None, description="First day of the range"),
+    end: Optional[Date] = Query(None, description="Last day of the range"),
+    min_days: int = Query(1, ge=1, description="Minimum episode length in days"),
+    station_id: Optional[str] = Query(None),
+) -> Dict[str, Any]:
+    """Return the heatwave episodes overlapping a date range, with their duration and temperatures."""
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end.")
+
+    index = load_station_episodes(get_station_model_dir(station_id))
+    if index is None:
+        raise HTTPException(status_code=404, detail="No heatwave episode index for this station.")
+
+    found = index.query(start, end, min_days)
+    episodes = found.assign(
+        start_date=found['start_date'].dt.strftime('%Y-%m-%d'),
+        end_date=found['end_date'].dt.strftime('%Y-%m-%d'),
+    )
+    return {
+        "station_id": station_id,
+        "count": len(episodes),
+        "episodes": episodes.to_dict(orient='records'),
+    }
+
+# --------------- Climatology integration ------------------------------------
+def load_station_climatology(model_dir: str) -> Optional[ClimatologyCube]:
+    """Load the climatology cube saved next to a station's models, if it has one."""
+    return load_station_artifact(model_dir, CLIMATOLOGY_FILE, ClimatologyCube.load)
+
+@app.get("/climatology")
+@instrumented
+def climatology(
+    start_year: Optional[int] = Query(None, description="First year (default: first year of data)"),
+    end_year: Optional[int] = Query(None, description="Last year (default: last year of data)"),
+    start_month: int = Query(1, ge=1, le=12, description="First month"),
+    end_month: int = Query(12, ge=1, le=12, description="Last month (wraps around the year if before start_month)"),
+    station_id: Optional[str] = Query(None),
+) -> Dict[str, Any]:
+    """Return rainfall and temperature climatology for a range of years and months."""
+    if start_year is not None and end_year is not None and start_year > end_year:
+        raise HTTPException(status_code=400, detail="start_year must not be after end_year.")
+
+    cube = load_station_climatology(get_station_model_dir(station_id))
+    if cube is None:
+        raise HTTPException(status_code=404, detail="No climatology for this station.")
+
+    return {
+        "station_id": station_id,
+        "start_year": start_year if start_year is not None else cube.first_year,
+        "end_year": end_year if end_year is not None else cube.last_year,
+        **cube.query(start_year, end_year, start_month, end_month),
+    }
+
+# --------------- Forecast bundle integration -------------------------------
+class ForecastBundleRequest(BaseModel):
+    # Inputs shared by the four models (bounds from BUNDLE_SCHEMA)
+    max_temp: float = BUNDLE_SCHEMA.field('max_temp')
+    min_temp: float = BUNDLE_SCHEMA.field('min_temp')
+    rainfall: float = BUNDLE_SCHEMA.field('rainfall')
+
+    # Humidities of the temperature model; without them only the temperature forecast is missing
+    relative_humidity_mean: Optional[float] = BUNDLE_SCHEMA.field('relative_humidity_mean')
+    relative_humidity_max: Optional[float] = BUNDLE_SCHEMA.field('relative_humidity_max')
+    relative_humidity_min: Optional[float] = BUNDLE_SCHEMA.field('relative_humidity_min')
+
+    # Optional 9am/3pm readings of the weather model, filled with the month's training means when left out
+    nine_am_temp: Optional[float] = BUNDLE_SCHEMA.field('nine_am_temp')
+    nine_am_humidity: Optional[float] = BUNDLE_SCHEMA.field('nine_am_humidity')
+    nine_am_cloud: Optional[float] = BUNDLE_SCHEMA.field('nine_am_cloud')
+    nine_am_wind_speed: Optional[float] = BUNDLE_SCHEMA.field('nine_am_wind_speed')
+    three_pm_temp: Optional[float] = BUNDLE_SCHEMA.field('three_pm_temp')
+    three_pm_humidity: Optional[float] = BUNDLE_SCHEMA.field('three_pm_humidity')
+    three_pm_cloud: Optional[float] = BUNDLE_SCHEMA.field('three_pm_cloud')
+    three_pm_wind_speed: Optional[float] = BUNDLE_SCHEMA.field('three_pm_wind_speed')
+
+    date: Optional[Date] = Field(None, description="Day of the observation (default: today)")
+
+    # Cross-field validation of the temperature and humidity ranges
+    @model_validator(mode="after")
+    def check_min_max_relationships(cls, values):
+        return BUNDLE_SCHEMA.check_orders(values)
+
+TEMPERATURE_HUMIDITY_FIELDS = ['relative_humidity_mean', 'relative_humidity_max', 'relative_humidity_min']
+
+def prepare_bundle_features(request: ForecastBundleRequest, day: Date, imputation: ImputationStats) -> Dict[str, Any]:
+    """Assemble every model's features from one observation, sharing the temperatures, calendar and defaults."""
+    tomorrow = calendar_row(day + timedelta(days=1))
+    temperatures = {
+        'Minimum temperature (Degree C)': request.min_temp,
+        'Maximum temperature (Degree C)': request.max_temp,
+    }
+    weather_columns = {
+        'minimum_temp': [request.min_temp],
+        'maximum_temp': [request.max_temp],
+        'rainfall': [request.rainfall],
+        **{field: [getattr(request, field)] for field in WEATHER_OPTIONAL_FIELDS},
+    }
+    features = {
+        'rain': prepare_rain_features(request.max_temp, request.min_temp, request.rainfall),
+        'weather': prepare_weather_features(weather_columns, [day], imputation),
+        'heatwave': pd.DataFrame([temperatures]),
+        'temperature': None,
+    }
+    if all(getattr(request, field) is not None for field in TEMPERATURE_HUMIDITY_FIELDS):
+        features['temperature'] = pd.DataFrame([[request.max_temp, request.min_temp, request.rainfall,
+                                                 request.relative_humidity_mean, request.relative_humidity_max,
+                                                 request.relative_humidity_min,
+                                                 tomorrow['Month'], tomorrow['Day'], tomorrow['Hour']]],
+                                               columns=TEMPERATURE_FEATURES)
+    return features
+
+def predict_bundle_rain(station_models, features) -> Dict[str, Any]:
+    probability = float(station_models['rain'].predict_proba(features)[0][1])
+    return {"will_rain": "Yes" if probability > 0.4 else "No", "score": probability}
+
+def predict_bundle_temperature(station_models, features) -> Dict[str, Any]:
+    # Scaled like /temperature_prediction, with the scaler saved next to the station's model
+    prediction = station_models['temperature'].predict(station_models['temperature_scaler'].transform(features))
+    return {"predicted_temperature": round(prediction[0])}
+
+def predict_bundle_weather(station_models, features) -> Dict[str, Any]:
+    return {"predicted_weather_condition": station_models['weather'].predict(features)[0]}
+
+def predict_bundle_heatwave(station_models, features) -> Dict[str, Any]:
+    # Unscaled temperatures, as heatwave.py fitted the clusters (and as score.py scores them)
+    cluster = int(station_models['heatwave'].predict(features)[0])
+    return {"cluster": cluster, "heatwave": cluster == 1}
+
+BUNDLE_PREDICTORS = {
+    'rain': predict_bundle_rain,
+    'temperature': predict_bundle_temperature,
+    'weather': predict_bundle_weather,
+    'heatwave': predict_bundle_heatwave,
+}
+
+bundle_log = get_logger('/forecast_bundle')
+
+def run_bundle_model(name: str, station_models: Dict[str, Any], features) -> Dict[str, Any]:
+    with stage('predict', model=name):
+        return BUNDLE_PREDICTORS[name](station_models, features)
+
+@app.post("/forecast_bundle")
+@instrumented
+async def create_forecast_bundle(request: ForecastBundleRequest, station_id: Optional[str] = Query(None)) -> Dict[str, Any]:
+    """Run the rain, temperature, weather and heatwave models on one observation, concurrently, in one response."""
+    model_dir = get_station_model_dir(station_id)
+    station_models = load_station_models(model_dir)
+    day = request.date or Date.today()
+    with stage('features'):
+        features = prepare_bundle_features(request, day, load_station_imputation(model_dir))
+
+    response = {"date": day.isoformat(), "station_id": station_id, **dict.fromkeys(BUNDLE_PREDICTORS)}
+    errors = {}
+    names = [name for name in BUNDLE_PREDICTORS if features[name] is not None]
+    if features['temperature'] is None:
+        errors['temperature'] = "relative_humidity_mean, relative_humidity_max and relative_humidity_min are required."
+
+    # Each model runs in its own thread; a failing model leaves the others' results in the response
+    results = await asyncio.gather(*(
+        asyncio.to_thread(run_bundle_model, name, station_models, features[name]) for name in names
+    ), return_exceptions=True)
+
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            bundle_log.error("Prediction failed", exc_info=result, model=name)
+            errors[name] = "Prediction failed."
+            result = None
+        response[name] = result
+    if not any(response.get(name) for name in BUNDLE_PREDICTORS):
+        raise HTTPException(status_code=500, detail="Prediction failed. Please try again later.")
+    response["errors"] = errors
+    return response
+
+# --------------- Forecast table integration --------------------------------
+# Next-day forecasts precomputed by forecast_table.py after each ingest, reloaded when the file is replaced
+forecast_table_file = ForecastTableFile(os.path.join('model', TABLE_FILE))
+
+@app.get("/forecast")
+@instrumented
+def forecast(
+    station_id: Optional[str] = Query(None),
+    date: Optional[Date] = Query(None, description="Forecast day (default: the day after the station's latest observation)"),
+) -> Dict[str, Any]:
+    """Return a station's precomputed rain, temperature, weather and heatwave forecast for a day."""
+    model_dir = get_station_model_dir(station_id)
+    with stage('lookup'):
+        table = forecast_table_file.current()
+        result = table.get(station_id, date)
+    if result is not None:
+        return {"station_id": station_id, "source": "table", **result}
+
+    # Not precomputed yet (e.g. the table predates the last ingest): only the day after the
+    # station's latest observation can be forecast, live, and is kept for the next readers
+    next_day = load_station_state(model_dir, 'rainfall').last_date + timedelta(days=1)
+    if date is not None and date != next_day:
+        raise HTTPException(status_code=404, detail=f"No forecast for {date}; the next forecast day is {next_day}.")
+    with stage('predict', model='forecast'):
+        result = forecast_model_dir(model_dir)
+    table.put(station_id, result)
+    return {"station_id": station_id, "source": "live", **result}
@@ -0,0 +1,323 @@
+"""
+Opt-in memory profiling of the API and of the pipeline's scripts.
+
+API: with MEMORY_PROFILE=1, tracemalloc traces the server's allocations and
+MemoryMiddleware records, per endpoint, the memory each request retained and
+its peak traced memory above its start. Endpoints listed in
+MEMORY_PROFILE_SNAPSHOTS (comma-separated route paths, or '*') also get a
+snapshot taken before and after each request; the diff of the last request
+shows which lines allocated what it kept. The admin endpoints serve:
+
+    GET /admin/memory                              RSS, peak RSS, traced memory, per-endpoint stats
+    GET /admin/memory/top?limit=20                 top allocators since startup
+    GET /admin/memory/top?endpoint=/clusters_visualization   top allocators of that endpoint's last request
+
+Snapshots and per-request peaks are process-wide, so concurrent requests show
+up in each other's numbers; profile one endpoint at a time for clean diffs.
+
+Scripts: `run` executes a script under tracemalloc, as `python script.py`
+would, and writes its peak RSS, peak traced memory and top allocators to a
+JSON report (pipeline.py --memory does this for every stage it runs):
+
+    python memory_profile.py run --report benchmarks/memory/heatwave.json heatwave.py --no-diagnostics
+    python memory_profile.py show benchmarks/memory/heatwave.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import runpy
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+
+REPORT_DIR = 'benchmarks/memory'
+
+# Allocations of the profiler itself and of the import machinery are noise in the reports
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>',
+                 '<unknown>')
+
+
+def rss_mb():
+    """
+    Resident set size of this process in MB (peak RSS where the current one is unavailable).
+
+    Returns:
+        float: RSS in MB.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MB.
+
+    Returns:
+        float: Peak RSS in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10  # bytes on macOS, KB elsewhere
+
+
+def enabled():
+    """Whether MEMORY_PROFILE asks for the API's allocations to be traced."""
+    return os.environ.get('MEMORY_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+
+def take_snapshot():
+    """Snapshot of the traced allocations, without the profiler's and the importer's own."""
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, pattern) for pattern in IGNORED_FILES])
+
+
+def top_stats(snapshot, baseline=None, limit=20, group_by='lineno'):
+    """
+    Largest allocators of a snapshot, or largest growths since a baseline snapshot.
+
+    Args:
+        snapshot (tracemalloc.Snapshot): Snapshot to report.
+        baseline (tracemalloc.Snapshot): Earlier snapshot to diff against (None for absolute sizes).
+        limit (int): Number of allocators to return.
+        group_by (str): 'lineno', 'filename' or 'traceback'.
+
+    Returns:
+        list: One dict per allocator: location, size_kb and count (plus size_diff_kb and count_diff for a diff).
+    """
+    if baseline is not None:
+        stats = snapshot.compare_to(baseline, group_by)
+    else:
+        stats = snapshot.statistics(group_by)
+    rows = []
+    for stat in stats[:limit]:
+        row = {
+            'location': [f'{frame.filename}:{frame.lineno}' for frame in stat.traceback],
+            'size_kb': round(stat.size / 1024, 1),
+            'count': stat.count,
+        }
+        if baseline is not None:
+            row['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+            row['count_diff'] = stat.count_diff
+        rows.append(row)
+    return rows
+
+
+class MemoryTracker:
+    """
+    Per-endpoint memory statistics of the API, and the snapshots behind its reports.
+    """
+
+    def __init__(self, snapshot_endpoints=()):
+        self.snapshot_endpoints = set(snapshot_endpoints)
+        self.baseline = None
+        self.endpoints = {}  # endpoint -> requests, retained_kb, max_peak_kb, last_retained_kb
+        self.last_diff = {}  # endpoint -> (before, after) snapshots of its last profiled request
+        self.lock = threading.Lock()
+
+    def start(self, frames=10):
+        """
+        Start tracing allocations and take the baseline snapshot.
+
+        Args:
+            frames (int): Frames kept per allocation (more makes group_by='traceback' useful, but costs memory).
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.baseline = take_snapshot()
+
+    def wants_snapshots(self, endpoint):
+        return '*' in self.snapshot_endpoints or endpoint in self.snapshot_endpoints
+
+    def record(self, endpoint, retained, peak, snapshots=None):
+        """
+        Record one request.
+
+        Args:
+            endpoint (str): Route path of the request.
+            retained (int): Traced bytes at the end minus at the start.
+            peak (int): Peak traced bytes during the request minus at the start.
+            snapshots (tuple): (before, after) snapshots, for endpoints profiled in detail.
+        """
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, {'requests': 0, 'retained_kb': 0.0, 'max_peak_kb': 0.0,
+                                                         'last_retained_kb': 0.0})
+            stats['requests'] += 1
+            stats['retained_kb'] = round(stats['retained_kb'] + retained / 1024, 1)
+            stats['max_peak_kb'] = max(stats['max_peak_kb'], round(peak / 1024, 1))
+            stats['last_retained_kb'] = round(retained / 1024, 1)
+            if snapshots is not None:
+                self.last_diff[endpoint] = snapshots
+
+    def summary(self):
+        """
+        Process memory and per-endpoint statistics.
+
+        Returns:
+            dict: rss_mb, peak_rss_mb, traced_mb, traced_peak_mb and endpoints.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        with self.lock:
+            endpoints = {name: dict(stats) for name, stats in self.endpoints.items()}
+        return {
+            'rss_mb': round(rss_mb(), 1),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'traced_mb': round(current / 2**20, 1),
+            'traced_peak_mb': round(peak / 2**20, 1),
+            'endpoints': endpoints,
+            'snapshot_endpoints': sorted(self.snapshot_endpoints),
+        }
+
+    def top(self, limit=20, group_by='lineno', endpoint=None):
+        """
+        Top allocators since startup, or of an endpoint's last profiled request.
+
+        Args:
+            limit (int): Number of allocators.
+            group_by (str): 'lineno', 'filename' or 'traceback'.
+            endpoint (str): Route path of a snapshot endpoint (None for everything since startup).
+
+        Returns:
+            list: Rows of top_stats, or None if the endpoint has no profiled request.
+        """
+        if endpoint is not None:
+            with self.lock:
+                snapshots = self.last_diff.get(endpoint)
+            if snapshots is None:
+                return None
+            before, after = snapshots
+            return top_stats(after, before, limit, group_by)
+        return top_stats(take_snapshot(), self.baseline, limit, group_by)
+
+
+tracker = MemoryTracker(filter(None, (p.strip() for p in os.environ.get('MEMORY_PROFILE_SNAPSHOTS', '').split(','))))
+
+
+class MemoryMiddleware:
+    """
+    ASGI middleware recording the traced memory retained and peaked by every HTTP request.
+    """
+
+    def __init__(self, app, tracker=tracker):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not tracemalloc.is_tracing():
+            await self.app(scope, receive, send)
+            return
+
+        path = scope['path']
+        detailed = self.tracker.wants_snapshots(path)
+        before = take_snapshot() if detailed else None
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            # The router has set the matched route by now; its template keeps the endpoints bounded
+            route = scope.get('route')
+            endpoint = route.path if route is not None else 'unmatched'
+            self.tracker.record(endpoint, current - start, peak - start,
+                                (before, take_snapshot()) if detailed else None)
+
+
+def profile_script(path, args=(), limit=25, frames=10):
+    """
+    Run a script as __main__ under tracemalloc and measure its memory.
+
+    Args:
+        path (str): Script to run.
+        args (list): Its command-line arguments.
+        limit (int): Number of top allocators to report.
+        frames (int): Frames kept per allocation.
+
+    Returns:
+        dict: Script, exit code, seconds, peak RSS, peak traced memory and the top allocators
+            that were still alive at the end (or at the failure).
+    """
+    argv, path0 = sys.argv, sys.path[0]
+    sys.argv = [path] + list(args)
+    sys.path[0] = os.path.dirname(os.path.abspath(path))
+    tracemalloc.start(frames)
+    baseline = take_snapshot()
+    start = time.perf_counter()
+    exit_code = 0
+    try:
+        runpy.run_path(path, run_name='__main__')
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        exit_code = 1
+        traceback.print_exc()
+    finally:
+        seconds = time.perf_counter() - start
+        snapshot = take_snapshot()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sys.argv, sys.path[0] = argv, path0
+
+    return {
+        'script': path,
+        'args': list(args),
+        'exit_code': exit_code,
+        'seconds': round(seconds, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'traced_peak_mb': round(traced_peak / 2**20, 1),
+        'top_retained': top_stats(snapshot, baseline, limit),
+    }
+
+
+def format_report(report):
+    """
+    Format a script report as text.
+
+    Args:
+        report (dict): Result of profile_script.
+
+    Returns:
+        str: Summary line and one line per allocator.
+    """
+    lines = [f"{report['script']}: exit {report['exit_code']}, {report['seconds']:.1f}s, "
+             f"peak RSS {report['peak_rss_mb']:.1f} MB, peak traced {report['traced_peak_mb']:.1f} MB",
+             f"{'retained KB':>12}{'blocks':>10}  location"]
+    for row in report['top_retained']:
+        lines.append(f"{row['size_diff_kb']:>12.1f}{row['count_diff']:>10}  {row['location'][0]}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the memory of a script, or show a saved report.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help="Run a script under tracemalloc")
+    run.add_argument('--report', help=f"Where to write the JSON report (default: {REPORT_DIR}/<script>.json)")
+    run.add_argument('--limit', type=int, default=25, help="Number of top allocators to report")
+    run.add_argument('--frames', type=int, default=10, help="Frames kept per allocation")
+    run.add_argument('script', help="Script to run (options of this command go before it)")
+    run.add_argument('args', nargs=argparse.REMAINDER, help="The script's arguments")
+    show = commands.add_parser('show', help="Print a saved report")
+    show.add_argument('report', help="JSON report")
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        with open(args.report) as f:
+            print(format_report(json.load(f)))
+        return
+
+    report = profile_script(args.script, args.args, args.limit, args.frames)
+    path = args.report or os.path.join(REPORT_DIR, os.path.splitext(os.path.basename(args.script))[0] + '.json')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(format_report(report), file=sys.stderr)
+    sys.exit(report['exit_code'])
+
+
+if __name__ == "__main__":
+    main()
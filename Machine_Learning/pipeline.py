@@ -0,0 +1,443 @@
+"""
+Dependency-aware runner for the preprocessing, training and prediction scripts.
+
+Each stage declares the files it reads and writes; the local modules its
+script imports (directly or through other local modules) are inputs too. A
+stage is re-run only when
+one of its outputs is missing or was changed outside the pipeline, one of its
+inputs (data or code) changed since its last successful run, or a stage it
+depends on is re-run. Independent stages run in parallel.
+
+    python pipeline.py --dry-run       # explain what would run and why
+    python pipeline.py                 # rebuild stale stages
+    python pipeline.py heatwave        # rebuild one target and what it needs
+    python pipeline.py --memory        # also report each stage's peak RSS and top allocators
+"""
+
+import argparse
+import ast
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from atomic_write import atomic_write
+
+Stage = namedtuple('Stage', ['name', 'command', 'inputs', 'outputs'])
+
+# Per-stage memory reports of --memory runs
+MEMORY_REPORT_DIR = 'benchmarks/memory'
+
+# Training scripts run without plots inside the pipeline
+TRAIN_FLAGS = ['--no-diagnostics']
+
+STAGES = [
+    Stage('rainfall_preprocess', ['rainfall_preprocess.py'],
+          ['rainfall_preprocess.py', 'rainfall/maxtemperature.csv', 'rainfall/mintemperature.csv', 'rainfall/rainfall.csv'],
+          ['rainfall/temperature_rainfall.csv']),
+    Stage('temperature_train_test', ['temperature_train_test.py'],
+          ['temperature_train_test.py', 'temperature/Weather Data.csv'],
+          ['temperature/train.csv', 'temperature/test.csv']),
+    Stage('weather_preprocess', ['weather_preprocess.py'],
+          ['weather_preprocess.py', 'weather/weather_files/*.csv'],
+          ['weather/merged_weather_data.csv']),
+    Stage('feature_store', ['feature_store.py'],
+          ['feature_store.py', 'rolling_state.py', 'rainfall/temperature_rainfall.csv', 'rainfall/ingested_days.csv'],
+          ['model/features.npz']),
+    Stage('temperature', ['temperature.py'] + TRAIN_FLAGS,
+          ['temperature.py', 'feature_store.py', 'temperature/train.csv', 'temperature/test.csv'],
+          ['model/temperature_model.joblib', 'model/temperauture_scaler.joblib']),
+    Stage('weather_conditions', ['weather_conditions.py'] + TRAIN_FLAGS,
+          ['weather_conditions.py', 'label_rules.py', 'weather_imputation.py', 'weather/merged_weather_data.csv'],
+          ['model/weather_classifier_model.joblib', 'model/weather_imputation.json']),
+    Stage('rainfall_yes_no', ['rainfall_yes_no.py'] + TRAIN_FLAGS,
+          ['rainfall_yes_no.py', 'label_rules.py', 'feature_store.py', 'rainfall/temperature_rainfall.csv'],
+          ['model/rainfall_model.joblib', 'rainfall/rainfall_predictions.csv']),
+    Stage('heatwave', ['heatwave.py'] + TRAIN_FLAGS,
+          ['heatwave.py', 'label_rules.py', 'rainfall/temperature_rainfall.csv'],
+          ['model/heatwave_model.joblib']),
+    Stage('climatology', ['climatology.py', 'build'],
+          ['climatology.py', 'rolling_state.py', 'rainfall/temperature_rainfall.csv', 'rainfall/ingested_days.csv'],
+          ['model/climatology.joblib']),
+    Stage('heatwave_episodes', ['heatwave_episodes.py'],
+          ['heatwave_episodes.py', 'label_rules.py', 'rolling_state.py', 'rainfall/temperature_rainfall.csv',
+           'rainfall/ingested_days.csv'],
+          ['model/heatwave_episodes.csv']),
+    Stage('temperature_backtest', ['temperature_backtest.py'],
+          ['temperature_backtest.py', 'temperature.py', 'temperature/Weather Data.csv'],
+          ['temperature/backtest_metrics.npz']),
+    Stage('rolling_state', ['rolling_state.py', 'build'],
+          ['rolling_state.py', 'temperature/test.csv', 'temperature/ingested_days.csv',
+           'rainfall/temperature_rainfall.csv', 'rainfall/ingested_days.csv'],
+          ['model/temperature_state.joblib', 'model/rainfall_state.joblib', 'model/heatwave_state.joblib']),
+    Stage('temperature_prediction', ['temperature_prediction.py'],
+          ['temperature_prediction.py', 'feature_store.py', 'model/temperature_model.joblib', 'model/temperauture_scaler.joblib',
+           'model/temperature_state.joblib'],
+          ['temperature/predicted_temperatures_next_day.csv']),
+    # Next-day forecasts of every station from its latest state, served by GET /forecast
+    Stage('forecast_table', ['forecast_table.py'],
+          ['forecast_table.py', 'feature_store.py', 'rolling_state.py', 'weather_imputation.py', 'stations/stations.csv',
+           'model/rainfall_model.joblib', 'model/temperature_model.joblib', 'model/temperauture_scaler.joblib',
+           'model/weather_classifier_model.joblib', 'model/heatwave_model.joblib', 'model/weather_imputation.json',
+           'model/temperature_state.joblib', 'model/rainfall_state.joblib'],
+          ['model/forecast_table.json']),
+]
+
+STATE_PATH = '.pipeline_state.json'
+
+
+def expand(paths):
+    """
+    Expand glob patterns in a list of paths.
+
+    Args:
+        paths (list): File paths, possibly containing glob patterns.
+
+    Returns:
+        list: Sorted, concrete file paths (patterns with no match are dropped).
+    """
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(path)) if glob.has_magic(path) else [path])
+    return files
+
+
+def imported_modules(path, in_functions=True):
+    """
+    Local modules imported by a Python file.
+
+    Args:
+        path (str): Python file.
+        in_functions (bool): Also count the imports inside functions, which only run when
+            the function is called (e.g. a script's main).
+
+    Returns:
+        list: Sorted paths of the imported modules that are files in this directory.
+    """
+    with open(path, encoding='utf-8') as f:
+        todo = [ast.parse(f.read(), path)]
+    names = set()
+    while todo:
+        node = todo.pop()
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+        if in_functions or not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            todo.extend(ast.iter_child_nodes(node))
+    return sorted(f'{name}.py' for name in names if os.path.exists(f'{name}.py'))
+
+
+def stage_inputs(stage):
+    """
+    Inputs of a stage: its declared files, its script and the local modules the script imports.
+
+    The modules are followed through their own module-level imports. Imports inside
+    their functions are not, as the script may never call those functions.
+
+    Args:
+        stage (Stage): The stage.
+
+    Returns:
+        list: Concrete file paths, declared ones first.
+    """
+    inputs = expand(stage.inputs)
+    script = stage.command[0]
+    code, todo = [script], imported_modules(script)
+    while todo:
+        path = todo.pop()
+        if path not in code:
+            code.append(path)
+            todo.extend(imported_modules(path, in_functions=False))
+    return inputs + sorted(set(code) - set(inputs))
+
+
+class FileSignatures:
+    """
+    Content hashes of files, re-hashed only when their size or mtime changes.
+    """
+
+    def __init__(self, known=None):
+        self.known = known or {}
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        """
+        Return the signature of a file.
+
+        Args:
+            path (str): File path.
+
+        Returns:
+            str: SHA-256 of the file content, or None if it does not exist.
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        with self.lock:
+            cached = self.known.get(path)
+        if cached and cached['size'] == st.st_size and cached['mtime_ns'] == st.st_mtime_ns:
+            return cached['sha256']
+
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        with self.lock:
+            self.known[path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': h.hexdigest()}
+        return h.hexdigest()
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {'files': {}, 'stages': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_PATH):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+
+    atomic_write(path, write)
+
+
+def upstream_stages(stages):
+    """
+    Map each stage to the stages producing its inputs.
+
+    Args:
+        stages (list): Stages of the pipeline.
+
+    Returns:
+        dict: Stage name -> set of upstream stage names.
+    """
+    producers = {output: s.name for s in stages for output in s.outputs}
+    return {s.name: {producers[i] for i in s.inputs if i in producers and producers[i] != s.name} for s in stages}
+
+
+def select_stages(stages, targets):
+    """
+    Select the target stages and everything they depend on.
+
+    Args:
+        stages (list): Stages of the pipeline.
+        targets (list): Target stage names or output paths (empty for all).
+
+    Returns:
+        list: Selected stages in declaration order.
+    """
+    if not targets:
+        return list(stages)
+
+    by_output = {output: s.name for s in stages for output in s.outputs}
+    names = {s.name for s in stages}
+    upstream = upstream_stages(stages)
+
+    selected, todo = set(), []
+    for target in targets:
+        name = target if target in names else by_output.get(target)
+        if name is None:
+            raise SystemExit(f"Unknown target: {target}")
+        todo.append(name)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(upstream[name])
+    return [s for s in stages if s.name in selected]
+
+
+def stale_reasons(stage, state, signatures):
+    """
+    Explain why a stage needs to run, ignoring upstream stages.
+
+    Args:
+        stage (Stage): The stage to check.
+        state (dict): Pipeline state from the last runs.
+        signatures (FileSignatures): File signature cache.
+
+    Returns:
+        list: Human-readable reasons; empty if the stage is up to date.
+    """
+    record = state['stages'].get(stage.name)
+    if record is None:
+        return ["never run by the pipeline"]
+
+    reasons = []
+    inputs = stage_inputs(stage)
+    for path in inputs:
+        sig = signatures.get(path)
+        if sig is None:
+            reasons.append(f"input missing: {path}")
+        elif record['inputs'].get(path) != sig:
+            reasons.append(f"input changed: {path}")
+    for path in set(record['inputs']) - set(inputs):
+        reasons.append(f"input removed: {path}")
+    for path in stage.outputs:
+        sig = signatures.get(path)
+        if sig is None:
+            reasons.append(f"output missing: {path}")
+        elif record['outputs'].get(path) != sig:
+            reasons.append(f"output modified outside the pipeline: {path}")
+    return reasons
+
+
+def plan(stages, state, signatures, force=False):
+    """
+    Decide which stages will run, propagating staleness downstream.
+
+    Args:
+        stages (list): Selected stages.
+        state (dict): Pipeline state from the last runs.
+        signatures (FileSignatures): File signature cache.
+        force (bool): Run every selected stage.
+
+    Returns:
+        dict: Stage name -> list of reasons, for stages that will run.
+    """
+    upstream = upstream_stages(stages)
+    reasons = {}
+    # Stages are declared in dependency order, so upstream decisions are known first
+    for stage in stages:
+        why = ["forced"] if force else stale_reasons(stage, state, signatures)
+        why += [f"upstream stage will run: {u}" for u in sorted(upstream[stage.name]) if u in reasons]
+        if why:
+            reasons[stage.name] = why
+    return reasons
+
+
+def run_stage(stage, memory=False):
+    """
+    Run a stage's script as a subprocess.
+
+    Args:
+        stage (Stage): The stage to run.
+        memory (bool): Run it under memory_profile.py, which writes its memory report to
+            benchmarks/memory/<stage>.json.
+
+    Returns:
+        tuple: (return code, seconds, combined output).
+    """
+    command = stage.command
+    if memory:
+        report = os.path.join(MEMORY_REPORT_DIR, f'{stage.name}.json')
+        command = ['memory_profile.py', 'run', '--report', report] + command
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + command, capture_output=True, text=True)
+    return result.returncode, time.perf_counter() - start, result.stdout + result.stderr
+
+
+def peak_memory(stage):
+    """Peak RSS in MB recorded by the stage's last memory report, or None."""
+    try:
+        with open(os.path.join(MEMORY_REPORT_DIR, f'{stage.name}.json')) as f:
+            return json.load(f)['peak_rss_mb']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def run(stages, to_run, state, signatures, jobs, memory=False):
+    """
+    Run the planned stages, starting each as soon as its upstream stages have finished.
+
+    Args:
+        stages (list): Selected stages.
+        to_run (dict): Stage name -> reasons, from plan().
+        state (dict): Pipeline state, updated and saved after each successful stage.
+        signatures (FileSignatures): File signature cache.
+        jobs (int): Maximum number of stages running at once.
+        memory (bool): Profile the memory of every stage (see run_stage).
+
+    Returns:
+        bool: True if every planned stage succeeded.
+    """
+    upstream = upstream_stages(stages)
+    by_name = {s.name: s for s in stages}
+    pending = [s.name for s in stages if s.name in to_run]
+    done, failed, running = set(), set(), {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            # Skip stages whose upstream failed; start those whose upstream is done
+            for name in list(pending):
+                waiting_on = {u for u in upstream[name] if u in to_run}
+                if waiting_on & failed:
+                    print(f"[skip] {name}: upstream failed")
+                    pending.remove(name)
+                    failed.add(name)
+                elif waiting_on <= done:
+                    print(f"[run ] {name}: {'; '.join(to_run[name])}")
+                    running[pool.submit(run_stage, by_name[name], memory)] = name
+                    pending.remove(name)
+
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                code, seconds, output = future.result()
+                if code != 0:
+                    print(f"[fail] {name} ({seconds:.1f}s)\n{output}")
+                    failed.add(name)
+                    continue
+
+                stage = by_name[name]
+                state['stages'][name] = {
+                    'inputs': {p: signatures.get(p) for p in stage_inputs(stage)},
+                    'outputs': {p: signatures.get(p) for p in stage.outputs},
+                    'seconds': round(seconds, 3),
+                }
+                peak = peak_memory(stage) if memory else None
+                if peak is not None:
+                    state['stages'][name]['peak_rss_mb'] = peak
+                state['files'] = signatures.known
+                save_state(state)
+                print(f"[done] {name} ({seconds:.1f}s" + (f", peak RSS {peak:.0f} MB)" if peak is not None else ")"))
+                done.add(name)
+
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild stale pipeline outputs.")
+    parser.add_argument('targets', nargs='*', help="Stage names or output paths to build (default: everything)")
+    parser.add_argument('--dry-run', action='store_true', help="Explain which stages would run and why")
+    parser.add_argument('--force', action='store_true', help="Run every selected stage")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="Stages to run in parallel")
+    parser.add_argument('--memory', action='store_true',
+                        help=f"Profile each stage's memory under tracemalloc (reports in {MEMORY_REPORT_DIR}/)")
+    args = parser.parse_args()
+
+    state = load_state()
+    signatures = FileSignatures(state['files'])
+    stages = select_stages(STAGES, args.targets)
+    to_run = plan(stages, state, signatures, args.force)
+
+    if args.dry_run:
+        for stage in stages:
+            if stage.name in to_run:
+                print(f"{stage.name}: would run")
+                for reason in to_run[stage.name]:
+                    print(f"    - {reason}")
+            else:
+                print(f"{stage.name}: up to date")
+        return
+
+    if not to_run:
+        print("Everything is up to date.")
+        return
+    if not run(stages, to_run, state, signatures, args.jobs, args.memory):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
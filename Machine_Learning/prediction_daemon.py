@@ -0,0 +1,320 @@
+"""
+Long-lived local daemon keeping the prediction scripts' models warm.
+
+The daemon loads the four models and the rolling states once and answers
+JSON-lines requests on a Unix socket. A file that is replaced (by a retrain
+or a rolling_state.py update) is reloaded on the next request that needs it.
+The predictions are made by the scripts' own functions, so they match a
+local run.
+
+The prediction scripts take --daemon to send their inputs to the daemon
+instead of importing pandas and scikit-learn and loading the models. When
+the daemon is not running, they print a note and predict locally. This
+module's client side only uses the standard library.
+
+    python prediction_daemon.py serve &
+    python rainfall_yes_no_prediction.py --daemon
+    python prediction_daemon.py status
+    python prediction_daemon.py stop
+
+Protocol: one JSON object per line each way, several per connection.
+
+    {"model": "rain"}                                   -> {"ok": true, "result": {"prediction": "N"}}
+    {"model": "weather", "input": {"Rainfall (mm)": 0, ...}}
+    {"command": "status"} / {"command": "stop"}
+    errors                                              -> {"ok": false, "error": "..."}
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+SOCKET_PATH = os.environ.get('PREDICTION_SOCKET', 'model/prediction_daemon.sock')
+
+MODELS = ['rain', 'temperature', 'weather', 'heatwave']
+
+
+class DaemonError(RuntimeError):
+    """A request the daemon received but could not answer."""
+
+
+def request(message, socket_path=SOCKET_PATH, timeout=60.0):
+    """
+    Send one request to the daemon and wait for its answer.
+
+    Args:
+        message (dict): Request, e.g. {"model": "rain"} or {"command": "status"}.
+        socket_path (str): Socket of the daemon.
+        timeout (float): Seconds to wait for the connection and the answer.
+
+    Returns:
+        dict: The result.
+
+    Raises:
+        OSError: If the daemon is not running or the connection fails.
+        DaemonError: If the daemon answered with an error.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("The prediction daemon closed the connection without answering")
+    response = json.loads(line)
+    if not response.get('ok'):
+        raise DaemonError(response.get('error'))
+    return response['result']
+
+
+def add_arguments(parser):
+    """
+    Add the --daemon and --socket options of a prediction script.
+
+    Args:
+        parser (argparse.ArgumentParser): The script's parser.
+    """
+    parser.add_argument('--daemon', action='store_true',
+                        help="Ask the prediction daemon instead of loading the models (local fallback if it is not running)")
+    parser.add_argument('--socket', default=SOCKET_PATH, help="Socket of the prediction daemon")
+
+
+def ask(args, model, inputs=None):
+    """
+    Predict with the daemon if the script was run with --daemon.
+
+    Args:
+        args (argparse.Namespace): Parsed options of add_arguments.
+        model (str): One of MODELS.
+        inputs (dict): Inputs of the prediction, for models that take any.
+
+    Returns:
+        dict: The daemon's result, or None to predict locally (no --daemon, or the daemon is not running).
+    """
+    if not args.daemon:
+        return None
+    try:
+        return request({'model': model, 'input': inputs}, args.socket)
+    except OSError as e:
+        print(f"Prediction daemon unavailable at {args.socket} ({e}); predicting locally", file=sys.stderr)
+        return None
+
+
+class WarmFile:
+    """
+    An artifact loaded from a file once, and again whenever the file is replaced.
+    """
+
+    def __init__(self, path, loader):
+        """
+        Args:
+            path (str): File to watch.
+            loader (callable): Called with the path to (re)load the artifact.
+        """
+        self.path = path
+        self.loader = loader
+        self.mtime = None
+        self.value = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        """
+        Return the artifact, reloading it if its file changed since it was loaded.
+
+        Returns:
+            The artifact.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None  # The loader reports (or, for rolling states, builds) a missing file
+        with self.lock:
+            if self.value is None or mtime != self.mtime:
+                self.value = self.loader(self.path)
+                self.mtime = mtime
+            return self.value
+
+
+class WarmModels:
+    """
+    The prediction scripts' models and states, kept loaded, and their predictions.
+    """
+
+    def __init__(self):
+        # The ML stack is only imported by the daemon itself, never by the clients
+        import joblib
+        import heatwave_prediction
+        import rainfall_yes_no_prediction
+        import temperature_prediction
+        import weather_prediction
+        from rolling_state import SOURCES, load_state
+
+        self.scripts = {
+            'rain': rainfall_yes_no_prediction,
+            'temperature': temperature_prediction,
+            'weather': weather_prediction,
+            'heatwave': heatwave_prediction,
+        }
+        self.files = {
+            'rain_model': WarmFile('model/rainfall_model.joblib', joblib.load),
+            'temperature_model': WarmFile('model/temperature_model.joblib', joblib.load),
+            'temperature_scaler': WarmFile('model/temperauture_scaler.joblib', joblib.load),
+            'weather_model': WarmFile('model/weather_classifier_model.joblib', joblib.load),
+            'heatwave_model': WarmFile('model/heatwave_model.joblib', joblib.load),
+            'rainfall_state': WarmFile(SOURCES['rainfall']['state_path'], lambda path: load_state('rainfall')),
+            'temperature_state': WarmFile(SOURCES['temperature']['state_path'], lambda path: load_state('temperature')),
+        }
+        self.started = time.time()
+        self.requests = {model: 0 for model in MODELS}
+        self.lock = threading.Lock()
+
+    def warm(self):
+        """Load every artifact, so the first requests do not pay for it."""
+        for file in self.files.values():
+            file.get()
+
+    def predict(self, model, inputs=None):
+        """
+        Make one of the scripts' predictions.
+
+        Args:
+            model (str): One of MODELS.
+            inputs (dict): Weather conditions for the weather model, as weather_prediction.get_user_input returns them.
+
+        Returns:
+            dict: JSON-serializable result.
+        """
+        if model not in self.scripts:
+            raise DaemonError(f"Unknown model {model!r}; expected one of {', '.join(MODELS)}")
+        script = self.scripts[model]
+        with self.lock:
+            self.requests[model] += 1
+
+        if model == 'rain':
+            features = script.prepare_features_for_prediction(self.files['rainfall_state'].get())
+            return {'prediction': script.predict_rain_tomorrow(self.files['rain_model'].get(), features)}
+
+        if model == 'temperature':
+            next_day_df = script.next_day_predictions(self.files['temperature_state'].get(),
+                                                      self.files['temperature_model'].get(),
+                                                      self.files['temperature_scaler'].get())
+            return {
+                'date': str(next_day_df['Datetime'].iloc[0]),
+                'predicted_temperature': float(next_day_df['PredictedTemperatureMean'].iloc[0]),
+                'csv': next_day_df.to_csv(index=False),
+            }
+
+        if model == 'weather':
+            if not inputs:
+                raise DaemonError("The weather model needs the weather conditions as input")
+            return {'prediction': str(script.predict_weather(inputs, self.files['weather_model'].get()))}
+
+        today_data = script.predict_tomorrow(self.files['heatwave_model'].get(), self.files['rainfall_state'].get())
+        return {
+            'date': today_data['Date'].iloc[0].isoformat(),
+            'cluster': int(today_data['Predicted Cluster'].iloc[0]),
+            'table': script.format_predictions(today_data),
+        }
+
+    def status(self):
+        with self.lock:
+            requests = dict(self.requests)
+        return {'pid': os.getpid(), 'uptime_seconds': round(time.time() - self.started, 1), 'requests': requests}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Answer the JSON-lines requests of one connection.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+                command = message.get('command')
+                if command == 'status':
+                    result = self.server.models.status()
+                elif command == 'stop':
+                    result = {'stopping': True}
+                    threading.Thread(target=self.server.shutdown).start()
+                elif command is not None:
+                    raise DaemonError(f"Unknown command {command!r}")
+                else:
+                    result = self.server.models.predict(message.get('model'), message.get('input'))
+                response = {'ok': True, 'result': result}
+            except Exception as e:
+                response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class PredictionServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, models):
+        self.models = models
+        super().__init__(socket_path, RequestHandler)
+
+
+def serve(socket_path=SOCKET_PATH):
+    """
+    Run the daemon until it is stopped (stop command, SIGTERM or Ctrl-C).
+
+    Args:
+        socket_path (str): Socket to listen on; a stale socket file left by a killed daemon is replaced.
+    """
+    if os.path.exists(socket_path):
+        try:
+            request({'command': 'status'}, socket_path, timeout=2.0)
+        except OSError:
+            os.unlink(socket_path)
+        else:
+            sys.exit(f"A prediction daemon is already running on {socket_path}")
+
+    start = time.perf_counter()
+    models = WarmModels()
+    models.warm()
+    os.makedirs(os.path.dirname(socket_path) or '.', exist_ok=True)
+    server = PredictionServer(socket_path, models)
+    os.chmod(socket_path, 0o600)  # Local predictions for this user only
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    print(f"Prediction daemon {os.getpid()} listening on {socket_path} "
+          f"(models loaded in {time.perf_counter() - start:.2f}s)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the prediction scripts' models from a warm local process.")
+    parser.add_argument('command', choices=['serve', 'status', 'stop'],
+                        help="serve: run the daemon; status: show its uptime and request counts; stop: shut it down")
+    parser.add_argument('--socket', default=SOCKET_PATH, help="Unix socket of the daemon (or PREDICTION_SOCKET)")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.socket)
+        return
+    try:
+        result = request({'command': args.command}, args.socket)
+    except OSError as e:
+        sys.exit(f"No prediction daemon on {args.socket} ({e})")
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
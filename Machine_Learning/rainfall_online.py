@@ -0,0 +1,272 @@
+"""
+Incrementally updatable rain (yes/no) model.
+
+Instead of refitting the decision tree on every row since 1970 each day, this
+model is updated in place with each new batch of daily observations using a
+logistic-loss SGDClassifier (partial_fit) on standardized features. It keeps
+the previous day's rainfall between batches so Previous_Rainfall matches
+rainfall_yes_no.feature_engineering, checkpoints itself periodically, and
+tracks its accuracy on each batch before learning from it (prequential
+evaluation), optionally alongside a full-retrain baseline model.
+
+    python rainfall_online.py replay   # replay history, compare with periodic full retrains
+    python rainfall_online.py update   # learn from the ingested days newer than the checkpoint
+"""
+
+import argparse
+import datetime
+import os
+import time
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+from atomic_write import atomic_write
+from rolling_state import ingested_after, read_source
+
+FEATURES = ['Maximum temperature (Degree C)', 'Minimum temperature (Degree C)', 'Previous_Rainfall']
+RAINFALL = 'Rainfall amount (millimetres)'
+CHECKPOINT_PATH = 'model/rainfall_online_model.joblib'
+
+
+class OnlineRainModel:
+    """
+    Rain classifier that learns from new observations without a full retrain.
+    """
+
+    def __init__(self, checkpoint_path=CHECKPOINT_PATH, checkpoint_every=30):
+        self.scaler = StandardScaler()
+        self.model = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.last_rainfall = None
+        self.last_date = None
+        self.updates_since_checkpoint = 0
+        self.metrics = {'rows': 0, 'online_correct': 0, 'baseline_rows': 0, 'baseline_correct': 0}
+
+    @property
+    def is_fitted(self):
+        return hasattr(self.model, 'coef_')
+
+    def prepare(self, rows):
+        """
+        Build features and targets from new rows in the temperature_rainfall.csv schema.
+
+        Works on NumPy arrays rather than DataFrame operations so single-day
+        updates stay well under a millisecond of preparation.
+
+        Args:
+            rows (pd.DataFrame): New daily observations, oldest first.
+
+        Returns:
+            tuple: (X ndarray with FEATURES columns, y ndarray) for rows with a known previous-day rainfall.
+        """
+        tmax = rows['Maximum temperature (Degree C)'].to_numpy(dtype=float)
+        tmin = rows['Minimum temperature (Degree C)'].to_numpy(dtype=float)
+        rainfall = np.nan_to_num(rows[RAINFALL].to_numpy(dtype=float), nan=0.0)  # missing rainfall counts as 0
+        y = (rainfall > 0).astype(int)  # same rule as RAINY_RULES
+
+        # Previous-day rainfall, carried across batches
+        previous = np.empty_like(rainfall)
+        previous[1:] = rainfall[:-1]
+        if len(rainfall):
+            previous[0] = np.nan if self.last_rainfall is None else self.last_rainfall
+            self.last_rainfall = float(rainfall[-1])
+            self.last_date = tuple(int(v) for v in rows[['Year', 'Month', 'Day']].iloc[-1])
+
+        X = np.column_stack([tmax, tmin, previous])
+        keep = ~np.isnan(X).any(axis=1)
+        return X[keep], y[keep]
+
+    def _transform(self, X):
+        values = np.array(X, dtype=float)
+        values[:, 2] = np.log1p(values[:, 2])  # rainfall is heavily skewed
+        return values
+
+    def update(self, rows, baseline=None):
+        """
+        Evaluate on, then learn from, a batch of new observations.
+
+        Args:
+            rows (pd.DataFrame): New daily observations, oldest first.
+            baseline: Optional fitted full-retrain model scored on the same rows.
+
+        Returns:
+            dict: Rows learned from and batch accuracy of the online and baseline models.
+        """
+        X, y = self.prepare(rows)
+        if len(y) == 0:
+            return {'rows': 0}
+
+        values = self._transform(X)
+        result = {'rows': len(y)}
+
+        # Prequential evaluation: score the batch before the model has seen it
+        if self.is_fitted:
+            correct = int((self.model.predict(self.scaler.transform(values)) == y).sum())
+            self.metrics['rows'] += len(y)
+            self.metrics['online_correct'] += correct
+            result['online_accuracy'] = correct / len(y)
+            if baseline is not None:
+                baseline_correct = int((baseline.predict(pd.DataFrame(X, columns=FEATURES)) == y).sum())
+                self.metrics['baseline_rows'] += len(y)
+                self.metrics['baseline_correct'] += baseline_correct
+                result['baseline_accuracy'] = baseline_correct / len(y)
+
+        self.scaler.partial_fit(values)
+        self.model.partial_fit(self.scaler.transform(values), y, classes=np.array([0, 1]))
+
+        self.updates_since_checkpoint += 1
+        if self.checkpoint_path and self.updates_since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+        return result
+
+    def ingest(self, df, baseline=None):
+        """
+        Learn from the rows of an ingested dataset that are newer than the last update.
+
+        Args:
+            df (pd.DataFrame): Full or partial temperature_rainfall.csv data.
+            baseline: Optional fitted full-retrain model scored on the same rows.
+
+        Returns:
+            dict: Result of update() for the new rows.
+        """
+        if self.last_date is not None:
+            year, month, day = self.last_date
+            date_key = df['Year'] * 10000 + df['Month'] * 100 + df['Day']
+            df = df[date_key > year * 10000 + month * 100 + day]
+        return self.update(df, baseline)
+
+    def predict_proba(self, X):
+        """
+        Predict rain probabilities.
+
+        Args:
+            X (pd.DataFrame): Rows with the FEATURES columns.
+
+        Returns:
+            ndarray: Probabilities for [no rain, rain] per row.
+        """
+        return self.model.predict_proba(self.scaler.transform(self._transform(X[FEATURES])))
+
+    def accuracy(self):
+        """
+        Running prequential accuracy of the online and baseline models.
+
+        Returns:
+            dict: online and baseline accuracy (None until rows have been scored).
+        """
+        m = self.metrics
+        return {
+            'online': m['online_correct'] / m['rows'] if m['rows'] else None,
+            'baseline': m['baseline_correct'] / m['baseline_rows'] if m['baseline_rows'] else None,
+        }
+
+    def checkpoint(self, path=None):
+        """
+        Atomically save the model.
+
+        Args:
+            path (str): Destination, defaulting to the model's checkpoint path.
+        """
+        path = path or self.checkpoint_path
+        # Saved as a plain attribute dict, so files written from the command line (where
+        # this class lives in __main__) load from any module
+        atomic_write(path, lambda tmp_path: joblib.dump(vars(self), tmp_path))
+        self.updates_since_checkpoint = 0
+
+    @classmethod
+    def load(cls, path=CHECKPOINT_PATH):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(joblib.load(path))
+        return obj
+
+
+def replay(data, warmup_years=10, baseline_every=30, batch_days=1):
+    """
+    Replay the history day by day, comparing the online model to periodic full retrains.
+
+    The baseline is rainfall_yes_no's DecisionTreeClassifier refitted on all rows
+    seen so far every baseline_every days; both models are scored on each day
+    before learning from it.
+
+    Args:
+        data (pd.DataFrame): temperature_rainfall.csv data, oldest first.
+        warmup_years (int): Years used to bootstrap both models.
+        baseline_every (int): Days between full retrains of the baseline.
+        batch_days (int): Days per online update.
+
+    Returns:
+        OnlineRainModel: The updated model.
+    """
+    online = OnlineRainModel(checkpoint_path=None)
+    warmup = data['Year'] < data['Year'].iloc[0] + warmup_years
+    online.update(data[warmup])
+
+    def fit_baseline(rows):
+        X, y = OnlineRainModel(checkpoint_path=None).prepare(rows)
+        return DecisionTreeClassifier(random_state=42).fit(pd.DataFrame(X, columns=FEATURES), y)
+
+    stream = data[~warmup]
+    baseline, retrain_seconds, update_seconds = fit_baseline(data[warmup]), [], []
+    for i, start in enumerate(range(0, len(stream), batch_days)):
+        batch = stream.iloc[start:start + batch_days]
+        t = time.perf_counter()
+        online.update(batch, baseline=baseline)
+        update_seconds.append(time.perf_counter() - t)
+
+        if (i + 1) % baseline_every == 0:
+            t = time.perf_counter()
+            baseline = fit_baseline(data.iloc[:warmup.sum() + start + len(batch)])
+            retrain_seconds.append(time.perf_counter() - t)
+
+    accuracy = online.accuracy()
+    print(f"Replayed {len(stream):,} days after a {warmup_years}-year warm-up")
+    print(f"Online accuracy:   {accuracy['online']:.3f}  (mean update {np.mean(update_seconds) * 1000:.2f} ms)")
+    print(f"Baseline accuracy: {accuracy['baseline']:.3f}  (full retrain every {baseline_every} days, "
+          f"mean {np.mean(retrain_seconds) * 1000:.1f} ms)")
+    return online
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally updated rain model.")
+    parser.add_argument('command', choices=['replay', 'update'],
+                        help="replay: bootstrap from history and compare with full retrains; "
+                             "update: learn from rows newer than the checkpoint")
+    parser.add_argument('--data', help="Observations (default: replay rainfall/temperature_rainfall.csv and its ingested "
+                                       "days; update the days of rainfall/ingested_days.csv after the checkpoint)")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH, help="Checkpoint path")
+    parser.add_argument('--warmup-years', type=int, default=10, help="Years used to bootstrap (replay)")
+    parser.add_argument('--baseline-every', type=int, default=30, help="Days between baseline retrains (replay)")
+    args = parser.parse_args()
+
+    if args.command == 'replay':
+        data = pd.read_csv(args.data) if args.data else read_source('rainfall')
+        online = replay(data, args.warmup_years, args.baseline_every)
+        online.checkpoint(args.checkpoint)
+        print(f"Checkpoint saved to {args.checkpoint}")
+        return
+
+    if os.path.exists(args.checkpoint):
+        online = OnlineRainModel.load(args.checkpoint)
+    elif args.data:
+        online = OnlineRainModel(args.checkpoint)
+    else:
+        parser.error(f"no checkpoint at {args.checkpoint}; bootstrap it with replay first")
+    if args.data:
+        data = pd.read_csv(args.data)
+    else:
+        # Only the ingest CSV's rows after the checkpoint, not the history the model has learned
+        data = ingested_after('rainfall', datetime.date(*online.last_date) if online.last_date else None)
+    start = time.perf_counter()
+    result = online.ingest(data)  # Skips the days up to the last one learned
+    online.checkpoint(args.checkpoint)
+    print(f"Learned from {result['rows']} new rows in {(time.perf_counter() - start) * 1000:.1f} ms; "
+          f"last observation {online.last_date}")
+
+
+if __name__ == "__main__":
+    main()
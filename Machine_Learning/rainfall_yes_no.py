@@ -1,6 +1,9 @@
 """
 Classifies with it rain or not
 """
+import argparse
+import os
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.tree import DecisionTreeClassifier
@@ -8,7 +11,15 @@ from sklearn.metrics import classification_report, accuracy_score
 import matplotlib.pyplot as plt
 import seaborn as sns
 import joblib
-
+from label_rules import label_rainy
+from feature_store import add_lag_features
+from stage_timing import timed_stage
+from stage_cache import cached_stage
+import label_rules
+import feature_store
+import diagnostics
+
+@cached_stage
 def load_data(filepath):
     """
     Load the dataset from a CSV file.
@@ -22,6 +33,7 @@ def load_data(filepath):
     data = pd.read_csv(filepath)
     return pd.DataFrame(data)
 
+@cached_stage(depends=(label_rules,))
 def clean_data(df):
     """
     Clean the dataset by filling missing values and creating a binary target variable.
@@ -34,9 +46,10 @@ def clean_data(df):
     """
     # Fill missing rainfall amounts with 0 and create a binary column indicating rain.
     df['Rainfall amount (millimetres)'] = df['Rainfall amount (millimetres)'].fillna(0)
-    df['Rainy'] = (df['Rainfall amount (millimetres)'] > 0).astype(int)  # 1 for rain, 0 for no rain
+    df['Rainy'] = label_rainy(df)  # 1 for rain, 0 for no rain
     return df
 
+@cached_stage(depends=(feature_store,))
 def feature_engineering(df):
     """
     Perform feature engineering by creating new features based on existing data.
@@ -47,8 +60,8 @@ def feature_engineering(df):
     Returns:
     - df (DataFrame): DataFrame with new features added.
     """
-    # Create a new feature for the previous day's rainfall.
-    df['Previous_Rainfall'] = df['Rainfall amount (millimetres)'].shift(1)  # Shift for previous day's rainfall
+    # Create a new feature for the previous day's rainfall, as the feature store computes it.
+    df = add_lag_features(df)
     
     # Drop rows with NaN values created by shifting (first row).
     df.dropna(inplace=True)
@@ -81,14 +94,14 @@ def data_analysis(df):
     # Plot histograms for numerical features
     df.hist(bins=30, figsize=(15, 10), color='blue', alpha=0.7)
     plt.suptitle('Histograms of Numerical Features')
-    plt.show()
+    diagnostics.show('histograms')
 
     # Plot correlation matrix
     plt.figure(figsize=(12, 8))
     correlation_matrix = df.corr()
     sns.heatmap(correlation_matrix, annot=True, fmt=".2f", cmap='coolwarm', square=True)
     plt.title('Correlation Matrix')
-    plt.show()
+    diagnostics.show('correlation_matrix')
 
 def train_model(X_train, y_train, model_filepath='rainfall/decision_tree_model.joblib'):
     """
@@ -138,7 +151,7 @@ def make_predictions(model, X_test):
     - probabilities (ndarray): Predicted probabilities for both classes.
     """
     probabilities = model.predict_proba(X_test)  # Get probabilities for both classes
-    predictions = [1 if prob[1] > 0.5 else 0 for prob in probabilities]  # Threshold of 50% for rain prediction
+    predictions = (probabilities[:, 1] > 0.5).astype(int)  # Threshold of 50% for rain prediction
     return predictions, probabilities
 
 def save_predictions(df, predictions, probabilities, df_test_indices):
@@ -147,16 +160,16 @@ def save_predictions(df, predictions, probabilities, df_test_indices):
 
     Args:
     - df (DataFrame): Original DataFrame containing the rainfall data.
-    - predictions (list): List of predicted labels.
+    - predictions (ndarray): Predicted class labels.
     - probabilities (ndarray): Predicted probabilities for both classes.
     - df_test_indices (Index): Indices of the test data in the original DataFrame.
     
     Returns:
     - df (DataFrame): DataFrame with predictions and probabilities added.
     """
-    df.loc[df_test_indices, 'Predicted_Rainy'] = ['Y' if pred == 1 else 'N' for pred in predictions]
+    df.loc[df_test_indices, 'Predicted_Rainy'] = np.where(np.asarray(predictions) == 1, 'Y', 'N')
     df['Predicted_Rainy'] = df['Predicted_Rainy'].fillna('N')  # Fill missing predictions with 'N'
-    df.loc[df_test_indices, 'Probability_of_Rain'] = [prob[1] for prob in probabilities]
+    df.loc[df_test_indices, 'Probability_of_Rain'] = probabilities[:, 1]
     return df
 
 def calculate_metrics(y_test, predictions):
@@ -165,7 +178,7 @@ def calculate_metrics(y_test, predictions):
 
     Args:
     - y_test (Series): Actual target variable for testing.
-    - predictions (list): Predicted class labels.
+    - predictions (ndarray): Predicted class labels.
 
     Returns:
     - accuracy (float): Accuracy score of the predictions.
@@ -199,9 +212,51 @@ def visualize_results(df):
     plt.ylabel('Density')
     plt.legend()
     plt.grid()
-    plt.show()
+    diagnostics.show('predictions')
+
+def train(output_dir='.', timings=None):
+    """
+    Train and save the rain classifier and its test-set predictions without any plotting.
+
+    Args:
+    - output_dir (str): Directory the model/ and rainfall/ artifacts are written under.
+    - timings (dict): Optional dict receiving the duration of each stage.
+
+    Returns:
+    - list: Paths of the written artifacts, relative to output_dir.
+    """
+    model_path = 'model/rainfall_model.joblib'
+    predictions_path = 'rainfall/rainfall_predictions.csv'
+
+    with timed_stage(timings, 'load'):
+        df = load_data('rainfall/temperature_rainfall.csv')
+    with timed_stage(timings, 'preprocess'):
+        df = clean_data(df)
+        df = feature_engineering(df)
+        X, y = prepare_data(df)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    with timed_stage(timings, 'fit'):
+        model = train_model(X_train, y_train, os.path.join(output_dir, model_path))
+
+    with timed_stage(timings, 'evaluate'):
+        predictions, probabilities = make_predictions(model, X_test)
+        df = save_predictions(df, predictions, probabilities, X_test.index)
+        accuracy, _ = calculate_metrics(y_test, predictions)
+        print(f'Accuracy: {accuracy:.2f}')
+
+    with timed_stage(timings, 'save'):
+        os.makedirs(os.path.join(output_dir, 'rainfall'), exist_ok=True)
+        df.to_csv(os.path.join(output_dir, predictions_path), index=False)
+
+    return [model_path, predictions_path]
 
 def main():
+    parser = argparse.ArgumentParser(description="Train the rain (yes/no) classifier.")
+    diagnostics.add_arguments(parser)
+    args = parser.parse_args()
+    diagnostics.configure(args, 'rainfall_yes_no')
+
     # Load the dataset
     df = load_data('rainfall/temperature_rainfall.csv')
     
@@ -213,7 +268,7 @@ def main():
     X, y = prepare_data(df)
 
     # Perform data analysis
-    data_analysis(df)
+    diagnostics.defer(data_analysis, df)
     
     # Train-test split
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -223,6 +278,9 @@ def main():
     
     # Train the model
     model = train_model(X_train, y_train, model_filepath)
+
+    # The model is saved, so headless diagnostics can start rendering
+    diagnostics.flush()
     
     # Make predictions
     predictions, probabilities = make_predictions(model, X_test)
@@ -243,7 +301,8 @@ def main():
     print(report)
     
     # Visualize results
-    visualize_results(df)
+    diagnostics.defer(visualize_results, df)
+    diagnostics.wait()
 
 if __name__ == "__main__":
     main()  # Run the main function to execute the script.
@@ -1,73 +1,30 @@
 """
 Predicts whether it will rain tomorrow (Yes/No) using a Decision Tree Classifier
 based on temperature and rainfall data from historical data.
-"""
-
-import pandas as pd
-from sklearn.tree import DecisionTreeClassifier
-import joblib
-
-def load_data(filepath):
-    """
-    Load historical weather data from a CSV file.
-
-    Args:
-    - filepath (str): Path to the CSV file containing the data.
-
-    Returns:
-    - df (DataFrame): Loaded DataFrame containing the rainfall data.
-    """
-    data = pd.read_csv(filepath)
-    return pd.DataFrame(data)
-
-def clean_data(df):
-    """
-    Clean the dataset by filling missing values and creating a binary target variable.
-
-    Args:
-    - df (DataFrame): DataFrame containing the rainfall data.
-
-    Returns:
-    - df (DataFrame): Cleaned DataFrame with filled missing values and binary target variable.
-    """
-    # Fill missing rainfall amounts with 0 and create a binary column indicating rain.
-    df['Rainfall amount (millimetres)'] = df['Rainfall amount (millimetres)'].fillna(0)
-    df['Rainy'] = (df['Rainfall amount (millimetres)'] > 0).astype(int)  # 1 for rain, 0 for no rain
-    return df
-
-def feature_engineering(df):
-    """
-    Perform feature engineering by creating new features based on existing data.
 
-    Args:
-    - df (DataFrame): DataFrame containing the rainfall data.
+With --daemon, the prediction is made by prediction_daemon.py; pandas, scikit-learn
+and the model are then only imported and loaded if the daemon is not running.
+"""
 
-    Returns:
-    - df (DataFrame): DataFrame with new features added.
-    """
-    # Create a new feature for the previous day's rainfall.
-    df['Previous_Rainfall'] = df['Rainfall amount (millimetres)'].shift(1)  # Shift for previous day's rainfall
-    
-    # Drop rows with NaN values created by shifting (first row).
-    df.dropna(inplace=True)
-    return df
+import argparse
+import prediction_daemon
 
-def prepare_features_for_prediction(df):
+def prepare_features_for_prediction(state):
     """
     Prepare the feature variables for model prediction.
 
     Args:
-    - df (DataFrame): DataFrame containing the cleaned and engineered data.
+    - state (RollingState): Rolling state of the rainfall data.
 
     Returns:
     - X (DataFrame): Feature variables for tomorrow's prediction.
     """
+    import pandas as pd
     # Create a DataFrame for tomorrow's features using today's data
-    last_row = df.iloc[-1]
     tomorrow_features = {
-        'Maximum temperature (Degree C)': last_row['Maximum temperature (Degree C)'],
-        'Minimum temperature (Degree C)': last_row['Minimum temperature (Degree C)'],
-        'Previous_Rainfall': last_row['Rainfall amount (millimetres)']
+        'Maximum temperature (Degree C)': state.last('Maximum temperature (Degree C)'),
+        'Minimum temperature (Degree C)': state.last('Minimum temperature (Degree C)'),
+        'Previous_Rainfall': state.last('Rainfall amount (millimetres)')
     }
     return pd.DataFrame([tomorrow_features])
 
@@ -86,22 +43,29 @@ def predict_rain_tomorrow(model, X_tomorrow):
     return 'Y' if probability > 0.5 else 'N'
 
 def main():
-    # Load the pre-trained decision tree model
-    model = joblib.load('model/rainfall_model.joblib')
+    parser = argparse.ArgumentParser(description="Predict whether it will rain tomorrow.")
+    prediction_daemon.add_arguments(parser)
+    args = parser.parse_args()
 
-    # Load historical weather data
-    historical_data_filepath = 'rainfall/temperature_rainfall.csv'  # Update this path as needed
-    df = load_data(historical_data_filepath)
-    
-    # Clean and engineer features
-    df = clean_data(df)
-    df = feature_engineering(df)
-    
-    # Prepare features for tomorrow's prediction
-    X_tomorrow = prepare_features_for_prediction(df)
+    # Ask the warm daemon first when requested
+    result = prediction_daemon.ask(args, 'rain')
+    if result is not None:
+        prediction = result['prediction']
+    else:
+        import joblib
+        from rolling_state import load_state
+
+        # Load the pre-trained decision tree model
+        model = joblib.load('model/rainfall_model.joblib')
+
+        # Load the rolling state of the historical weather data (built from the CSV on first use)
+        state = load_state('rainfall')
+
+        # Prepare features for tomorrow's prediction
+        X_tomorrow = prepare_features_for_prediction(state)
 
-    # Predict if it will rain tomorrow
-    prediction = predict_rain_tomorrow(model, X_tomorrow)
+        # Predict if it will rain tomorrow
+        prediction = predict_rain_tomorrow(model, X_tomorrow)
     
     # Output the prediction
     print(f"Will it rain tomorrow? {'Yes' if prediction == 'Y' else 'No'}")
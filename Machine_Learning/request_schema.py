@@ -0,0 +1,265 @@
+"""
+Declarative input ranges of the API's requests, and their columnar validation.
+
+Each schema lists its fields' bounds and the min/max relations between its
+fields once. The per-object Pydantic models of main.py take their Field
+constraints and cross-field checks from it. Bulk requests sent as columns
+(one array per field) are validated against the same schema with NumPy masks
+over whole arrays, and every failing row is reported by its index instead of
+stopping at the first one.
+"""
+
+from collections import namedtuple
+from typing import List, Optional
+import numpy as np
+from pydantic import Field, create_model
+
+
+class Bounds(namedtuple('Bounds', ['ge', 'gt', 'le', 'lt', 'description'], defaults=(None,) * 5)):
+    """
+    Inclusive (ge, le) and exclusive (gt, lt) bounds of a numeric field, as in pydantic.Field.
+    """
+
+    def violations(self, values):
+        """
+        Mask of the values outside the bounds (NaN is not flagged here).
+
+        Args:
+            values (np.ndarray): Float values.
+
+        Returns:
+            np.ndarray: Boolean mask, True where a bound is violated.
+        """
+        with np.errstate(invalid='ignore'):
+            mask = np.zeros(len(values), dtype=bool)
+            if self.ge is not None:
+                mask |= values < self.ge
+            if self.gt is not None:
+                mask |= values <= self.gt
+            if self.le is not None:
+                mask |= values > self.le
+            if self.lt is not None:
+                mask |= values >= self.lt
+        return mask
+
+    def message(self):
+        """Describe the bounds in the words of Pydantic's own errors."""
+        parts = []
+        if self.ge is not None:
+            parts.append(f"greater than or equal to {self.ge}")
+        if self.gt is not None:
+            parts.append(f"greater than {self.gt}")
+        if self.le is not None:
+            parts.append(f"less than or equal to {self.le}")
+        if self.lt is not None:
+            parts.append(f"less than {self.lt}")
+        return "Input should be " + " and ".join(parts)
+
+
+# Cross-field relation: low <= high (or low < high when strict), with the error message
+Order = namedtuple('Order', ['low', 'high', 'strict', 'message'])
+
+
+class RequestSchema:
+    """
+    Fields, bounds and cross-field relations of one request type.
+    """
+
+    def __init__(self, bounds, optional=(), orders=()):
+        """
+        Args:
+            bounds (dict): Field name -> Bounds, in the request's field order.
+            optional (iterable): Fields that may be left out (None).
+            orders (list): Order relations checked between fields.
+        """
+        self.bounds = dict(bounds)
+        self.optional = set(optional)
+        self.orders = list(orders)
+
+    def field(self, name):
+        """
+        Pydantic Field for a per-object model, with the schema's bounds.
+
+        Args:
+            name (str): Field name.
+
+        Returns:
+            FieldInfo: Field(...) for required fields, Field(None) for optional ones.
+        """
+        bounds = self.bounds[name]
+        return Field(None if name in self.optional else ..., ge=bounds.ge, gt=bounds.gt, le=bounds.le, lt=bounds.lt,
+                     description=bounds.description)
+
+    def check_orders(self, obj):
+        """
+        Check the cross-field relations of one validated object.
+
+        Args:
+            obj: Object with the schema's fields as attributes.
+
+        Returns:
+            The object.
+
+        Raises:
+            ValueError: On the first violated relation.
+        """
+        for order in self.orders:
+            low, high = getattr(obj, order.low), getattr(obj, order.high)
+            if low is not None and high is not None and (low >= high if order.strict else low > high):
+                raise ValueError(order.message)
+        return obj
+
+    def columns_model(self, name, **extra):
+        """
+        Pydantic model of the columnar form of the request: one list per field.
+
+        Pydantic only checks the element types; validate_columns checks the values.
+
+        Args:
+            name (str): Model name.
+            **extra: Additional columns, as (type, default) pairs for create_model.
+
+        Returns:
+            type: The model class.
+        """
+        fields = {}
+        for field, bounds in self.bounds.items():
+            if field in self.optional:
+                fields[field] = (Optional[List[Optional[float]]], Field(None, description=bounds.description))
+            else:
+                fields[field] = (List[float], Field(..., description=bounds.description))
+        return create_model(name, **fields, **extra)
+
+    def validate_columns(self, columns):
+        """
+        Validate a columnar request with one mask per check over whole columns.
+
+        Args:
+            columns (dict): Field name -> list of values (None, or a missing column, for left-out optional values).
+
+        Returns:
+            tuple: (field name -> float ndarray with NaN for left-out values, number of rows, errors).
+                Errors are dicts in FastAPI's format, located at ("body", field, row) or ("body", row),
+                sorted by row.
+        """
+        n_rows = next(len(columns[f]) for f in self.bounds if f not in self.optional)
+        arrays, errors = {}, []
+        for field, bounds in self.bounds.items():
+            values = columns.get(field)
+            if values is None:
+                arrays[field] = np.full(n_rows, np.nan)
+                continue
+            if len(values) != n_rows:
+                errors.append({'type': 'value_error', 'loc': ('body', field), 'row': None,
+                               'msg': f"Column has {len(values)} values, expected {n_rows}"})
+                continue
+            array = np.asarray(values, dtype=float)  # None becomes NaN
+            arrays[field] = array
+            bad = bounds.violations(array)
+            if field not in self.optional:
+                bad |= ~np.isfinite(array)
+            for row in np.flatnonzero(bad):
+                error = {'type': 'value_error', 'loc': ('body', field, int(row)), 'row': int(row)}
+                if np.isfinite(array[row]):
+                    error.update(msg=bounds.message(), input=float(array[row]))
+                else:
+                    error['msg'] = "Input should be a finite number"  # NaN and infinities are not valid JSON
+                errors.append(error)
+
+        for field, values in columns.items():
+            # Extra columns of columns_model are not range-checked, but must line up with the rows
+            if field not in self.bounds and values is not None and len(values) != n_rows:
+                errors.append({'type': 'value_error', 'loc': ('body', field), 'row': None,
+                               'msg': f"Column has {len(values)} values, expected {n_rows}"})
+
+        for order in self.orders:
+            if order.low not in arrays or order.high not in arrays:
+                continue
+            low, high = arrays[order.low], arrays[order.high]
+            with np.errstate(invalid='ignore'):
+                bad = low >= high if order.strict else low > high  # False where either is NaN
+            for row in np.flatnonzero(bad):
+                errors.append({'type': 'value_error', 'loc': ('body', int(row)), 'row': int(row),
+                               'msg': order.message})
+
+        errors.sort(key=lambda e: -1 if e['row'] is None else e['row'])
+        return arrays, n_rows, errors
+
+
+TEMPERATURE_BOUNDS = Bounds(gt=-50, lt=60, description="Temperature between -50 and 60°C")
+OBSERVED_TEMPERATURE_BOUNDS = Bounds(ge=-50, le=60, description="Temperature between -50 and 60°C")
+RAIN_BOUNDS = Bounds(ge=0, description="Rainfall in mm, non-negative")
+HUMIDITY_BOUNDS = Bounds(ge=0, le=100, description="Relative humidity between 0 and 100%")
+CLOUD_BOUNDS = Bounds(ge=0, le=8, description="Cloud amount between 0 and 8 oktas")
+WIND_BOUNDS = Bounds(ge=0, description="Wind speed in km/h, non-negative")
+
+MAX_ABOVE_MIN = "Maximum temperature must be greater than minimum temperature."
+
+RAIN_SCHEMA = RequestSchema(
+    {'max_temp': TEMPERATURE_BOUNDS, 'min_temp': TEMPERATURE_BOUNDS, 'rainfall': RAIN_BOUNDS},
+    orders=[Order('min_temp', 'max_temp', True, MAX_ABOVE_MIN)],
+)
+
+TEMPERATURE_SCHEMA = RequestSchema(
+    {
+        'temperature_max': TEMPERATURE_BOUNDS,
+        'temperature_min': TEMPERATURE_BOUNDS,
+        'rain_sum': RAIN_BOUNDS,
+        'relative_humidity_mean': HUMIDITY_BOUNDS,
+        'relative_humidity_max': HUMIDITY_BOUNDS,
+        'relative_humidity_min': HUMIDITY_BOUNDS,
+    },
+    orders=[
+        Order('temperature_min', 'temperature_max', False,
+              "Minimum temperature must be less than or equal to maximum temperature"),
+        Order('relative_humidity_min', 'relative_humidity_max', False,
+              "Minimum humidity must be less than or equal to maximum humidity"),
+    ],
+)
+
+# Optional 9am/3pm inputs of the weather model, in the order of weather_imputation.OPTIONAL_COLUMNS
+WEATHER_OPTIONAL_FIELDS = ['nine_am_temp', 'nine_am_humidity', 'nine_am_cloud', 'nine_am_wind_speed',
+                           'three_pm_temp', 'three_pm_humidity', 'three_pm_cloud', 'three_pm_wind_speed']
+
+WEATHER_SCHEMA = RequestSchema(
+    {
+        'minimum_temp': OBSERVED_TEMPERATURE_BOUNDS,
+        'maximum_temp': OBSERVED_TEMPERATURE_BOUNDS,
+        'rainfall': RAIN_BOUNDS,
+        'nine_am_temp': OBSERVED_TEMPERATURE_BOUNDS,
+        'nine_am_humidity': HUMIDITY_BOUNDS,
+        'nine_am_cloud': CLOUD_BOUNDS,
+        'nine_am_wind_speed': WIND_BOUNDS,
+        'three_pm_temp': OBSERVED_TEMPERATURE_BOUNDS,
+        'three_pm_humidity': HUMIDITY_BOUNDS,
+        'three_pm_cloud': CLOUD_BOUNDS,
+        'three_pm_wind_speed': WIND_BOUNDS,
+    },
+    optional=WEATHER_OPTIONAL_FIELDS,
+    orders=[Order('minimum_temp', 'maximum_temp', True, MAX_ABOVE_MIN)],
+)
+
+HEATWAVE_SCHEMA = RequestSchema(
+    {'min_temp': OBSERVED_TEMPERATURE_BOUNDS, 'max_temp': OBSERVED_TEMPERATURE_BOUNDS},
+    orders=[Order('min_temp', 'max_temp', True, MAX_ABOVE_MIN)],
+)
+
+# One observation for all four models: the rain/temperature bounds (the stricter ones) for the shared inputs,
+# the temperature model's humidities and the weather model's 9am/3pm readings as optional inputs
+BUNDLE_SCHEMA = RequestSchema(
+    {
+        'max_temp': TEMPERATURE_BOUNDS,
+        'min_temp': TEMPERATURE_BOUNDS,
+        'rainfall': RAIN_BOUNDS,
+        'relative_humidity_mean': HUMIDITY_BOUNDS,
+        'relative_humidity_max': HUMIDITY_BOUNDS,
+        'relative_humidity_min': HUMIDITY_BOUNDS,
+        **{field: WEATHER_SCHEMA.bounds[field] for field in WEATHER_OPTIONAL_FIELDS},
+    },
+    optional=['relative_humidity_mean', 'relative_humidity_max', 'relative_humidity_min', *WEATHER_OPTIONAL_FIELDS],
+    orders=[
+        Order('min_temp', 'max_temp', True, MAX_ABOVE_MIN),
+        Order('relative_humidity_min', 'relative_humidity_max', False,
+              "Minimum humidity must be less than or equal to maximum humidity"),
+    ],
+)
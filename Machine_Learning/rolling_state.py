@@ -0,0 +1,398 @@
+"""
+Persistent rolling state for the "predict tomorrow" scripts.
+
+A RollingState keeps what the next-day predictions need from a stream of
+daily observations: the last observation, the last N days, running sums over
+that window and over all history, and the window's extremes (monotonic
+deques). Each new day is folded in in O(1) (amortized for the extremes), so
+the prediction scripts read a small state file instead of re-reading whole
+CSVs.
+
+The rainfall state's series also feeds the streaming heatwave detector of
+heatwave_stream.py, saved next to the states.
+
+New days are recorded in the state's ingest CSV next to its source
+(rainfall/ingested_days.csv, temperature/ingested_days.csv) as well as folded
+into the state, so a rebuild from the sources, e.g. by the pipeline, keeps
+them. The source CSVs themselves are regenerated by the preprocessing stages.
+
+    python rolling_state.py build                          # rebuild every state from its CSVs
+    python rolling_state.py update temperature --data new_days.csv
+"""
+
+import argparse
+import io
+import os
+from collections import deque
+import joblib
+import numpy as np
+import pandas as pd
+from atomic_write import atomic_write
+
+# State name -> how it is built from its source CSV
+SOURCES = {
+    # temperature_prediction.py: means of every column over the test period
+    'temperature': {
+        'path': 'temperature/test.csv',
+        'ingest_path': 'temperature/ingested_days.csv',
+        'date_columns': ['Datetime'],
+        'state_path': 'model/temperature_state.joblib',
+        'columns': ['TemperatureMax', 'TemperatureMin', 'RainSum', 'RelativeHumidityMean',
+                    'RelativeHumidityMax', 'RelativeHumidityMin'],
+        'fill': {},
+    },
+    # rainfall_yes_no_prediction.py and heatwave_prediction.py: the latest day
+    'rainfall': {
+        'path': 'rainfall/temperature_rainfall.csv',
+        'ingest_path': 'rainfall/ingested_days.csv',
+        'date_columns': ['Year', 'Month', 'Day'],
+        'state_path': 'model/rainfall_state.joblib',
+        'columns': ['Maximum temperature (Degree C)', 'Minimum temperature (Degree C)',
+                    'Rainfall amount (millimetres)'],
+        'fill': {'Rainfall amount (millimetres)': 0.0},  # missing rainfall counts as 0, as in clean_data
+    },
+}
+
+
+class RollingState:
+    """
+    Window and all-time statistics of daily observations, updated one day at a time.
+
+    Missing values are forward-filled from the previous day (or replaced by a
+    fixed value for columns listed in fill), matching the scripts' ffill/fillna.
+    """
+
+    def __init__(self, columns, window=30, fill=None):
+        self.columns = list(columns)
+        self.window = window
+        self.fill = dict(fill or {})
+        self.days = deque()  # (sequence number, date, values)
+        self.seq = 0
+        self.last_date = None
+        self.last_values = np.full(len(self.columns), np.nan)
+        self.window_sum = np.zeros(len(self.columns))
+        self.window_count = np.zeros(len(self.columns), dtype=int)
+        self.total_sum = np.zeros(len(self.columns))
+        self.total_count = np.zeros(len(self.columns), dtype=int)
+        # Per column: (sequence number, value) pairs, decreasing for max and increasing for min
+        self.max_queues = [deque() for _ in self.columns]
+        self.min_queues = [deque() for _ in self.columns]
+
+    def update(self, date, values):
+        """
+        Fold in one day's observation.
+
+        Days not after the last one are ignored, so replaying a source is idempotent.
+
+        Args:
+            date (datetime.date): Day of the observation.
+            values (dict): Column name -> value (NaN or missing for unknown).
+
+        Returns:
+            bool: True if the observation was added.
+        """
+        if self.last_date is not None and date <= self.last_date:
+            return False
+
+        new = np.array([values.get(c, np.nan) for c in self.columns], dtype=float)
+        for i, column in enumerate(self.columns):
+            if np.isnan(new[i]):
+                new[i] = self.fill.get(column, self.last_values[i])
+        known = ~np.isnan(new)
+
+        self.seq += 1
+        self.days.append((self.seq, date, new))
+        self.window_sum[known] += new[known]
+        self.window_count += known
+        self.total_sum[known] += new[known]
+        self.total_count += known
+        for i in np.flatnonzero(known):
+            value = new[i]
+            max_queue, min_queue = self.max_queues[i], self.min_queues[i]
+            while max_queue and max_queue[-1][1] <= value:
+                max_queue.pop()
+            max_queue.append((self.seq, value))
+            while min_queue and min_queue[-1][1] >= value:
+                min_queue.pop()
+            min_queue.append((self.seq, value))
+
+        # Evict the day that fell out of the window
+        if len(self.days) > self.window:
+            old_seq, _, old = self.days.popleft()
+            old_known = ~np.isnan(old)
+            self.window_sum[old_known] -= old[old_known]
+            self.window_count -= old_known
+            for queue in self.max_queues + self.min_queues:
+                if queue and queue[0][0] == old_seq:
+                    queue.popleft()
+
+        self.last_date = date
+        self.last_values = new
+        return True
+
+    def ingest(self, dates, frame):
+        """
+        Fold in rows of a DataFrame, skipping days already in the state.
+
+        Args:
+            dates (Series): datetime-like date of each row, oldest first.
+            frame (DataFrame): Observations with the state's columns.
+
+        Returns:
+            int: Number of days added.
+        """
+        days = pd.to_datetime(dates).dt.date
+        if self.last_date is not None:
+            keep = (days > self.last_date).to_numpy()
+            days, frame = days[keep], frame[keep]
+        values = frame.reindex(columns=self.columns).to_numpy(dtype=float)
+        added = 0
+        for day, row in zip(days, values):
+            added += self.update(day, dict(zip(self.columns, row)))
+        return added
+
+    def _index(self, column):
+        return self.columns.index(column)
+
+    def last(self, column):
+        return float(self.last_values[self._index(column)])
+
+    def mean(self, column):
+        """Mean of a column over every day folded in so far."""
+        i = self._index(column)
+        return float(self.total_sum[i] / self.total_count[i]) if self.total_count[i] else np.nan
+
+    def window_mean(self, column):
+        """Mean of a column over the last `window` days."""
+        i = self._index(column)
+        return float(self.window_sum[i] / self.window_count[i]) if self.window_count[i] else np.nan
+
+    def window_max(self, column):
+        queue = self.max_queues[self._index(column)]
+        return float(queue[0][1]) if queue else np.nan
+
+    def window_min(self, column):
+        queue = self.min_queues[self._index(column)]
+        return float(queue[0][1]) if queue else np.nan
+
+    def save(self, path):
+        """
+        Atomically save the state.
+
+        Args:
+            path (str): Destination file.
+        """
+        # Saved as a plain attribute dict, so files written from the command line (where
+        # this class lives in __main__) load from any module
+        atomic_write(path, lambda tmp_path: joblib.dump(vars(self), tmp_path))
+
+    @classmethod
+    def load(cls, path):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(joblib.load(path))
+        return obj
+
+
+def source_dates(name, df):
+    """
+    Dates of the rows of a state's source CSV.
+
+    Args:
+        name (str): State name in SOURCES.
+        df (DataFrame): Rows of the source CSV.
+
+    Returns:
+        Series: Date of each row.
+    """
+    if name == 'temperature':
+        return pd.to_datetime(df['Datetime'], utc=True).dt.tz_localize(None)
+    return pd.to_datetime(df[['Year', 'Month', 'Day']])
+
+
+def read_source(name):
+    """
+    Read a state's source CSV followed by the days ingested since it was generated.
+
+    Args:
+        name (str): State name in SOURCES.
+
+    Returns:
+        DataFrame: Rows in the source's schema, oldest first.
+    """
+    source = SOURCES[name]
+    df = pd.read_csv(source['path'], encoding='utf-8')
+    if os.path.exists(source['ingest_path']):
+        ingested = pd.read_csv(source['ingest_path'], encoding='utf-8')
+        if len(ingested):
+            df = pd.concat([df, ingested.reindex(columns=df.columns)], ignore_index=True)
+    return df
+
+
+def last_row(path):
+    """
+    Read the last row of a CSV without parsing the rows before it.
+
+    Args:
+        path (str): CSV file with a header line.
+
+    Returns:
+        DataFrame: The last row (empty if the file has no rows).
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        end = f.seek(0, os.SEEK_END)
+        f.seek(max(end - 4096, len(header)))  # Far more than one row
+        lines = f.read().rstrip(b'\r\n').rsplit(b'\n', 1)
+    return pd.read_csv(io.BytesIO(header + lines[-1]), encoding='utf-8')
+
+
+def last_source_day(name):
+    """
+    Last day of a state's source and ingest CSVs, from the last row of each (both are oldest first).
+
+    Args:
+        name (str): State name in SOURCES.
+
+    Returns:
+        Timestamp: The last known day.
+    """
+    source = SOURCES[name]
+    last = last_row(source['ingest_path']) if os.path.exists(source['ingest_path']) else []
+    if not len(last):
+        last = last_row(source['path'])
+    return source_dates(name, last).iloc[0]
+
+
+def ingested_after(name, day):
+    """
+    Read the rows of a state's ingest CSV after a day.
+
+    The file is only parsed if its last row is newer, so a caller that is up to
+    date pays for reading one row.
+
+    Args:
+        name (str): State name in SOURCES.
+        day (datetime.date): Last day already known to the caller (None for every row).
+
+    Returns:
+        DataFrame: Rows in the source's schema, oldest first.
+    """
+    path = SOURCES[name]['ingest_path']
+    if not os.path.exists(path):
+        return pd.read_csv(SOURCES[name]['path'], nrows=0, encoding='utf-8')
+    last = last_row(path)
+    if not len(last) or (day is not None and source_dates(name, last).iloc[0] <= pd.Timestamp(day)):
+        return last.iloc[:0]
+    df = pd.read_csv(path, encoding='utf-8')
+    return df if day is None else df[(source_dates(name, df) > pd.Timestamp(day)).to_numpy()]
+
+
+def ingest_days(name, df):
+    """
+    Append the days of a DataFrame newer than a state's sources to its ingest CSV.
+
+    Args:
+        name (str): State name in SOURCES.
+        df (DataFrame): New observations in the source's schema.
+
+    Returns:
+        DataFrame: The appended rows, oldest first (one per day).
+
+    Raises:
+        ValueError: If df lacks the date or observation columns of the source.
+    """
+    source = SOURCES[name]
+    missing = [c for c in source['date_columns'] + source['columns'] if c not in df.columns]
+    if missing:
+        raise ValueError(f"Not {name} data, missing columns: {', '.join(missing)}")
+
+    dates = source_dates(name, df)
+    df = df.assign(_date=dates.to_numpy())[(dates > last_source_day(name)).to_numpy()]
+    df = df.sort_values('_date', kind='stable').drop_duplicates('_date', keep='last')
+
+    header = pd.read_csv(source['path'], nrows=0, encoding='utf-8').columns
+    new = df.reindex(columns=header).reset_index(drop=True)
+    path = source['ingest_path']
+    new.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+    return new
+
+
+def build_state(name, window=30):
+    """
+    Build a state from its source and ingest CSVs and save it.
+
+    Args:
+        name (str): State name in SOURCES.
+        window (int): Number of recent days kept.
+
+    Returns:
+        RollingState: The new state.
+    """
+    source = SOURCES[name]
+    df = read_source(name)
+    state = RollingState(source['columns'], window=window, fill=source['fill'])
+    state.ingest(source_dates(name, df), df)
+    state.save(source['state_path'])
+    return state
+
+
+def load_state(name):
+    """
+    Load a saved state, building it from its CSVs the first time.
+
+    Args:
+        name (str): State name in SOURCES.
+
+    Returns:
+        RollingState: The state.
+    """
+    path = SOURCES[name]['state_path']
+    if os.path.exists(path):
+        return RollingState.load(path)
+    return build_state(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the rolling prediction states.")
+    parser.add_argument('command', choices=['build', 'update'],
+                        help="build: rebuild from the source and ingest CSVs; update: fold in new days")
+    parser.add_argument('names', nargs='*', help=f"States among {', '.join(SOURCES)} (default: all)")
+    parser.add_argument('--data', help="CSV with new days of one state, in its source's schema (update)")
+    parser.add_argument('--window', type=int, default=30, help="Days kept in the rolling window (build)")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(SOURCES)
+    if unknown:
+        parser.error(f"unknown states: {', '.join(sorted(unknown))}")
+    if args.data and len(args.names) != 1:
+        parser.error("--data holds the new days of one state; name it, e.g. update rainfall --data new_days.csv")
+
+    for name in args.names or list(SOURCES):
+        if args.command == 'build':
+            state = build_state(name, args.window)
+            print(f"{name}: built from {SOURCES[name]['path']}, last day {state.last_date}")
+            if name == 'rainfall':
+                # The streaming heatwave detector follows the same daily series
+                from heatwave_stream import DETECTOR_PATH, build_detector
+                build_detector()
+                print(f"heatwave detector: built to {DETECTOR_PATH}")
+            continue
+
+        state = load_state(name)
+        if args.data:
+            try:
+                ingest_days(name, pd.read_csv(args.data, encoding='utf-8'))
+            except ValueError as e:
+                parser.error(f"{args.data}: {e}")
+        # Ingested days missing from the state, also those ingested by climatology.py
+        df = ingested_after(name, state.last_date)
+        added = state.ingest(source_dates(name, df), df)
+        state.save(SOURCES[name]['state_path'])
+        print(f"{name}: added {added} days, last day {state.last_date}")
+        if name == 'rainfall':
+            from heatwave_stream import update_detector
+            for event in update_detector():
+                print(f"heatwave {event['event']}: {event['date']} (since {event['start']}, {event['days']} days)")
+
+
+if __name__ == "__main__":
+    main()
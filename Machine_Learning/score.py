@@ -0,0 +1,363 @@
+"""
+Bulk offline scoring of a dataset with any of the four models.
+
+The input CSV is streamed in chunks, so it may be larger than memory. Each
+chunk is scored with whole-column predict calls and NumPy thresholds by a
+worker process, which writes it as its own partition of the output directory
+(part-00000.parquet, ..., or .csv when no Parquet engine is installed). A
+_manifest.json lists the partitions once all are written. Inputs follow the
+schema each model was trained on:
+
+    rain         rainfall/temperature_rainfall.csv (Previous_Rainfall is carried across chunks)
+    temperature  temperature/test.csv
+    weather      weather/merged_weather_data.csv (missing 9am/3pm readings get their month's defaults)
+    heatwave     rainfall/temperature_rainfall.csv
+
+Rows missing a required input are kept, with empty predictions.
+
+    python score.py rain rainfall/temperature_rainfall.csv --output scores/rain
+    python score.py weather weather/merged_weather_data.csv --workers 4 --chunksize 50000 --format csv
+"""
+
+import argparse
+import glob
+import importlib.util
+import json
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import joblib
+import numpy as np
+import pandas as pd
+from atomic_write import atomic_write
+from feature_store import add_calendar_features
+from weather_imputation import ImputationStats, IMPUTATION_FILE, OPTIONAL_COLUMNS, numeric_columns
+
+MANIFEST_FILE = '_manifest.json'
+
+# Threshold of rainfall_yes_no.make_predictions
+RAIN_THRESHOLD = 0.5
+
+RAINFALL = 'Rainfall amount (millimetres)'
+MAX_TEMP = 'Maximum temperature (Degree C)'
+MIN_TEMP = 'Minimum temperature (Degree C)'
+
+TEMPERATURE_FEATURES = ['TemperatureMax', 'TemperatureMin', 'RainSum', 'RelativeHumidityMean',
+                        'RelativeHumidityMax', 'RelativeHumidityMin', 'Month', 'Day', 'Hour']
+WEATHER_REQUIRED = ['Minimum temperature (°C)', 'Maximum temperature (°C)', 'Rainfall (mm)']
+
+# A model's input columns, how its artifacts are loaded from a model directory, and how a chunk is scored.
+# carry, if set, gives the value a chunk hands to the next one (e.g. its last rainfall for the lag feature),
+# from the chunk and the value it was handed (kept as is by an empty chunk).
+Scorer = namedtuple('Scorer', ['columns', 'load', 'score', 'carry'])
+
+
+def score_rain(model, chunk, previous, options):
+    """
+    Rain (yes/no) of each row, as rainfall_yes_no.py labels its test split.
+
+    Args:
+        model (DecisionTreeClassifier): Rain classifier.
+        chunk (DataFrame): Rows in the temperature_rainfall.csv schema.
+        previous (float): Rainfall of the row before the chunk (NaN for the first chunk).
+        options (dict): threshold on the probability of rain.
+
+    Returns:
+        DataFrame: Previous_Rainfall, Probability_of_Rain and Predicted_Rainy ('Y'/'N').
+    """
+    rainfall = chunk[RAINFALL].fillna(0).to_numpy(dtype=float)
+    previous_rainfall = np.concatenate([[previous], rainfall])[:len(rainfall)]
+    features = pd.DataFrame({
+        MAX_TEMP: pd.to_numeric(chunk[MAX_TEMP], errors='coerce'),
+        MIN_TEMP: pd.to_numeric(chunk[MIN_TEMP], errors='coerce'),
+        'Previous_Rainfall': previous_rainfall,
+    }, index=chunk.index)
+    valid = features.notna().all(axis=1).to_numpy()
+
+    probability = np.full(len(chunk), np.nan)
+    if valid.any():
+        probability[valid] = model.predict_proba(features[valid])[:, 1]
+    predicted = np.where(probability > options['threshold'], 'Y', 'N').astype(object)
+    predicted[~valid] = None
+    return pd.DataFrame({'Previous_Rainfall': previous_rainfall, 'Probability_of_Rain': probability,
+                         'Predicted_Rainy': predicted}, index=chunk.index)
+
+
+def score_temperature(artifacts, chunk, previous, options):
+    """
+    Mean temperature of each row's day, as temperature_prediction.py predicts it.
+
+    Args:
+        artifacts (tuple): Temperature model and its fitted scaler.
+        chunk (DataFrame): Rows in the temperature/test.csv schema.
+        previous: Unused.
+        options (dict): Unused.
+
+    Returns:
+        DataFrame: PredictedTemperatureMean.
+    """
+    model, scaler = artifacts
+    features = add_calendar_features(chunk[['Datetime'] + TEMPERATURE_FEATURES[:6]].copy())[TEMPERATURE_FEATURES]
+    valid = features.notna().all(axis=1).to_numpy()
+
+    predicted = np.full(len(chunk), np.nan)
+    if valid.any():
+        predicted[valid] = model.predict(scaler.transform(features[valid]))
+    return pd.DataFrame({'PredictedTemperatureMean': predicted}, index=chunk.index)
+
+
+def score_weather(artifacts, chunk, previous, options):
+    """
+    Weather condition of each row, with missing 9am/3pm readings filled as the API fills them.
+
+    Args:
+        artifacts (tuple): Weather classifier and the imputation stats of its training data.
+        chunk (DataFrame): Rows in the merged_weather_data.csv schema (Date as DD-MM-YYYY, optional).
+        previous: Unused.
+        options (dict): Unused.
+
+    Returns:
+        DataFrame: PredictedWeatherCondition.
+    """
+    model, imputation = artifacts
+    for column in OPTIONAL_COLUMNS:
+        if column not in chunk:
+            chunk[column] = np.nan
+    features = pd.concat([
+        chunk[WEATHER_REQUIRED].apply(pd.to_numeric, errors='coerce'),
+        pd.DataFrame(numeric_columns(chunk), columns=OPTIONAL_COLUMNS, index=chunk.index),
+    ], axis=1)
+
+    # Each row gets its month's defaults; rows without a readable date get the overall means
+    if 'Date' in chunk:
+        months = pd.to_datetime(chunk['Date'], format='%d-%m-%Y', errors='coerce').dt.month.to_numpy()
+    else:
+        months = np.full(len(chunk), np.nan)
+    dated = ~np.isnan(months)
+    if dated.any():
+        features.loc[dated] = imputation.fill(features[dated].copy(), months[dated])
+    if not dated.all():
+        features.loc[~dated] = imputation.fill(features[~dated].copy())
+    valid = features[WEATHER_REQUIRED].notna().all(axis=1).to_numpy()
+
+    predicted = np.full(len(chunk), None, dtype=object)
+    if valid.any():
+        predicted[valid] = model.predict(features[valid])
+    return pd.DataFrame({'PredictedWeatherCondition': predicted}, index=chunk.index)
+
+
+def score_heatwave(model, chunk, previous, options):
+    """
+    Heatwave cluster of each row.
+
+    The temperatures are clustered unscaled, as heatwave.py fitted the model:
+    a scaler refitted per chunk would make a row's cluster depend on its chunk.
+
+    Args:
+        model (KMeans): Heatwave clustering model.
+        chunk (DataFrame): Rows with the minimum and maximum temperatures.
+        previous: Unused.
+        options (dict): Unused.
+
+    Returns:
+        DataFrame: Predicted Cluster (nullable int) and Heatwave (cluster 1, as the API reports it).
+    """
+    features = chunk[[MIN_TEMP, MAX_TEMP]].apply(pd.to_numeric, errors='coerce')
+    valid = features.notna().all(axis=1).to_numpy()
+
+    cluster = pd.array(np.full(len(chunk), pd.NA), dtype='Int64')
+    if valid.any():
+        cluster[valid] = model.predict(features[valid])
+    return pd.DataFrame({'Predicted Cluster': cluster, 'Heatwave': cluster == 1}, index=chunk.index)
+
+
+def load_weather_artifacts(model_dir):
+    imputation_path = os.path.join(model_dir, IMPUTATION_FILE)
+    if not os.path.exists(imputation_path):
+        imputation_path = os.path.join('model', IMPUTATION_FILE)
+    return (joblib.load(os.path.join(model_dir, 'weather_classifier_model.joblib')),
+            ImputationStats.load(imputation_path))
+
+
+SCORERS = {
+    'rain': Scorer(
+        [MAX_TEMP, MIN_TEMP, RAINFALL],
+        lambda model_dir: joblib.load(os.path.join(model_dir, 'rainfall_model.joblib')),
+        score_rain,
+        lambda chunk, previous: float(chunk[RAINFALL].fillna(0).iloc[-1]) if len(chunk) else previous,
+    ),
+    'temperature': Scorer(
+        ['Datetime'] + TEMPERATURE_FEATURES[:6],
+        lambda model_dir: (joblib.load(os.path.join(model_dir, 'temperature_model.joblib')),
+                           joblib.load(os.path.join(model_dir, 'temperauture_scaler.joblib'))),
+        score_temperature,
+        None,
+    ),
+    'weather': Scorer(
+        WEATHER_REQUIRED + ['Date'] + OPTIONAL_COLUMNS,
+        load_weather_artifacts,
+        score_weather,
+        None,
+    ),
+    'heatwave': Scorer(
+        [MIN_TEMP, MAX_TEMP],
+        lambda model_dir: joblib.load(os.path.join(model_dir, 'heatwave_model.joblib')),
+        score_heatwave,
+        None,
+    ),
+}
+
+
+def parquet_available():
+    """Whether pandas has a Parquet engine (pyarrow or fastparquet) to write with."""
+    return any(importlib.util.find_spec(engine) is not None for engine in ('pyarrow', 'fastparquet'))
+
+
+# Artifacts of the model a worker process scores with, loaded once per process
+_worker = {}
+
+
+def init_worker(model, model_dir, options):
+    """
+    Load a model's artifacts in a worker process.
+
+    Args:
+        model (str): Key of SCORERS.
+        model_dir (str): Directory with the model's artifacts.
+        options (dict): Scoring options (e.g. the rain threshold).
+    """
+    scorer = SCORERS[model]
+    _worker.update(scorer=scorer, artifacts=scorer.load(model_dir), options=options)
+
+
+def score_partition(index, chunk, previous, output_dir, fmt, keep):
+    """
+    Score one chunk and write it as a partition (run in a worker initialized by init_worker).
+
+    Args:
+        index (int): Partition number.
+        chunk (DataFrame): Input rows.
+        previous: Value carried over from the previous chunk (see Scorer.carry).
+        output_dir (str): Output directory.
+        fmt (str): 'parquet' or 'csv'.
+        keep (list): Input columns copied to the output (None for all).
+
+    Returns:
+        tuple: (partition file name, rows, rows scored).
+    """
+    scorer = _worker['scorer']
+    scores = scorer.score(_worker['artifacts'], chunk, previous, _worker['options'])
+    kept = chunk if keep is None else chunk[[column for column in keep if column in chunk]]
+    output = pd.concat([kept.drop(columns=scores.columns, errors='ignore'), scores], axis=1)
+
+    # Written under a temporary name first, so an interrupted run leaves no partial partition
+    name = f'part-{index:05d}.{fmt}'
+    if fmt == 'parquet':
+        atomic_write(os.path.join(output_dir, name), lambda tmp_path: output.to_parquet(tmp_path, index=False))
+    else:
+        atomic_write(os.path.join(output_dir, name), lambda tmp_path: output.to_csv(tmp_path, index=False))
+    return name, len(output), int(scores.iloc[:, -1].notna().sum())
+
+
+def score_file(model, input_path, output_dir, model_dir='model', chunksize=100000, workers=None, fmt='auto',
+               keep=None, options=None):
+    """
+    Score a CSV file chunk by chunk into a partitioned output directory.
+
+    At most two chunks per worker are in flight, so memory stays bounded whatever the input size.
+
+    Args:
+        model (str): Key of SCORERS.
+        input_path (str): Input CSV.
+        output_dir (str): Output directory; partitions of an earlier run there are replaced.
+        model_dir (str): Directory with the model's artifacts.
+        chunksize (int): Rows per chunk (and per partition).
+        workers (int): Worker processes (default: one per CPU; 1 scores in this process). They are spawned,
+            so a script calling this with workers > 1 needs an `if __name__ == '__main__'` guard.
+        fmt (str): 'parquet', 'csv', or 'auto' for Parquet when an engine is installed.
+        keep (list): Input columns copied to the output (default: all).
+        options (dict): Scoring options (default: the rain threshold of rainfall_yes_no.py).
+
+    Returns:
+        dict: The manifest: model, input, format, rows, scored rows, seconds and partitions.
+    """
+    scorer = SCORERS[model]
+    options = options or {'threshold': RAIN_THRESHOLD}
+    if fmt == 'auto':
+        fmt = 'parquet' if parquet_available() else 'csv'
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    os.makedirs(output_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(output_dir, 'part-*')) + glob.glob(os.path.join(output_dir, MANIFEST_FILE)):
+        os.remove(path)
+
+    needed = set(scorer.columns) | set(keep or ())
+    reader = pd.read_csv(input_path, chunksize=chunksize,
+                         usecols=None if keep is None else (lambda column: column in needed))
+
+    partitions = {}
+    if workers == 1:
+        init_worker(model, model_dir, options)
+        previous = np.nan
+        for index, chunk in enumerate(reader):
+            partitions[index] = score_partition(index, chunk, previous, output_dir, fmt, keep)
+            previous = scorer.carry(chunk, previous) if scorer.carry else None
+    else:
+        # Spawned, not forked: a fork of a process that already ran an OpenMP predict (e.g. an
+        # earlier workers=1 run) can deadlock in the workers' first predict
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=init_worker, initargs=(model, model_dir, options)) as pool:
+            running = {}
+            previous = np.nan
+            for index, chunk in enumerate(reader):
+                if len(running) >= 2 * workers:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        partitions[running.pop(future)] = future.result()
+                running[pool.submit(score_partition, index, chunk, previous, output_dir, fmt, keep)] = index
+                previous = scorer.carry(chunk, previous) if scorer.carry else None
+            for future, index in running.items():
+                partitions[index] = future.result()
+
+    ordered = [partitions[index] for index in sorted(partitions)]
+    manifest = {
+        'model': model,
+        'input': input_path,
+        'format': fmt,
+        'rows': sum(rows for _, rows, _ in ordered),
+        'scored': sum(scored for _, _, scored in ordered),
+        'seconds': round(time.perf_counter() - start, 3),
+        'partitions': [{'file': name, 'rows': rows} for name, rows, _ in ordered],
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV file with one of the models, in parallel chunks.")
+    parser.add_argument('model', choices=sorted(SCORERS), help="Model to score with")
+    parser.add_argument('input', help="Input CSV, in the schema the model was trained on")
+    parser.add_argument('--output', help="Output directory (default: scores/<model>)")
+    parser.add_argument('--model-dir', default='model', help="Directory with the model's artifacts")
+    parser.add_argument('--chunksize', type=int, default=100000, help="Rows per chunk and output partition")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--format', choices=['auto', 'parquet', 'csv'], default='auto',
+                        help="Partition format (auto: Parquet if pyarrow or fastparquet is installed)")
+    parser.add_argument('--keep', nargs='+', metavar='COLUMN', help="Input columns copied to the output (default: all)")
+    parser.add_argument('--threshold', type=float, default=RAIN_THRESHOLD, help="Probability above which rain is predicted")
+    args = parser.parse_args()
+
+    output_dir = args.output or os.path.join('scores', args.model)
+    manifest = score_file(args.model, args.input, output_dir, args.model_dir, args.chunksize, args.workers,
+                          args.format, args.keep, {'threshold': args.threshold})
+    print(f"Scored {manifest['scored']} of {manifest['rows']} rows with the {args.model} model into "
+          f"{len(manifest['partitions'])} {manifest['format']} partitions in {output_dir} "
+          f"in {manifest['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Content-addressed on-disk cache for preprocessing and feature stages.
+
+A stage decorated with @cached_stage is keyed by a hash of its arguments
+(DataFrame/array contents, the contents of any input file path, other
+parameters) and of the source code it depends on. On a hit the stored output
+is loaded instead of re-running the stage, so re-training after a
+hyperparameter change only pays for the model fit.
+
+The cache is off unless enabled with enable() or the STAGE_CACHE_DIR
+environment variable. Outputs are stored with joblib, which writes NumPy
+buffers as raw binary and loads them without parsing.
+"""
+
+import argparse
+import functools
+import hashlib
+import inspect
+import os
+import shutil
+import joblib
+import numpy as np
+import pandas as pd
+from atomic_write import atomic_write
+
+_cache_dir = os.environ.get('STAGE_CACHE_DIR') or None
+
+
+def enable(cache_dir='.stage_cache'):
+    """
+    Enable the stage cache for this process and any worker processes it starts.
+
+    Args:
+        cache_dir (str): Directory holding the cached stage outputs.
+    """
+    global _cache_dir
+    _cache_dir = cache_dir
+    os.makedirs(cache_dir, exist_ok=True)
+    os.environ['STAGE_CACHE_DIR'] = cache_dir
+
+
+def disable():
+    global _cache_dir
+    _cache_dir = None
+    os.environ.pop('STAGE_CACHE_DIR', None)
+
+
+def _update_hash(h, value):
+    """
+    Feed a stage argument into a hash.
+
+    Args:
+        h: hashlib hash object.
+        value: The argument value.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        h.update(repr(type(value)).encode())
+        h.update(repr(list(value.columns) if isinstance(value, pd.DataFrame) else value.name).encode())
+        h.update(repr(list(value.dtypes) if isinstance(value, pd.DataFrame) else value.dtype).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(f"{value.dtype}{value.shape}".encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, str) and os.path.isfile(value):
+        # Input files are addressed by content, not by name or modification time
+        h.update(value.encode())
+        with open(value, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    elif isinstance(value, (list, tuple)):
+        h.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_hash(h, item)
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            h.update(repr(key).encode())
+            _update_hash(h, value[key])
+    else:
+        h.update(repr(value).encode())
+
+
+def stage_key(func, args, kwargs, depends=()):
+    """
+    Compute the cache key for a stage call.
+
+    Args:
+        func (callable): The undecorated stage function.
+        args (tuple): Positional arguments of the call.
+        kwargs (dict): Keyword arguments of the call.
+        depends (tuple): Modules whose source code the stage depends on.
+
+    Returns:
+        str: Hex digest identifying the stage output.
+    """
+    h = hashlib.sha256()
+    h.update(f"{func.__module__}.{func.__qualname__}".encode())
+    h.update(inspect.getsource(func).encode())
+    for module in depends:
+        h.update(inspect.getsource(module).encode())
+    _update_hash(h, list(args))
+    _update_hash(h, kwargs)
+    return h.hexdigest()
+
+
+def cached_stage(func=None, *, depends=()):
+    """
+    Decorate a pipeline stage so its output is memoized on disk.
+
+    Can be used as @cached_stage or @cached_stage(depends=(module, ...)) when
+    the stage's result also depends on code in other modules.
+
+    Args:
+        func (callable): The stage function.
+        depends (tuple): Modules whose source code is part of the cache key.
+
+    Returns:
+        callable: The decorated stage.
+    """
+    if func is None:
+        return functools.partial(cached_stage, depends=depends)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _cache_dir is None:
+            return func(*args, **kwargs)
+
+        # Hash the inputs before the stage runs, as some stages modify them in place
+        key = stage_key(func, args, kwargs, depends)
+        path = os.path.join(_cache_dir, f"{func.__module__}.{func.__name__}-{key[:32]}.joblib")
+        if os.path.exists(path):
+            return joblib.load(path)
+
+        result = func(*args, **kwargs)
+
+        # Written atomically so concurrent trainers never read a partial entry
+        atomic_write(path, lambda tmp_path: joblib.dump(result, tmp_path))
+        return result
+
+    return wrapper
+
+
+def cache_stats(cache_dir):
+    """
+    Summarize the entries in a cache directory.
+
+    Args:
+        cache_dir (str): Cache directory.
+
+    Returns:
+        dict: Stage name -> (number of entries, total bytes).
+    """
+    stats = {}
+    if not os.path.isdir(cache_dir):
+        return stats
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.joblib'):
+            continue
+        stage = name.rsplit('-', 1)[0]
+        count, size = stats.get(stage, (0, 0))
+        stats[stage] = (count + 1, size + os.path.getsize(os.path.join(cache_dir, name)))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the stage cache.")
+    parser.add_argument('--cache-dir', default=_cache_dir or '.stage_cache', help="Cache directory")
+    parser.add_argument('--clear', action='store_true', help="Delete every cached stage output")
+    args = parser.parse_args()
+
+    if args.clear:
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+        print(f"Cleared {args.cache_dir}")
+        return
+
+    stats = cache_stats(args.cache_dir)
+    if not stats:
+        print(f"No cached stages in {args.cache_dir}")
+        return
+    for stage, (count, size) in sorted(stats.items()):
+        print(f"{stage:<55}{count:>5} entries{size / 1e6:>10.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Stage timing helpers for the training pipeline
+"""
+
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def timed_stage(timings, name):
+    """
+    Time a block of code and record its duration under a stage name.
+
+    Args:
+        timings (dict): Dict receiving stage name -> seconds. If None, nothing is recorded.
+        name (str): Stage name. Repeated stages accumulate.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def format_timings(report):
+    """
+    Format a per-trainer timing report as a text table.
+
+    Args:
+        report (dict): Trainer name -> {stage name -> seconds}.
+
+    Returns:
+        str: The formatted table.
+    """
+    lines = [f"{'trainer':<20}{'stage':<20}{'seconds':>10}"]
+    for trainer, timings in report.items():
+        for stage, seconds in timings.items():
+            lines.append(f"{trainer:<20}{stage:<20}{seconds:>10.2f}")
+    return "\n".join(lines)
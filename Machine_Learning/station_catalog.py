@@ -0,0 +1,159 @@
+"""
+Station catalog with a spatial index for nearest-station lookup
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+# Mean Earth radius used to convert haversine distances (radians) to kilometres
+EARTH_RADIUS_KM = 6371.0088
+
+# Model files a station directory must contain to be considered "trained"
+MODEL_FILES = [
+    'rainfall_model.joblib',
+    'temperature_model.joblib',
+    'temperauture_scaler.joblib',
+    'weather_classifier_model.joblib',
+    'heatwave_model.joblib',
+]
+
+
+def load_stations(filepath='stations/stations.csv'):
+    """
+    Load the station catalog from a CSV file.
+
+    Args:
+        filepath (str): Path to the station catalog CSV file.
+
+    Returns:
+        pd.DataFrame: Catalog with station_id, name, state, latitude, longitude and model_dir columns.
+    """
+    # Keep station ids as strings so leading zeros (e.g. 086282) are preserved
+    stations = pd.read_csv(filepath, dtype={'station_id': str, 'model_dir': str})
+    stations['model_dir'] = stations['model_dir'].fillna('')
+    return stations
+
+
+def load_cities(filepath='stations/australian_cities.csv'):
+    """
+    Load the city gazetteer used to resolve free-text city names to coordinates.
+
+    Args:
+        filepath (str): Path to the city CSV file.
+
+    Returns:
+        dict: Mapping of lower-cased city name to (latitude, longitude).
+    """
+    cities = pd.read_csv(filepath)
+    return {
+        name.strip().lower(): (lat, lon)
+        for name, lat, lon in zip(cities['city'], cities['latitude'], cities['longitude'])
+    }
+
+
+def has_trained_models(model_dir):
+    """
+    Check whether a model directory contains every model file used by the API.
+
+    Args:
+        model_dir (str): Directory holding the station's joblib models.
+
+    Returns:
+        bool: True if all model files are present.
+    """
+    return bool(model_dir) and all(os.path.exists(os.path.join(model_dir, f)) for f in MODEL_FILES)
+
+
+class StationCatalog:
+    """
+    Ball-tree index over the coordinates of stations that have trained models.
+
+    Queries use the haversine metric on (latitude, longitude) in radians, so a
+    k-nearest lookup is O(log n) and stays well under a millisecond for catalogs
+    of tens of thousands of sites.
+    """
+
+    def __init__(self, stations, cities=None):
+        # Only index stations whose models are available on disk
+        trained = stations[stations['model_dir'].map(has_trained_models)]
+        self.stations = trained.reset_index(drop=True)
+        self.cities = cities or {}
+        self._by_id = {sid: i for i, sid in enumerate(self.stations['station_id'])}
+
+        coords = np.radians(self.stations[['latitude', 'longitude']].to_numpy(dtype=float))
+        self._tree = BallTree(coords, metric='haversine') if len(coords) else None
+
+    @classmethod
+    def from_files(cls, stations_path='stations/stations.csv', cities_path='stations/australian_cities.csv'):
+        """
+        Build a catalog from the station and city CSV files.
+
+        Args:
+            stations_path (str): Path to the station catalog CSV file.
+            cities_path (str): Path to the city gazetteer CSV file.
+
+        Returns:
+            StationCatalog: The indexed catalog.
+        """
+        return cls(load_stations(stations_path), load_cities(cities_path))
+
+    def __len__(self):
+        return len(self.stations)
+
+    def resolve_city(self, city):
+        """
+        Resolve a city name to its coordinates.
+
+        Args:
+            city (str): City name, matched case-insensitively.
+
+        Returns:
+            tuple: (latitude, longitude), or None if the city is unknown.
+        """
+        return self.cities.get(city.strip().lower())
+
+    def nearest(self, lat, lon, k=1):
+        """
+        Find the k nearest stations to a point.
+
+        Args:
+            lat (float): Latitude in decimal degrees.
+            lon (float): Longitude in decimal degrees.
+            k (int): Number of stations to return.
+
+        Returns:
+            list: Dicts with station details and distance_km, closest first.
+        """
+        if self._tree is None:
+            return []
+
+        k = min(k, len(self.stations))
+        dist, idx = self._tree.query(np.radians([[lat, lon]]), k=k)
+
+        return [
+            {
+                'station_id': self.stations.at[i, 'station_id'],
+                'name': self.stations.at[i, 'name'],
+                'state': self.stations.at[i, 'state'],
+                'latitude': float(self.stations.at[i, 'latitude']),
+                'longitude': float(self.stations.at[i, 'longitude']),
+                'model_dir': self.stations.at[i, 'model_dir'],
+                'distance_km': float(d * EARTH_RADIUS_KM),
+            }
+            for d, i in zip(dist[0], idx[0])
+        ]
+
+    def model_dir(self, station_id):
+        """
+        Look up the model directory for a station.
+
+        Args:
+            station_id (str): BOM station number.
+
+        Returns:
+            str: The station's model directory, or None if it is not in the catalog.
+        """
+        i = self._by_id.get(station_id)
+        return None if i is None else self.stations.at[i, 'model_dir']
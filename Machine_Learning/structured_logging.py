@@ -0,0 +1,243 @@
+"""
+Structured, sampled logging for the API's hot paths.
+
+Handlers log through get_logger(endpoint), which drops a record before it is
+built when the endpoint's sampling rate says so (warnings and errors are
+always kept). Kept records are put on a bounded queue as they are; a
+background thread formats them as JSON lines and writes them, so a request
+never waits on formatting or on stdout. When the queue is full, records are
+dropped and counted instead of blocking.
+
+Every record carries the request id set by RequestIdMiddleware (taken from
+the X-Request-ID header, or generated) and the endpoint it was logged from.
+
+Configuration comes from configure() or the environment:
+
+    LOG_LEVEL=DEBUG
+    LOG_SAMPLE_RATES="/rain_prediction=0.01,/clusters_visualization=1,*=0.1"
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+
+LOGGER_NAME = 'weather_api'
+
+_request_id = ContextVar('request_id', default=None)
+_sample_rates = {}
+_default_rate = 1.0
+_listener = None
+_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format a record as one JSON object per line.
+    """
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key in ('endpoint', 'request_id'):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves all formatting to the listener thread and drops records when the queue is full.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The listener formats the record; tracebacks are rendered here, as they refer to live frames
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(text):
+    """
+    Parse "endpoint=rate,..." sampling rates; '*' sets the default rate.
+
+    Args:
+        text (str): Comma-separated endpoint=rate pairs.
+
+    Returns:
+        tuple: (endpoint -> rate dict, default rate or None).
+    """
+    rates, default = {}, None
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        endpoint, _, rate = item.rpartition('=')
+        if endpoint == '*':
+            default = float(rate)
+        else:
+            rates[endpoint] = float(rate)
+    return rates, default
+
+
+def configure(level=None, sample_rates=None, default_rate=None, stream=None, queue_size=10000):
+    """
+    Set up the queue-backed JSON logging of the API (idempotent).
+
+    Args:
+        level (str or int): Minimum level (default: LOG_LEVEL or INFO).
+        sample_rates (dict): Endpoint -> fraction of its DEBUG/INFO records kept (default: LOG_SAMPLE_RATES).
+        default_rate (float): Fraction kept for endpoints without a rate (default: '*' in LOG_SAMPLE_RATES, or 1).
+        stream: Where the listener writes (default: sys.stderr).
+        queue_size (int): Records buffered before new ones are dropped.
+
+    Returns:
+        logging.Logger: The API logger.
+    """
+    global _listener, _handler, _sample_rates, _default_rate
+    env_rates, env_default = parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES'))
+    _sample_rates = dict(env_rates if sample_rates is None else sample_rates)
+    _default_rate = default_rate if default_rate is not None else (env_default if env_default is not None else 1.0)
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level or os.environ.get('LOG_LEVEL', 'INFO'))
+    logger.propagate = False
+
+    if _listener is not None:
+        _listener.stop()
+        logger.removeHandler(_handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter())
+    _handler = DeferredQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    logger.addHandler(_handler)
+    _listener.start()
+    return logger
+
+
+def shutdown():
+    """Flush the queue and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown)
+
+
+def dropped_records():
+    """Number of records dropped because the queue was full."""
+    return _handler.dropped if _handler is not None else 0
+
+
+class EndpointLogger:
+    """
+    Logger of one endpoint, sampling its DEBUG and INFO records.
+
+    Field values may be callables; they are only evaluated for records that are kept.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.logger = logging.getLogger(LOGGER_NAME)
+
+    def log(self, level, msg, exc_info=None, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING:
+            rate = _sample_rates.get(self.endpoint, _default_rate)
+            if rate < 1.0 and random.random() >= rate:
+                return
+        for key, value in fields.items():
+            if callable(value):
+                fields[key] = value()
+        self.logger.log(level, msg, exc_info=exc_info, stacklevel=3, extra={
+            'endpoint': self.endpoint,
+            'request_id': _request_id.get(),
+            'fields': fields,
+        })
+
+    def debug(self, msg, **fields):
+        self.log(logging.DEBUG, msg, **fields)
+
+    def info(self, msg, **fields):
+        self.log(logging.INFO, msg, **fields)
+
+    def warning(self, msg, **fields):
+        self.log(logging.WARNING, msg, **fields)
+
+    def error(self, msg, exc_info=None, **fields):
+        self.log(logging.ERROR, msg, exc_info=exc_info, **fields)
+
+
+def get_logger(endpoint):
+    """
+    Return the logger of an endpoint.
+
+    Args:
+        endpoint (str): Endpoint path (or any component name), used for sampling and in every record.
+
+    Returns:
+        EndpointLogger: The logger.
+    """
+    return EndpointLogger(endpoint)
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware giving every request an id, from its X-Request-ID header or generated,
+    and echoing it in the response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope['headers']:
+            if name == b'x-request-id':
+                request_id = value.decode('latin-1')[:64]
+                break
+        if request_id is None:
+            request_id = os.urandom(8).hex()
+        token = _request_id.set(request_id)
+
+        async def send_with_id(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + [(b'x-request-id', request_id.encode('latin-1'))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _request_id.reset(token)
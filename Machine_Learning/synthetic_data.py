@@ -0,0 +1,256 @@
+"""
+Deterministic synthetic weather data in the schemas of the real inputs.
+
+Writes a data directory laid out like Machine_Learning/ (so the scripts can
+run in it unchanged) with any number of stations and years:
+
+    rainfall/maxtemperature.csv, mintemperature.csv, rainfall.csv   (BOM daily series)
+    temperature/Weather Data.csv                                     (daily means and extremes)
+    weather/weather_files/IDCJDW<station>.<YYYYMM>.csv               (BOM daily weather observations)
+
+Each station is a seasonal temperature cycle with AR(1) anomalies, wet days
+drawn from a seasonal probability with gamma-distributed amounts, and a few
+missing values and 'Calm' wind readings, as in the real files. The stations'
+rows are appended one after the other, so the scripts see one pooled dataset
+of stations × days rows. The same seed always gives the same files, and one
+station is generated at a time, so memory stays bounded at any scale.
+
+    python synthetic_data.py /tmp/synthetic --stations 100
+    python synthetic_data.py /tmp/synthetic --stations 10 --years 20
+"""
+
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+# Last day of each dataset and its span in the real files
+END_DATE = '2024-09-30'
+SPANS = {
+    'rainfall': 54.25,     # 1970-07 to 2024-09
+    'temperature': 10.75,  # 2014-01 to 2024-09
+    'weather': 13 / 12,    # 13 monthly files
+}
+
+WIND_DIRECTIONS = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE', 'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+
+# Columns of the BOM IDCJDW3050 monthly files, in order
+WEATHER_COLUMNS = [
+    'Date', 'Minimum temperature (°C)', 'Maximum temperature (°C)', 'Rainfall (mm)', 'Evaporation (mm)',
+    'Sunshine (hours)', 'Direction of maximum wind gust ', 'Speed of maximum wind gust (km/h)',
+    'Time of maximum wind gust', '9am Temperature (°C)', '9am relative humidity (%)', '9am cloud amount (oktas)',
+    '9am wind direction', '9am wind speed (km/h)', '9am MSL pressure (hPa)', '3pm Temperature (°C)',
+    '3pm relative humidity (%)', '3pm cloud amount (oktas)', '3pm wind direction', '3pm wind speed (km/h)',
+    '3pm MSL pressure (hPa)',
+]
+
+
+def daily_series(rng, dates, climate):
+    """
+    Simulate one station's daily weather.
+
+    Args:
+        rng (np.random.Generator): Random generator of the station.
+        dates (pd.DatetimeIndex): Days to simulate.
+        climate (dict): Station climate: mean_max, mean_min, amplitude, wet_probability, mean_rain.
+
+    Returns:
+        dict: Name -> ndarray with one value per day (max_temp, min_temp, rain, humidity, cloud, wind).
+    """
+    n = len(dates)
+    # Southern hemisphere: warmest around mid January
+    season = np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 15) / 365.25)
+
+    # AR(1) temperature anomalies shared by max and min: x[t] = 0.7 x[t-1] + e[t]
+    anomaly = lfilter([1.0], [1.0, -0.7], rng.normal(0, 2.2, n))
+
+    wet = rng.random(n) < np.clip(climate['wet_probability'] * (1 - 0.3 * season), 0.05, 0.95)
+    rain = np.where(wet, rng.gamma(0.7, climate['mean_rain'] / 0.7, n), 0.0).round(1)
+
+    max_temp = (climate['mean_max'] + climate['amplitude'] * season + anomaly - 1.5 * wet
+                + rng.normal(0, 1.0, n)).round(1)
+    min_temp = (climate['mean_min'] + 0.7 * climate['amplitude'] * season + 0.8 * anomaly
+                + rng.normal(0, 1.0, n)).round(1)
+    min_temp = np.minimum(min_temp, max_temp - 0.5)
+
+    humidity = np.clip(70 - 8 * season + 12 * wet + rng.normal(0, 8, n), 15, 100).round()
+    cloud = np.clip(np.round(4.5 + 2.5 * wet + rng.normal(0, 2, n)), 0, 8)
+    wind = np.clip(rng.gamma(2.0, 6.0, n), 0, 80).round()
+    return {'max_temp': max_temp, 'min_temp': min_temp, 'rain': rain, 'humidity': humidity, 'cloud': cloud,
+            'wind': wind, 'season': season}
+
+
+def station_climate(rng):
+    """
+    Draw a station's climate parameters.
+
+    Args:
+        rng (np.random.Generator): Random generator of the station.
+
+    Returns:
+        dict: Climate parameters for daily_series.
+    """
+    mean_max = rng.uniform(17, 30)
+    return {
+        'mean_max': mean_max,
+        'mean_min': mean_max - rng.uniform(7, 13),
+        'amplitude': rng.uniform(3, 8),
+        'wet_probability': rng.uniform(0.2, 0.55),
+        'mean_rain': rng.uniform(2, 8),
+    }
+
+
+def with_missing(rng, values, fraction):
+    """Copy of values with a random fraction set to NaN."""
+    values = values.astype(float)
+    values[rng.random(len(values)) < fraction] = np.nan
+    return values
+
+
+def write_rainfall(root, rng, dates, series, append):
+    """
+    Write the BOM daily max/min temperature and rainfall series.
+    """
+    frame = pd.DataFrame({'Year': dates.year, 'Month': dates.month, 'Day': dates.day})
+    accumulation = np.ones(len(dates))
+    accumulation[0] = np.nan
+    outputs = {
+        'maxtemperature.csv': frame.assign(**{
+            'Maximum temperature (Degree C)': with_missing(rng, series['max_temp'], 0.005),
+            'Days of accumulation of maximum temperature': accumulation,
+            'Quality': 'Y',
+        }),
+        'mintemperature.csv': frame.assign(**{
+            'Minimum temperature (Degree C)': with_missing(rng, series['min_temp'], 0.005),
+            'Days of accumulation of minimum temperature': accumulation,
+            'Quality': 'Y',
+        }),
+        'rainfall.csv': frame.assign(**{'Rainfall amount (millimetres)': with_missing(rng, series['rain'], 0.01)}),
+    }
+    for name, df in outputs.items():
+        df.to_csv(os.path.join(root, 'rainfall', name), mode='a' if append else 'w', header=not append, index=False)
+
+
+def write_temperature(root, dates, series, append):
+    """
+    Write the daily means and extremes in the schema of Weather Data.csv.
+    """
+    humidity = series['humidity']
+    df = pd.DataFrame({
+        'Datetime': dates.strftime('%Y-%m-%d'),
+        'TemperatureMean': ((series['max_temp'] + series['min_temp']) / 2).round(6),
+        'TemperatureMax': series['max_temp'],
+        'TemperatureMin': series['min_temp'],
+        'RainSum': series['rain'],
+        'RelativeHumidityMean': humidity,
+        'RelativeHumidityMax': np.minimum(humidity + 20, 100),
+        'RelativeHumidityMin': np.maximum(humidity - 25, 5),
+    })
+    path = os.path.join(root, 'temperature', 'Weather Data.csv')
+    df.to_csv(path, mode='a' if append else 'w', header=not append, index=False)
+
+
+def write_weather_files(root, rng, dates, series, station):
+    """
+    Write one BOM daily weather observations file per month (ISO-8859-1, like the downloads).
+    """
+    n = len(dates)
+    max_temp, min_temp, rain = series['max_temp'], series['min_temp'], series['rain']
+    wind_9am = series['wind'].astype(object)
+    wind_9am[rng.random(n) < 0.05] = 'Calm'
+    gust_minutes = rng.integers(0, 24 * 60, n)
+    df = pd.DataFrame({
+        'Date': dates.strftime('%d-%m-%Y'),
+        'Minimum temperature (°C)': min_temp,
+        'Maximum temperature (°C)': max_temp,
+        'Rainfall (mm)': rain,
+        'Evaporation (mm)': np.clip(2 + 2 * series['season'] + rng.normal(0, 1, n), 0, None).round(1),
+        'Sunshine (hours)': np.clip(8 - series['cloud'] + rng.normal(0, 1, n), 0, 14).round(1),
+        'Direction of maximum wind gust ': rng.choice(WIND_DIRECTIONS, n),
+        'Speed of maximum wind gust (km/h)': (series['wind'] * 2 + rng.integers(5, 20, n)).astype(float),
+        'Time of maximum wind gust': [f"{m // 60:02d}:{m % 60:02d}" for m in gust_minutes],
+        '9am Temperature (°C)': (min_temp + 0.4 * (max_temp - min_temp)).round(1),
+        '9am relative humidity (%)': series['humidity'],
+        '9am cloud amount (oktas)': series['cloud'],
+        '9am wind direction': rng.choice(WIND_DIRECTIONS, n),
+        '9am wind speed (km/h)': wind_9am,
+        '9am MSL pressure (hPa)': (1017 + rng.normal(0, 7, n)).round(1),
+        '3pm Temperature (°C)': (max_temp - rng.uniform(0, 2, n)).round(1),
+        '3pm relative humidity (%)': np.clip(series['humidity'] - 15, 5, 100),
+        '3pm cloud amount (oktas)': np.clip(series['cloud'] + rng.integers(-2, 3, n), 0, 8),
+        '3pm wind direction': rng.choice(WIND_DIRECTIONS, n),
+        '3pm wind speed (km/h)': (series['wind'] * 1.4).round(),
+        '3pm MSL pressure (hPa)': (1015 + rng.normal(0, 7, n)).round(1),
+    }, columns=WEATHER_COLUMNS)
+    # Some days miss their gust observations, as in the downloads
+    no_gust = rng.random(n) < 0.02
+    df.loc[no_gust, ['Direction of maximum wind gust ', 'Speed of maximum wind gust (km/h)',
+                     'Time of maximum wind gust']] = np.nan
+
+    months = dates.year * 100 + dates.month
+    for month in np.unique(months):
+        path = os.path.join(root, 'weather', 'weather_files', f'IDCJDW{station:04d}.{month}.csv')
+        df[months == month].to_csv(path, index=False, encoding='ISO-8859-1')
+
+
+def generate(root, stations=1, years=None, seed=42):
+    """
+    Generate a synthetic data directory.
+
+    Args:
+        root (str): Output directory (created if needed).
+        stations (int): Number of stations, written one after the other.
+        years (float): Years of data per station for every dataset (default: the spans of the real files).
+        seed (int): Random seed.
+
+    Returns:
+        dict: Dataset name -> number of rows written.
+    """
+    for sub in ('rainfall', 'temperature', os.path.join('weather', 'weather_files'), 'model'):
+        os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    end = pd.Timestamp(END_DATE)
+    spans = {name: years or span for name, span in SPANS.items()}
+    ranges = {name: pd.date_range(end - pd.DateOffset(days=int(round(span * 365.25)) - 1), end, freq='D')
+              for name, span in spans.items()}
+    # The BOM files hold whole months
+    first_month = ranges['weather'][0] + pd.offsets.MonthBegin(0)  # Rolls forward to a month start
+    ranges['weather'] = ranges['weather'][ranges['weather'] >= first_month]
+    longest = max(ranges.values(), key=len)
+
+    for station in range(stations):
+        rng = np.random.default_rng([seed, station])
+        series = daily_series(rng, longest, station_climate(rng))
+
+        def clip(dates):
+            offset = len(longest) - len(dates)
+            return {name: values[offset:] for name, values in series.items()}
+
+        write_rainfall(root, rng, ranges['rainfall'], clip(ranges['rainfall']), append=station > 0)
+        write_temperature(root, ranges['temperature'], clip(ranges['temperature']), append=station > 0)
+        write_weather_files(root, rng, ranges['weather'], clip(ranges['weather']), 3050 + station)
+
+    return {name: stations * len(dates) for name, dates in ranges.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic weather data in the schemas of the real inputs.")
+    parser.add_argument('root', help="Output directory, laid out like Machine_Learning/")
+    parser.add_argument('--stations', type=int, default=1, help="Number of stations")
+    parser.add_argument('--years', type=float, default=None, help="Years per station (default: real spans)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--json', action='store_true', help="Print the row counts as one JSON object")
+    args = parser.parse_args()
+
+    rows = generate(args.root, args.stations, args.years, args.seed)
+    if args.json:
+        print(json.dumps(rows))
+        return
+    for name, count in rows.items():
+        print(f"{name}: {count:,} rows")
+
+
+if __name__ == "__main__":
+    main()
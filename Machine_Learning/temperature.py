@@ -2,6 +2,8 @@
 Trains to predict temperature using Linear Regression
 """
 
+import argparse
+import os
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LinearRegression
@@ -12,42 +14,53 @@ import plotly.express as px
 import seaborn as sns
 import matplotlib.pyplot as plt
 import joblib  
+from stage_timing import timed_stage
+from stage_cache import cached_stage
+from feature_store import add_calendar_features
+import feature_store
+import diagnostics
 
 # Function to load training and testing data from CSV files
+@cached_stage
 def load_data(train_filepath, test_filepath):
     train_data = pd.read_csv(train_filepath)  # Load training data
     test_data = pd.read_csv(test_filepath)    # Load testing data
     return train_data, test_data
 
 # Function to preprocess the data by converting date strings and handling missing values
+@cached_stage(depends=(feature_store,))
 def preprocess_data(df):
-    df['Datetime'] = pd.to_datetime(df['Datetime'], utc=True)  # Convert 'Datetime' column to datetime format
-    df['Year'] = df['Datetime'].dt.year  # Extract year
-    df['Month'] = df['Datetime'].dt.month  # Extract month
-    df['Day'] = df['Datetime'].dt.day  # Extract day
-    df['Hour'] = df['Datetime'].dt.hour  # Extract hour
-    df['Datetime'] = df['Datetime'].dt.tz_localize(None)  # Remove timezone info for simplicity
+    df = add_calendar_features(df)  # Parse 'Datetime' and extract Year, Month, Day and Hour
     df.ffill(inplace=True)  # Forward fill to handle missing values
     return df
 
+# Features and target of the temperature model
+FEATURES = ['TemperatureMax', 'TemperatureMin', 'RainSum', 
+            'RelativeHumidityMean', 'RelativeHumidityMax', 
+            'RelativeHumidityMin', 'Month', 'Day', 'Hour']
+TARGET = 'TemperatureMean'
+
 # Function to prepare features and target variable for training and testing
 def prepare_features(train_data, test_data):
-    features = ['TemperatureMax', 'TemperatureMin', 'RainSum', 
-                'RelativeHumidityMean', 'RelativeHumidityMax', 
-                'RelativeHumidityMin', 'Month', 'Day', 'Hour']
-    X_train = train_data[features]  
-    y_train = train_data['TemperatureMean']  
-    X_test = test_data[features]  
-    y_test = test_data['TemperatureMean']  
+    X_train = train_data[FEATURES]  
+    y_train = train_data[TARGET]  
+    X_test = test_data[FEATURES]  
+    y_test = test_data[TARGET]  
     
     return X_train, y_train, X_test, y_test
 
-# Function to scale feature data using StandardScaler
-def scale_data(X_train, X_test):
+# Function to fit a StandardScaler and scale the feature data
+@cached_stage
+def fit_scaler(X_train, X_test):
     scaler = StandardScaler()  
     X_train_scaled = scaler.fit_transform(X_train)  
     X_test_scaled = scaler.transform(X_test) 
-    joblib.dump(scaler, 'model/temperauture_scaler.joblib')  # Save the scaler model for future use
+    return scaler, X_train_scaled, X_test_scaled
+
+# Function to scale feature data using StandardScaler
+def scale_data(X_train, X_test, scaler_filepath='model/temperauture_scaler.joblib'):
+    scaler, X_train_scaled, X_test_scaled = fit_scaler(X_train, X_test)
+    joblib.dump(scaler, scaler_filepath)  # Save the scaler model for future use
     return X_train_scaled, X_test_scaled  
 
 # Function to train a linear regression model
@@ -95,7 +108,7 @@ def plot_actual_vs_predicted(dates, y_test, y_pred):
         template='plotly_dark',
         xaxis=dict(rangeslider=dict(visible=True), type="date")
     )
-    fig.show()  # Display the plot
+    diagnostics.show('actual_vs_predicted', fig)  # Display the plot
 
 # Function to plot a heatmap of feature correlations
 def plot_correlation_heatmap(train_data):
@@ -103,7 +116,7 @@ def plot_correlation_heatmap(train_data):
     plt.figure(figsize=(10, 8)) 
     sns.heatmap(corr_matrix, annot=True, cmap="coolwarm", linewidths=0.5)  
     plt.title("Feature Correlation Heatmap") 
-    plt.show()  
+    diagnostics.show('correlation_heatmap')
 
 # Function to plot histograms of actual vs predicted temperatures
 def plot_histogram(y_test, y_pred):
@@ -111,7 +124,7 @@ def plot_histogram(y_test, y_pred):
     fig_hist = px.histogram(hist_data, barmode='overlay', 
                              color_discrete_map={'Actual':'blue', 'Predicted':'red'},
                              title="Histogram of Actual vs Predicted TemperatureMean")
-    fig_hist.show()  
+    diagnostics.show('histogram', fig_hist)
 
 # Function to plot residuals of the predictions
 def plot_residuals(y_test, y_pred):
@@ -119,7 +132,7 @@ def plot_residuals(y_test, y_pred):
     fig_resid = px.scatter(x=y_pred, y=residuals, title="Residuals Plot: Predicted vs Residuals",
                            labels={'x': 'Predicted TemperatureMean', 'y': 'Residuals'})
     fig_resid.add_hline(y=0, line_dash="dash", line_color="red")  
-    fig_resid.show()  
+    diagnostics.show('residuals', fig_resid)
 
 # Function to plot a scatter matrix of selected features
 def plot_scatter_matrix(train_data):
@@ -133,7 +146,7 @@ def plot_scatter_matrix(train_data):
         height=1000,
         template='plotly_white'
     )
-    fig_scatter_matrix.show()  
+    diagnostics.show('scatter_matrix', fig_scatter_matrix)
 
 # Function to save the trained model to disk
 def save_model(model, filepath):
@@ -161,17 +174,47 @@ def get_temperature():
 #  y_pred, dates, y_test
 
 
+# Function to train and save the model and scaler without any plotting
+def train(output_dir='.', timings=None):
+    model_path = 'model/temperature_model.joblib'
+    scaler_path = 'model/temperauture_scaler.joblib'
+
+    with timed_stage(timings, 'load'):
+        train_data, test_data = load_data('temperature/train.csv', 'temperature/test.csv')
+    with timed_stage(timings, 'preprocess'):
+        train_data = preprocess_data(train_data)
+        test_data = preprocess_data(test_data)
+        X_train, y_train, X_test, y_test = prepare_features(train_data, test_data)
+        X_train_scaled, X_test_scaled = scale_data(X_train, X_test, os.path.join(output_dir, scaler_path))
+    with timed_stage(timings, 'fit'):
+        model = train_model(X_train_scaled, y_train)
+    with timed_stage(timings, 'save'):
+        save_model(model, os.path.join(output_dir, model_path))
+    with timed_stage(timings, 'evaluate'):
+        evaluate_model(model, X_test_scaled, y_test)
+
+    return [model_path, scaler_path]
+
 # Main function 
 def main():
-    train_data, y_pred, dates, y_test = get_temperature()
-    plot_actual_vs_predicted(dates, y_test, y_pred)
-    plot_correlation_heatmap(train_data)
-    plot_histogram(y_test, y_pred)
-    plot_residuals(y_test, y_pred)
-    plot_scatter_matrix(train_data)
+    parser = argparse.ArgumentParser(description="Train the temperature regression model.")
+    diagnostics.add_arguments(parser)
+    args = parser.parse_args()
+    diagnostics.configure(args, 'temperature')
+
+    train_data, y_pred, dates, y_test, y_train = get_temperature()
+
+    # The model is saved, so headless diagnostics can start rendering
+    diagnostics.flush()
+    diagnostics.defer(plot_actual_vs_predicted, dates, y_test, y_pred)
+    diagnostics.defer(plot_correlation_heatmap, train_data)
+    diagnostics.defer(plot_histogram, y_test, y_pred)
+    diagnostics.defer(plot_residuals, y_test, y_pred)
+    diagnostics.defer(plot_scatter_matrix, train_data)
     print("--------------------------------")
     pd.set_option('display.max_columns', 500)
     print(train_data)
+    diagnostics.wait()
 
 # Run the main function
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+"""
+Walk-forward backtest of the temperature model over monthly windows.
+
+Instead of the single 2023-01-01 cut made by temperature_train_test.py, the
+model is refitted for every month of Weather Data.csv on the data before it
+(an expanding window, or a rolling window of fixed length) and evaluated on
+that month. The data is loaded once; each window is a pair of index slices
+into the same arrays, so no train/test files are written. Windows are
+evaluated in parallel and the per-window metrics are stored as columns in a
+single .npz file.
+
+    python temperature_backtest.py                          # expanding windows
+    python temperature_backtest.py --mode rolling --train-months 24
+    python temperature_backtest.py --show temperature/backtest_metrics.npz
+"""
+
+import argparse
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.linear_model import LinearRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from temperature import FEATURES, TARGET, preprocess_data
+
+METRICS_PATH = 'temperature/backtest_metrics.npz'
+
+
+def default_model_factory():
+    """
+    Build the model evaluated by default: temperature.py's scaler and LinearRegression.
+
+    Returns:
+        Pipeline: An unfitted model.
+    """
+    return make_pipeline(StandardScaler(), LinearRegression())
+
+
+def load_arrays(filepath='temperature/Weather Data.csv'):
+    """
+    Load the full dataset once, prepared as temperature.py prepares train.csv and test.csv.
+
+    Args:
+        filepath (str): Path to Weather Data.csv.
+
+    Returns:
+        tuple: (X ndarray, y ndarray, month ndarray of year * 12 + month - 1), sorted by date.
+    """
+    # temperature_train_test.py fills missing values with 0 before splitting
+    df = pd.read_csv(filepath, encoding='utf-8').fillna(0)
+    df = preprocess_data(df).sort_values('Datetime', kind='stable')
+    X = df[FEATURES].to_numpy(dtype=float)
+    y = df[TARGET].to_numpy(dtype=float)
+    month = (df['Year'] * 12 + df['Month'] - 1).to_numpy()
+    return X, y, month
+
+
+def month_windows(month, mode='expanding', train_months=24, min_train_months=12):
+    """
+    Build one train/test window per month.
+
+    Args:
+        month (ndarray): Sorted month code of each row.
+        mode (str): 'expanding' trains on all earlier months, 'rolling' on the last train_months.
+        train_months (int): Length of the rolling training window.
+        min_train_months (int): Months of history required before the first test month.
+
+    Returns:
+        ndarray: Rows of (test month, train start, train stop, test start, test stop) row positions.
+    """
+    months = np.unique(month)
+    test_months = months[months >= months[0] + min_train_months]
+    test_start = np.searchsorted(month, test_months, side='left')
+    test_stop = np.searchsorted(month, test_months, side='right')
+    if mode == 'expanding':
+        train_start = np.zeros_like(test_start)
+    elif mode == 'rolling':
+        train_start = np.searchsorted(month, test_months - train_months, side='left')
+    else:
+        raise ValueError(f"Unknown window mode: {mode}")
+    return np.column_stack([test_months, train_start, test_start, test_start, test_stop])
+
+
+def evaluate_window(model_factory, X, y, window):
+    """
+    Fit a fresh model on one window's training slice and score it on the test slice.
+
+    Args:
+        model_factory (callable): Returns an unfitted model.
+        X (ndarray): Features of the whole dataset.
+        y (ndarray): Target of the whole dataset.
+        window (ndarray): (test month, train start, train stop, test start, test stop).
+
+    Returns:
+        tuple: (train rows, test rows, MAE, RMSE, bias, R²).
+    """
+    _, train_start, train_stop, test_start, test_stop = window
+    model = model_factory()
+    # Basic slices are views, so no window copies the data
+    model.fit(X[train_start:train_stop], y[train_start:train_stop])
+    y_test = y[test_start:test_stop]
+    error = model.predict(X[test_start:test_stop]) - y_test
+    ss_tot = ((y_test - y_test.mean()) ** 2).sum()
+    r2 = 1 - (error ** 2).sum() / ss_tot if ss_tot > 0 else np.nan
+    return (train_stop - train_start, test_stop - test_start, np.abs(error).mean(),
+            np.sqrt((error ** 2).mean()), error.mean(), r2)
+
+
+def backtest(X, y, month, mode='expanding', train_months=24, min_train_months=12,
+             model_factory=default_model_factory, n_jobs=None):
+    """
+    Evaluate a model on every monthly window.
+
+    Args:
+        X (ndarray): Features, sorted by date.
+        y (ndarray): Target, sorted by date.
+        month (ndarray): Month code of each row.
+        mode (str): 'expanding' or 'rolling'.
+        train_months (int): Length of the rolling training window.
+        min_train_months (int): Months of history required before the first test month.
+        model_factory (callable): Returns an unfitted model with fit/predict.
+        n_jobs (int): Number of windows evaluated in parallel (None for one, -1 for all cores).
+
+    Returns:
+        dict: Column name -> ndarray with one entry per window.
+    """
+    windows = month_windows(month, mode, train_months, min_train_months)
+    results = Parallel(n_jobs=n_jobs)(delayed(evaluate_window)(model_factory, X, y, w) for w in windows)
+    columns = np.array(results, dtype=float).reshape(len(windows), 6)
+    return {
+        'month': windows[:, 0],
+        'train_rows': columns[:, 0].astype(int),
+        'test_rows': columns[:, 1].astype(int),
+        'mae': columns[:, 2],
+        'rmse': columns[:, 3],
+        'bias': columns[:, 4],
+        'r2': columns[:, 5],
+    }
+
+
+def save_metrics(metrics, filepath=METRICS_PATH):
+    np.savez(filepath, **metrics)
+
+
+def load_metrics(filepath=METRICS_PATH):
+    with np.load(filepath) as data:
+        return {name: data[name] for name in data.files}
+
+
+def format_metrics(metrics):
+    """
+    Format per-month metrics as a text table with an overall summary.
+
+    Args:
+        metrics (dict): Columns returned by backtest().
+
+    Returns:
+        str: The formatted table.
+    """
+    lines = [f"{'month':<10}{'train':>8}{'test':>6}{'MAE':>8}{'RMSE':>8}{'bias':>8}{'R²':>8}"]
+    for i, code in enumerate(metrics['month']):
+        label = f"{code // 12}-{code % 12 + 1:02d}"
+        lines.append(f"{label:<10}{metrics['train_rows'][i]:>8}{metrics['test_rows'][i]:>6}"
+                     f"{metrics['mae'][i]:>8.3f}{metrics['rmse'][i]:>8.3f}{metrics['bias'][i]:>8.3f}"
+                     f"{metrics['r2'][i]:>8.3f}")
+
+    # Overall errors weighted by the number of test rows in each month
+    weights = metrics['test_rows']
+    mae = np.average(metrics['mae'], weights=weights)
+    rmse = np.sqrt(np.average(metrics['rmse'] ** 2, weights=weights))
+    lines.append(f"{'overall':<10}{'':>8}{weights.sum():>6}{mae:>8.3f}{rmse:>8.3f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the temperature model.")
+    parser.add_argument('--data', default='temperature/Weather Data.csv', help="Full weather dataset")
+    parser.add_argument('--mode', choices=['expanding', 'rolling'], default='expanding', help="Training window type")
+    parser.add_argument('--train-months', type=int, default=24, help="Rolling window length in months")
+    parser.add_argument('--min-train-months', type=int, default=12, help="History required before the first test month")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Windows evaluated in parallel")
+    parser.add_argument('--output', default=METRICS_PATH, help="Where to save the per-window metrics")
+    parser.add_argument('--show', metavar='PATH', help="Print saved metrics instead of running the backtest")
+    args = parser.parse_args()
+
+    if args.show:
+        print(format_metrics(load_metrics(args.show)))
+        return
+
+    X, y, month = load_arrays(args.data)
+    metrics = backtest(X, y, month, args.mode, args.train_months, args.min_train_months, n_jobs=args.n_jobs)
+    save_metrics(metrics, args.output)
+    print(format_metrics(metrics))
+    print(f"\nMetrics for {len(metrics['month'])} windows saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,25 @@
 """
 Predict temperature for the next day
+
+With --daemon, the prediction is made by prediction_daemon.py; pandas, scikit-learn
+and the model are then only imported and loaded if the daemon is not running.
 """
-import pandas as pd
-import joblib
-import numpy as np
+import argparse
+import prediction_daemon
+
+OUTPUT_PATH = 'temperature/predicted_temperatures_next_day.csv'
 
 def load_model_and_scaler(model_path, scaler_path):
+    import joblib
     # Load the pre-trained machine learning model and the scaler from specified paths
     model = joblib.load(model_path)
     scaler = joblib.load(scaler_path)
     return model, scaler
 
 def preprocess_new_data(df):
-    # Convert the 'Datetime' column to datetime format with UTC timezone
-    df['Datetime'] = pd.to_datetime(df['Datetime'], utc=True)
-    
-    # Extract year, month, day, and hour from the 'Datetime' column
-    df['Year'] = df['Datetime'].dt.year
-    df['Month'] = df['Datetime'].dt.month
-    df['Day'] = df['Datetime'].dt.day
-    df['Hour'] = df['Datetime'].dt.hour
-    
-    # Remove timezone information for further processing
-    df['Datetime'] = df['Datetime'].dt.tz_localize(None)
+    from feature_store import add_calendar_features
+    # Parse 'Datetime' and extract year, month, day and hour as the trainer does
+    df = add_calendar_features(df)
     
     # Forward fill missing values in the DataFrame
     df.ffill(inplace=True)
@@ -38,26 +35,20 @@ def prepare_features_for_prediction(df):
     X = df[features]
     return X
 
-def predict_temperature_for_next_day(new_data_filepath):
-    # Load the trained model and scaler
-    model, scaler = load_model_and_scaler('model/temperature_model.joblib', 'model/temperauture_scaler.joblib')
-    
-    # Read the new data from the specified CSV file
-    new_data = pd.read_csv(new_data_filepath)
-    
-    # Preprocess the new data to prepare it for prediction
-    new_data = preprocess_new_data(new_data)
-    
-    # Create a DataFrame for the next day's date
-    next_day = new_data['Datetime'].max() + pd.Timedelta(days=1)
+def next_day_predictions(state, model, scaler):
+    import pandas as pd
+
+    # Create a DataFrame for the next day's date from the running means of the rolling state,
+    # instead of re-reading and averaging the whole history
+    next_day = pd.Timestamp(state.last_date) + pd.Timedelta(days=1)
     next_day_df = pd.DataFrame({
         'Datetime': [next_day],
-        'TemperatureMax': [new_data['TemperatureMax'].mean()],  
-        'TemperatureMin': [new_data['TemperatureMin'].mean()],
-        'RainSum': [new_data['RainSum'].mean()],
-        'RelativeHumidityMean': [new_data['RelativeHumidityMean'].mean()],
-        'RelativeHumidityMax': [new_data['RelativeHumidityMax'].mean()],
-        'RelativeHumidityMin': [new_data['RelativeHumidityMin'].mean()],
+        'TemperatureMax': [state.mean('TemperatureMax')],  
+        'TemperatureMin': [state.mean('TemperatureMin')],
+        'RainSum': [state.mean('RainSum')],
+        'RelativeHumidityMean': [state.mean('RelativeHumidityMean')],
+        'RelativeHumidityMax': [state.mean('RelativeHumidityMax')],
+        'RelativeHumidityMin': [state.mean('RelativeHumidityMin')],
     })
 
     # Preprocess the next day's DataFrame
@@ -74,13 +65,36 @@ def predict_temperature_for_next_day(new_data_filepath):
     
     # Add the predictions to the next day's DataFrame
     next_day_df['PredictedTemperatureMean'] = predictions
+    return next_day_df
+
+def predict_temperature_for_next_day(state):
+    # Load the trained model and scaler
+    model, scaler = load_model_and_scaler('model/temperature_model.joblib', 'model/temperauture_scaler.joblib')
+    next_day_df = next_day_predictions(state, model, scaler)
     
     # Print the predicted temperature for the next day
-    print(f"Predicted temperature for {next_day}: {predictions[0]}°C")
+    print(f"Predicted temperature for {next_day_df['Datetime'].iloc[0]}: {next_day_df['PredictedTemperatureMean'].iloc[0]}°C")
     
     # Save the predictions to a new CSV file
-    next_day_df.to_csv('temperature/predicted_temperatures_next_day.csv', index=False)
+    next_day_df.to_csv(OUTPUT_PATH, index=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict the mean temperature of the next day.")
+    prediction_daemon.add_arguments(parser)
+    args = parser.parse_args()
+
+    # Ask the warm daemon first when requested; it sends back the CSV the local run would write
+    result = prediction_daemon.ask(args, 'temperature')
+    if result is not None:
+        print(f"Predicted temperature for {result['date']}: {result['predicted_temperature']}°C")
+        with open(OUTPUT_PATH, 'w', newline='') as f:
+            f.write(result['csv'])
+        return
+
+    from rolling_state import load_state
+
+    # Rolling state of temperature/test.csv, built from the file on first use
+    predict_temperature_for_next_day(load_state('temperature'))
 
 if __name__ == "__main__":
-    new_data_filepath = 'temperature/test.csv' 
-    predict_temperature_for_next_day(new_data_filepath)
+    main()
@@ -0,0 +1,62 @@
+"""
+Property tests: the compiled label rules equal the row-wise implementations they replaced.
+
+    python -m pytest test_label_rules.py
+"""
+
+import numpy as np
+import pytest
+from label_rules import label_heatwave, label_rainy, label_weather_condition, random_weather_frame
+from weather_conditions import categorize_weather
+
+TRIALS = 50
+MAX_ROWS = 2000
+
+
+def reference_labels(df):
+    """
+    Label a frame with the original row-wise / ad-hoc implementations.
+
+    Args:
+        df (pd.DataFrame): Observations from random_weather_frame.
+
+    Returns:
+        dict: Rule set name to label array.
+    """
+    threshold_min = df['Minimum temperature (Degree C)'].quantile(0.90)
+    threshold_max = df['Maximum temperature (Degree C)'].quantile(0.90)
+    return {
+        'weather_condition': df.apply(categorize_weather, axis=1).to_numpy(),
+        'rainy': (df['Rainfall amount (millimetres)'] > 0).astype(int).to_numpy(),
+        'heatwave': (
+            (df['Minimum temperature (Degree C)'].rolling(window=3).mean() > threshold_min) &
+            (df['Maximum temperature (Degree C)'].rolling(window=3).mean() > threshold_max)
+        ).astype(int).to_numpy(),
+    }
+
+
+def compiled_labels(df):
+    """
+    Label a frame with the compiled rule sets.
+
+    Args:
+        df (pd.DataFrame): Observations from random_weather_frame.
+
+    Returns:
+        dict: Rule set name to label array.
+    """
+    return {
+        'weather_condition': label_weather_condition(df),
+        'rainy': label_rainy(df),
+        'heatwave': label_heatwave(df),
+    }
+
+
+@pytest.mark.parametrize('trial', range(TRIALS))
+def test_compiled_rules_match_row_wise(trial):
+    n_rows = int(np.random.default_rng(trial).integers(1, MAX_ROWS))
+    df = random_weather_frame(n_rows, seed=trial)
+    expected, actual = reference_labels(df), compiled_labels(df)
+    for name in expected:
+        mismatches = np.flatnonzero(expected[name] != actual[name])
+        assert mismatches.size == 0, f"{name}: {mismatches.size} mismatches, first row {mismatches[0]}"
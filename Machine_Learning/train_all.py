@@ -0,0 +1,157 @@
+"""
+Trains all four models concurrently and publishes their artifacts together.
+
+Each trainer runs headless in its own process under a share of a global core
+budget. Artifacts are written to a staging directory and only moved into
+model/ and rainfall/ once every trainer has succeeded, so a failed run never
+leaves a mix of old and new models behind (the files of a successful run are
+replaced one by one, see publish_artifacts).
+"""
+
+import argparse
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from threadpoolctl import threadpool_limits
+from stage_timing import format_timings
+import stage_cache
+
+# Trainer modules, each exposing train(output_dir, timings); the parallel ones also take n_jobs
+TRAINERS = ['temperature', 'weather_conditions', 'rainfall_yes_no', 'heatwave']
+
+# Trainers whose work parallelizes well; they share the cores left after the others get one each
+PARALLEL_TRAINERS = ['weather_conditions']
+
+REPORT_PATH = 'model/training_report.json'
+
+
+def allocate_cores(trainers, budget):
+    """
+    Split a core budget between trainers.
+
+    Serial trainers get one core each and the parallel trainers share the rest.
+
+    Args:
+        trainers (list): Trainer module names.
+        budget (int): Total number of cores available.
+
+    Returns:
+        dict: Trainer name -> number of cores.
+    """
+    parallel = [t for t in trainers if t in PARALLEL_TRAINERS]
+    serial = [t for t in trainers if t not in PARALLEL_TRAINERS]
+    spare = max(budget - len(serial), len(parallel))
+
+    cores = {t: 1 for t in serial}
+    for i, t in enumerate(parallel):
+        cores[t] = max(1, spare // len(parallel) + (1 if i < spare % len(parallel) else 0))
+    return cores
+
+
+def run_trainer(name, output_dir, n_jobs):
+    """
+    Run one trainer in the current process with its threads capped at n_jobs.
+
+    Args:
+        name (str): Trainer module name.
+        output_dir (str): Staging directory for the artifacts.
+        n_jobs (int): Number of cores for this trainer.
+
+    Returns:
+        tuple: (artifact paths relative to output_dir, stage timings).
+    """
+    timings = {}
+    start = time.perf_counter()
+    with threadpool_limits(limits=n_jobs):
+        trainer = importlib.import_module(name)
+        options = {'n_jobs': n_jobs} if name in PARALLEL_TRAINERS else {}
+        artifacts = trainer.train(output_dir=output_dir, timings=timings, **options)
+    timings['total'] = time.perf_counter() - start
+    return artifacts, timings
+
+
+def publish_artifacts(staging_dir, artifacts):
+    """
+    Move staged artifacts over their final paths.
+
+    Each os.replace is atomic, so a reader sees either the old or the new version
+    of each file. The files are replaced one after the other, so a reader that
+    loads several of them while they are published (a few milliseconds) can get
+    a new model next to an old scaler or imputation file.
+
+    Args:
+        staging_dir (str): Staging directory holding the new artifacts.
+        artifacts (list): Artifact paths relative to the staging directory.
+    """
+    for path in artifacts:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        os.replace(os.path.join(staging_dir, path), path)
+
+
+def train_all(trainers=TRAINERS, cores=None):
+    """
+    Train the given models concurrently and publish their artifacts.
+
+    Args:
+        trainers (list): Trainer module names to run.
+        cores (int): Global core budget (defaults to all cores).
+
+    Returns:
+        dict: Trainer name -> stage timings, plus a 'publish' entry.
+    """
+    cores = cores or os.cpu_count() or 1
+    allocation = allocate_cores(trainers, cores)
+
+    # Stage inside the working tree so the final os.replace stays on one filesystem
+    staging_dir = tempfile.mkdtemp(prefix='.staging-', dir='.')
+    for sub in ('model', 'rainfall'):
+        os.makedirs(os.path.join(staging_dir, sub))
+
+    try:
+        with ProcessPoolExecutor(max_workers=min(len(trainers), cores)) as pool:
+            futures = {name: pool.submit(run_trainer, name, staging_dir, allocation[name]) for name in trainers}
+            results = {name: future.result() for name, future in futures.items()}
+
+        report = {name: timings for name, (_, timings) in results.items()}
+        artifacts = [path for paths, _ in results.values() for path in paths]
+
+        # Write the timing report alongside the models and publish everything at once
+        start = time.perf_counter()
+        with open(os.path.join(staging_dir, REPORT_PATH), 'w') as f:
+            json.dump({'cores': cores, 'allocation': allocation, 'timings': report}, f, indent=2)
+        publish_artifacts(staging_dir, artifacts + [REPORT_PATH])
+        report['publish'] = {'total': time.perf_counter() - start}
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train all models concurrently.")
+    parser.add_argument('--cores', type=int, default=None, help="Global core budget (default: all cores)")
+    parser.add_argument('--only', nargs='+', choices=TRAINERS, default=TRAINERS, help="Trainers to run")
+    parser.add_argument('--cache-dir', default='.stage_cache', help="Stage cache directory (default: .stage_cache)")
+    parser.add_argument('--no-cache', action='store_true', help="Re-run every preprocessing stage")
+    args = parser.parse_args()
+
+    # Reuse cached preprocessing outputs so only changed stages and the model fits are re-run
+    if args.no_cache:
+        stage_cache.disable()
+    else:
+        stage_cache.enable(args.cache_dir)
+
+    start = time.perf_counter()
+    report = train_all(args.only, args.cores)
+
+    print("\nTiming report:")
+    print(format_timings(report))
+    print(f"\nAll models trained in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
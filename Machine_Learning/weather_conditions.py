@@ -3,6 +3,9 @@ This code implements a weather classification model using a Random Forest classi
 """
 
 
+import argparse
+import os
+import time
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -12,7 +15,15 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
 import joblib  
 from pandas.plotting import scatter_matrix
-
+from label_rules import label_weather_condition
+from stage_timing import timed_stage
+from stage_cache import cached_stage
+from weather_search import successive_halving, write_search_log
+from weather_imputation import ImputationStats
+import label_rules
+import diagnostics
+
+@cached_stage
 def load_data(filepath):
     """
     Load the dataset from a CSV file.
@@ -26,6 +37,7 @@ def load_data(filepath):
     data = pd.read_csv(filepath)
     return pd.DataFrame(data)
 
+@cached_stage
 def preprocess_data(df):
     """
     Preprocess the dataset by handling missing values and modifying specific columns.
@@ -66,17 +78,21 @@ def categorize_weather(row):
     else:
         return 'Sunny'
 
+@cached_stage(depends=(label_rules,))
 def add_weather_condition_column(df):
     """
     Add a new column to the DataFrame for weather conditions based on existing features.
 
+    Uses the compiled WEATHER_CONDITION_RULES, which label every row at once and
+    give the same result as applying categorize_weather row by row.
+
     Args:
         df (DataFrame): The pandas DataFrame containing weather data.
     
     Returns:
         DataFrame: The DataFrame with a new column 'WeatherCondition'.
     """
-    df['WeatherCondition'] = df.apply(categorize_weather, axis=1)
+    df['WeatherCondition'] = label_weather_condition(df)
     return df
 
 def split_data(df):
@@ -98,32 +114,77 @@ def split_data(df):
     y = df['WeatherCondition']
     return X, y
 
-def train_model(X, y):
+def search_model(X, y, budget_seconds, n_jobs=None, search_log_filepath='model/weather_search_log.jsonl'):
+    """
+    Tune the Random Forest by successive halving and write the search log.
+
+    Args:
+        X (DataFrame): The feature matrix.
+        y (Series): The target variable representing weather conditions.
+        budget_seconds (float): Wall-clock budget for the search.
+        n_jobs (int): Number of parallel fits (None for one).
+        search_log_filepath (str): File path to save the JSON-lines search log.
+
+    Returns:
+        clf (RandomForestClassifier): The unfitted classifier with the winning parameters.
+    """
+    log = []
+    start = time.perf_counter()
+    params, score = successive_halving(X, y, budget_seconds=budget_seconds, n_jobs=n_jobs, log=log)
+    seconds = time.perf_counter() - start
+    write_search_log(log, (params, score), seconds, search_log_filepath)
+
+    print(f"Search evaluated {len(log)} candidates in {seconds:.1f}s")
+    print("Best Parameters:", params)
+    print("Best Mean Cross-Validation Accuracy:", score)
+    return RandomForestClassifier(random_state=42, **params)
+
+def train_model(X, y, n_jobs=None, model_filepath='model/weather_classifier_model.joblib', timings=None,
+                search_budget=None, search_log_filepath='model/weather_search_log.jsonl'):
     """
     Train a Random Forest Classifier and perform cross-validation.
 
     Args:
         X (DataFrame): The feature matrix.
         y (Series): The target variable representing weather conditions.
+        n_jobs (int): Number of cores for cross-validation folds and tree building (None for one).
+        model_filepath (str): File path to save the trained model.
+        timings (dict): Optional dict receiving the duration of each stage.
+        search_budget (float): If set, tune the forest within this many seconds instead of
+            cross-validating the default one.
+        search_log_filepath (str): File path to save the search log.
     
     Returns:
         clf (RandomForestClassifier): The trained classifier.
     """
-    clf = RandomForestClassifier(n_estimators=100, random_state=42)
-    
-    # Stratified K-Folds cross-validator for balanced splits
-    skf = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
-    
-    # Perform cross-validation and print scores
-    cv_scores = cross_val_score(clf, X, y, cv=skf, scoring='accuracy')
-    print("Cross-Validation Scores:", cv_scores)
-    print("Mean Cross-Validation Accuracy:", cv_scores.mean())
+    if search_budget is not None:
+        with timed_stage(timings, 'search'):
+            clf = search_model(X, y, search_budget, n_jobs, search_log_filepath)
+    else:
+        # Split the core budget between the CV folds and the trees inside each fold
+        n_splits = 5
+        cv_jobs = min(n_splits, n_jobs) if n_jobs else None
+        tree_jobs = max(1, n_jobs // cv_jobs) if n_jobs else None
+        clf = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=tree_jobs)
+
+        # Stratified K-Folds cross-validator for balanced splits
+        skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+
+        # Perform cross-validation and print scores
+        with timed_stage(timings, 'cross_validation'):
+            cv_scores = cross_val_score(clf, X, y, cv=skf, scoring='accuracy', n_jobs=cv_jobs)
+        print("Cross-Validation Scores:", cv_scores)
+        print("Mean Cross-Validation Accuracy:", cv_scores.mean())
     
-    # Fit the model to the entire dataset
-    clf.fit(X, y)
+    # Fit the model to the entire dataset using every core in the budget
+    with timed_stage(timings, 'fit'):
+        clf.set_params(n_jobs=n_jobs)
+        clf.fit(X, y)
     
-    # Save the model to a file
-    joblib.dump(clf, 'model/weather_classifier_model.joblib')
+    # Save the model to a file; reset n_jobs so single-row predictions in the API stay serial
+    with timed_stage(timings, 'save'):
+        clf.set_params(n_jobs=None)
+        joblib.dump(clf, model_filepath)
      
     return clf
 
@@ -172,7 +233,7 @@ def plot_correlation_heatmap(df):
     correlation_matrix = numeric_df.corr()
     sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', linewidths=0.5)
     plt.title('Correlation Heatmap of Weather Features')
-    plt.show()
+    diagnostics.show('correlation_heatmap')
 
 def plot_scatter_matrix(df):
     """
@@ -186,7 +247,7 @@ def plot_scatter_matrix(df):
                     '9am Temperature (°C)', '3pm Temperature (°C)']
     scatter_matrix(df[scatter_cols], figsize=(10, 10), diagonal='kde')
     plt.suptitle('Scatter Matrix of Weather Features')
-    plt.show()
+    diagnostics.show('scatter_matrix')
 
 def plot_confusion_matrix(y_test, y_test_pred, clf):
     """
@@ -205,7 +266,7 @@ def plot_confusion_matrix(y_test, y_test_pred, clf):
     plt.title('Confusion Matrix - Test Set')
     plt.xlabel('Predicted Label')
     plt.ylabel('True Label')
-    plt.show()
+    diagnostics.show('confusion_matrix')
 
 def plot_feature_importance(clf, feature_names):
     """
@@ -227,19 +288,22 @@ def plot_feature_importance(clf, feature_names):
     plt.figure(figsize=(10, 6))
     sns.barplot(x='Importance', y='Feature', data=feature_importance_df)
     plt.title('Feature Importance in Weather Condition Prediction')
-    plt.show()
+    diagnostics.show('feature_importance')
 
-def plot_learning_curve(clf, X, y):
+def plot_learning_curve(clf, X, y, n_jobs=-1):
     """
     Plot the learning curve for the model to analyze bias and variance.
 
+    This refits the forest 50 times (10 sizes x 5 folds), so it is opt-in.
+
     Args:
         clf (RandomForestClassifier): The trained classifier.
         X (DataFrame): The feature matrix.
         y (Series): The target variable representing weather conditions.
+        n_jobs (int): Number of parallel fits (-1 for all cores).
     """
     # Compute learning curve data
-    train_sizes, train_scores, test_scores = learning_curve(clf, X, y, cv=5, n_jobs=-1, train_sizes=np.linspace(0.1, 1.0, 10))
+    train_sizes, train_scores, test_scores = learning_curve(clf, X, y, cv=5, n_jobs=n_jobs, train_sizes=np.linspace(0.1, 1.0, 10))
     
     # Calculate mean scores for training and validation sets
     train_scores_mean = train_scores.mean(axis=1)
@@ -254,32 +318,83 @@ def plot_learning_curve(clf, X, y):
     plt.ylabel('Score')
     plt.legend(loc='best')
     plt.grid()
-    plt.show()
+    diagnostics.show('learning_curve')
+
+def train(output_dir='.', n_jobs=None, timings=None, search_budget=None):
+    """
+    Train and save the weather classifier without any plotting.
+
+    Args:
+        output_dir (str): Directory the model/ artifacts are written under.
+        n_jobs (int): Number of cores for cross-validation and tree building (None for one).
+        timings (dict): Optional dict receiving the duration of each stage.
+        search_budget (float): If set, tune the forest within this many seconds.
+
+    Returns:
+        list: Paths of the written artifacts, relative to output_dir.
+    """
+    model_path = 'model/weather_classifier_model.joblib'
+    imputation_path = 'model/weather_imputation.json'
+    search_log_path = 'model/weather_search_log.jsonl'
+
+    with timed_stage(timings, 'load'):
+        df = load_data('weather/merged_weather_data.csv')
+    with timed_stage(timings, 'preprocess'):
+        # Defaults for the API's optional inputs, taken before missing values are zero-filled
+        ImputationStats.compute(df).save(os.path.join(output_dir, imputation_path))
+        df = preprocess_data(df)
+        df = add_weather_condition_column(df)
+        X, y = split_data(df)
+
+    train_model(X, y, n_jobs=n_jobs, model_filepath=os.path.join(output_dir, model_path), timings=timings,
+                search_budget=search_budget, search_log_filepath=os.path.join(output_dir, search_log_path))
+    artifacts = [model_path, imputation_path]
+    return artifacts if search_budget is None else artifacts + [search_log_path]
 
 def main():
     """
     Main function to load data, preprocess it, train the model, and evaluate its performance.
     """
-    # Load and preprocess the dataset
+    parser = argparse.ArgumentParser(description="Train the weather condition classifier.")
+    diagnostics.add_arguments(parser)
+    parser.add_argument('--learning-curve', action='store_true',
+                        help="Also compute the learning curve (refits the model 50 times)")
+    parser.add_argument('--search', action='store_true',
+                        help="Tune the forest by successive halving (log in model/weather_search_log.jsonl)")
+    parser.add_argument('--search-budget', type=float, default=300, help="Wall-clock budget of the search in seconds")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Parallel fits for the search and learning curve")
+    args = parser.parse_args()
+    diagnostics.configure(args, 'weather_conditions')
+
+    # Load and preprocess the dataset, saving the API's defaults for missing inputs first
     df = load_data('weather/merged_weather_data.csv')
+    ImputationStats.compute(df).save('model/weather_imputation.json')
     df = preprocess_data(df)
     df = add_weather_condition_column(df)
 
     # plot data analysis
-    plot_correlation_heatmap(df)
-    plot_scatter_matrix(df)
+    diagnostics.defer(plot_correlation_heatmap, df)
+    diagnostics.defer(plot_scatter_matrix, df)
 
     # Split the data into features and target
     X, y = split_data(df)
 
     # Train the Random Forest model
-    clf = train_model(X, y)
+    if args.search:
+        clf = train_model(X, y, n_jobs=args.n_jobs, search_budget=args.search_budget)
+    else:
+        clf = train_model(X, y)
+
+    # The model is saved, so headless diagnostics can start rendering
+    diagnostics.flush()
 
     # Evaluate the model and plot results
     y_test, y_test_pred = evaluate_model(clf, X, y)
-    plot_confusion_matrix(y_test, y_test_pred, clf)
-    plot_feature_importance(clf, X.columns)
-    plot_learning_curve(clf, X, y)
+    diagnostics.defer(plot_confusion_matrix, y_test, y_test_pred, clf)
+    diagnostics.defer(plot_feature_importance, clf, X.columns)
+    if args.learning_curve:
+        diagnostics.defer(plot_learning_curve, clf, X, y, n_jobs=args.n_jobs)
+    diagnostics.wait()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,163 @@
+"""
+Data-derived defaults for the optional weather inputs.
+
+The weather classifier needs the 9am and 3pm readings, which API callers may
+leave out. Their defaults are the means of the training data, overall and per
+calendar month, computed from the same frame the classifier is trained on and
+saved next to the model (model/weather_imputation.json for the default
+model). Missing values of any number of rows are filled in one vectorized
+step, with the month's mean where the month has data and the overall mean
+otherwise.
+
+    python weather_imputation.py                   # build model/weather_imputation.json
+"""
+
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from atomic_write import atomic_write
+
+IMPUTATION_FILE = 'weather_imputation.json'
+
+# Inputs of the weather classifier that callers may omit
+OPTIONAL_COLUMNS = [
+    '9am Temperature (°C)',
+    '9am relative humidity (%)',
+    '9am cloud amount (oktas)',
+    '9am wind speed (km/h)',
+    '3pm Temperature (°C)',
+    '3pm relative humidity (%)',
+    '3pm cloud amount (oktas)',
+    '3pm wind speed (km/h)',
+]
+
+
+def numeric_columns(df):
+    """
+    The optional columns as floats, with 'Calm' wind speeds read as 1 km/h as in training.
+
+    Args:
+        df (DataFrame): Data in the merged_weather_data.csv schema.
+
+    Returns:
+        ndarray: (rows, len(OPTIONAL_COLUMNS)) values, NaN where missing.
+    """
+    return np.column_stack([pd.to_numeric(df[c].replace('Calm', 1), errors='coerce').to_numpy(dtype=float)
+                            for c in OPTIONAL_COLUMNS])
+
+
+class ImputationStats:
+    """
+    Overall and per-month means of the optional weather inputs.
+    """
+
+    def __init__(self, overall, monthly, counts):
+        """
+        Args:
+            overall (ndarray): Mean of each column over all rows.
+            monthly (ndarray): (12, columns) means per calendar month, NaN for months without data.
+            counts (ndarray): (12, columns) number of observed values per calendar month.
+        """
+        self.overall = np.asarray(overall, dtype=float)
+        self.monthly = np.asarray(monthly, dtype=float)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        # Lookup table used when filling: the month's mean, or the overall mean if it has none
+        self.defaults = np.where(np.isnan(self.monthly), self.overall, self.monthly)
+
+    @classmethod
+    def compute(cls, df, date_column='Date'):
+        """
+        Compute the means from training data in one pass.
+
+        Args:
+            df (DataFrame): Data in the merged_weather_data.csv schema (dates as DD-MM-YYYY).
+            date_column (str): Name of the date column.
+
+        Returns:
+            ImputationStats: The statistics.
+        """
+        values = numeric_columns(df)
+        observed = ~np.isnan(values)
+        months = pd.to_datetime(df[date_column], format='%d-%m-%Y', errors='coerce').dt.month.to_numpy()
+        dated = ~np.isnan(months)
+
+        # Scatter the sums and counts of every row into its month
+        sums = np.zeros((12, len(OPTIONAL_COLUMNS)))
+        counts = np.zeros((12, len(OPTIONAL_COLUMNS)), dtype=np.int64)
+        month_index = months[dated].astype(int) - 1
+        np.add.at(sums, month_index, np.where(observed, values, 0.0)[dated])
+        np.add.at(counts, month_index, observed[dated])
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            monthly = sums / counts
+            overall = np.where(observed, values, 0.0).sum(axis=0) / observed.sum(axis=0)
+        return cls(overall, monthly, counts)
+
+    def fill(self, frame, months=None):
+        """
+        Fill missing optional inputs of any number of rows.
+
+        Args:
+            frame (DataFrame): Rows with the OPTIONAL_COLUMNS, NaN where missing.
+            months (array-like): Calendar month (1-12) of each row, or None for the overall means.
+
+        Returns:
+            DataFrame: The same DataFrame with the missing values filled.
+        """
+        values = frame[OPTIONAL_COLUMNS].to_numpy(dtype=float)
+        if months is None:
+            defaults = np.broadcast_to(self.overall, values.shape)
+        else:
+            defaults = self.defaults[np.asarray(months, dtype=int) - 1]
+        frame[OPTIONAL_COLUMNS] = np.where(np.isnan(values), defaults, values)
+        return frame
+
+    def to_dict(self):
+        def column_values(row):
+            return {c: (None if np.isnan(v) else round(float(v), 4)) for c, v in zip(OPTIONAL_COLUMNS, row)}
+
+        return {
+            'overall': column_values(self.overall),
+            'monthly': {str(m + 1): column_values(self.monthly[m]) for m in range(12)},
+            'counts': {str(m + 1): dict(zip(OPTIONAL_COLUMNS, self.counts[m].tolist())) for m in range(12)},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        def column_values(values):
+            return [np.nan if values.get(c) is None else values[c] for c in OPTIONAL_COLUMNS]
+
+        months = [str(m) for m in range(1, 13)]
+        return cls(column_values(data['overall']),
+                   [column_values(data['monthly'][m]) for m in months],
+                   [[data['counts'][m].get(c, 0) for c in OPTIONAL_COLUMNS] for m in months])
+
+    def save(self, path):
+        def write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+        atomic_write(path, write)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute the defaults of the optional weather inputs.")
+    parser.add_argument('--data', default='weather/merged_weather_data.csv', help="Weather training data")
+    parser.add_argument('--output', default=f'model/{IMPUTATION_FILE}', help="Imputation statistics file")
+    args = parser.parse_args()
+
+    stats = ImputationStats.compute(pd.read_csv(args.data))
+    stats.save(args.output)
+    print(f"Saved imputation statistics to {args.output}")
+    print(pd.Series(stats.overall, index=OPTIONAL_COLUMNS).round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
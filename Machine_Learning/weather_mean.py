@@ -1,33 +1,18 @@
 """
 Calculates Weather mean values
+
+The API reads these defaults from model/weather_imputation.json, which
+weather_conditions.py writes when it trains the model; this prints them.
 """
 import pandas as pd
+from weather_imputation import ImputationStats, OPTIONAL_COLUMNS
 
-# Load your training data
-training_data = pd.read_csv("Machine_learning/weather/merged_weather_data.csv")
-
-# Define the columns you want to calculate the mean for
-columns_to_calculate_mean = [
-    "9am Temperature (°C)",
-    "3pm Temperature (°C)",
-    "9am relative humidity (%)",
-    "3pm relative humidity (%)",
-    "9am cloud amount (oktas)",
-    "3pm cloud amount (oktas)",
-    "9am wind speed (km/h)",
-    "3pm wind speed (km/h)"
-]
-
-# Initialize an empty dictionary to store the mean values
-mean_values = {}
+# Load your training data (paths are relative to Machine_Learning/, like the other scripts)
+training_data = pd.read_csv("weather/merged_weather_data.csv")
 
-# Calculate the mean for each column, handling non-numeric values
-for column in columns_to_calculate_mean:
-    # Convert column to numeric, setting errors='coerce' to turn non-numeric values into NaN
-    training_data[column] = pd.to_numeric(training_data[column], errors='coerce')
-    
-    # Calculate the mean, skipping NaN values
-    mean_values[column] = training_data[column].mean(skipna=True)
+# Calculate the overall and per-month means, skipping missing and non-numeric values
+stats = ImputationStats.compute(training_data)
 
-# Print or save the mean values to use as defaults for missing values
-print(mean_values)
+# Print the mean values used as defaults for missing values
+print(dict(zip(OPTIONAL_COLUMNS, stats.overall.round(2).tolist())))
+print(pd.DataFrame(stats.monthly, index=pd.RangeIndex(1, 13, name='Month'), columns=OPTIONAL_COLUMNS).round(2).to_string())
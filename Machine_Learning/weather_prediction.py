@@ -1,10 +1,13 @@
 """
 This script allows users to input weather conditions and predict the weather category 
 using a pre-trained Random Forest model.
+
+With --daemon, the prediction is made by prediction_daemon.py; pandas, scikit-learn
+and the model are then only imported and loaded if the daemon is not running.
 """
 
-import pandas as pd
-import joblib
+import argparse
+import prediction_daemon
 
 def get_user_input():
     """
@@ -52,6 +55,7 @@ def predict_weather(user_input, model):
     Returns:
         str: Predicted weather condition.
     """
+    import pandas as pd
     input_df = pd.DataFrame([user_input])
     prediction = model.predict(input_df)
     return prediction[0]
@@ -60,14 +64,25 @@ def main():
     """
     Main function to load the model and get predictions based on user input.
     """
-    # Load the pre-trained model
-    model = joblib.load('model/weather_classifier_model.joblib')
+    parser = argparse.ArgumentParser(description="Predict the weather condition of the conditions entered.")
+    prediction_daemon.add_arguments(parser)
+    args = parser.parse_args()
 
     # Get user input for weather conditions
     user_input = get_user_input()
 
-    # Predict the weather condition
-    predicted_condition = predict_weather(user_input, model)
+    # Ask the warm daemon first when requested
+    result = prediction_daemon.ask(args, 'weather', user_input)
+    if result is not None:
+        predicted_condition = result['prediction']
+    else:
+        import joblib
+
+        # Load the pre-trained model
+        model = joblib.load('model/weather_classifier_model.joblib')
+
+        # Predict the weather condition
+        predicted_condition = predict_weather(user_input, model)
     
     # Output the prediction
     print(f"The predicted weather condition is: {predicted_condition}")
@@ -0,0 +1,142 @@
+"""
+Successive-halving hyperparameter search for the weather condition classifier.
+
+Every depth / leaf-size candidate starts with a small forest. After each rung
+only the best 1/factor of the candidates survive, and the survivors are
+re-evaluated with factor times as many trees, so most of the compute goes to
+the promising configurations. Candidate-fold fits run in parallel on the same
+precomputed StratifiedKFold indices. No rung is started that would overrun the
+wall-clock budget, and fits still queued when it runs out are skipped.
+"""
+
+import itertools
+import json
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold
+
+# Candidate tree shapes; the number of trees is the resource being halved
+PARAM_GRID = {
+    'max_depth': [None, 8, 16, 24],
+    'min_samples_leaf': [1, 2, 5, 10],
+}
+
+
+def candidate_params(grid=PARAM_GRID):
+    """
+    Expand a parameter grid into a list of candidates.
+
+    Args:
+        grid (dict): Parameter name -> list of values.
+
+    Returns:
+        list: One dict of parameters per candidate.
+    """
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+# Used when the budget runs out before any candidate is fully evaluated
+DEFAULT_PARAMS = {'max_depth': None, 'min_samples_leaf': 1, 'n_estimators': 100}
+
+
+def _fold_score(params, n_estimators, X, y, train_idx, test_idx, deadline):
+    # Fits still queued when the budget runs out are skipped (time.time() is shared across workers)
+    if deadline is not None and time.time() > deadline:
+        return np.nan
+    clf = RandomForestClassifier(n_estimators=n_estimators, random_state=42, **params)
+    clf.fit(X[train_idx], y[train_idx])
+    return float((clf.predict(X[test_idx]) == y[test_idx]).mean())
+
+
+def successive_halving(X, y, grid=PARAM_GRID, min_trees=10, max_trees=200, factor=3, n_splits=5,
+                       budget_seconds=None, n_jobs=None, log=None):
+    """
+    Find the best tree shape and size by successive halving over the number of trees.
+
+    Args:
+        X (DataFrame): The feature matrix.
+        y (Series): The target variable.
+        grid (dict): Candidate max_depth / min_samples_leaf values.
+        min_trees (int): Trees per forest in the first rung.
+        max_trees (int): Upper bound on trees per forest.
+        factor (int): Candidates kept per rung are divided, and trees multiplied, by this factor.
+        n_splits (int): Number of cross-validation folds.
+        budget_seconds (float): Wall-clock budget for the whole search (None for no limit).
+        n_jobs (int): Number of parallel fits (None for one, -1 for all cores).
+        log (list): Optional list receiving one record per evaluated candidate and rung.
+
+    Returns:
+        tuple: (best parameters including n_estimators, mean CV accuracy of the best candidate).
+            If the budget runs out before any candidate is fully evaluated, the default
+            forest parameters are returned with a NaN score.
+    """
+    start = time.perf_counter()
+    deadline = time.time() + budget_seconds if budget_seconds is not None else None
+    X_values, y_values = np.asarray(X), np.asarray(y)
+
+    # Fold indices are computed once and shared by every candidate and rung
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42).split(X_values, y_values))
+
+    candidates = candidate_params(grid)
+    n_estimators, rung, best = min_trees, 0, None
+    seconds_per_tree_fit = None
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        while candidates:
+            # Fit time grows with the number of trees, so the previous rung predicts the cost of this one
+            if budget_seconds is not None and seconds_per_tree_fit is not None:
+                remaining = budget_seconds - (time.perf_counter() - start)
+                if seconds_per_tree_fit * len(candidates) * n_estimators > remaining:
+                    break
+
+            rung_start = time.perf_counter()
+            scores = parallel(delayed(_fold_score)(params, n_estimators, X_values, y_values, train_idx, test_idx, deadline)
+                              for params in candidates for train_idx, test_idx in folds)
+            scores = np.array(scores).reshape(len(candidates), n_splits)
+            seconds_per_tree_fit = (time.perf_counter() - rung_start) / (len(candidates) * n_estimators)
+
+            # Only candidates scored on every fold take part in the ranking
+            complete = ~np.isnan(scores).any(axis=1)
+            if not complete.any():
+                break
+            candidates, scores = [c for c, ok in zip(candidates, complete) if ok], scores[complete]
+
+            means = scores.mean(axis=1)
+            if log is not None:
+                for params, mean, std in zip(candidates, means, scores.std(axis=1)):
+                    log.append({'rung': rung, 'n_estimators': n_estimators, **params,
+                                'mean_accuracy': round(float(mean), 5), 'std_accuracy': round(float(std), 5)})
+
+            order = np.argsort(-means, kind='stable')
+            best = ({**candidates[order[0]], 'n_estimators': n_estimators}, float(means[order[0]]))
+
+            if not complete.all() or len(candidates) == 1 or n_estimators >= max_trees:
+                break
+            candidates = [candidates[i] for i in order[:max(1, len(candidates) // factor)]]
+            n_estimators = min(n_estimators * factor, max_trees)
+            rung += 1
+
+    return best if best is not None else (dict(DEFAULT_PARAMS), float('nan'))
+
+
+def write_search_log(log, best, seconds, filepath):
+    """
+    Write the search log as JSON lines, ending with a summary record.
+
+    Args:
+        log (list): Records from successive_halving.
+        best (tuple): (best parameters, mean CV accuracy).
+        seconds (float): Wall-clock duration of the search.
+        filepath (str): Destination file.
+    """
+    params, score = best
+    # A search that ran out of budget before any fit has no score: null, as NaN is not valid JSON
+    mean_accuracy = None if np.isnan(score) else round(float(score), 5)
+    with open(filepath, 'w') as f:
+        for record in log:
+            f.write(json.dumps(record) + '\n')
+        f.write(json.dumps({'best': params, 'mean_accuracy': mean_accuracy, 'seconds': round(seconds, 3),
+                            'evaluations': len(log)}) + '\n')